@@ -0,0 +1,61 @@
+"""Serial extract_events_from_html against the process-pool batch API over many pages.
+
+Usage: python benchmarks/bench_batch.py [--pages N] [--scale N] [--processes N] [--chunksize N]
+
+The batch is N pages cycled from the listing fixtures, each scaled x--scale so the
+work is dominated by parsing. Results must match the serial run exactly.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+import harness  # noqa: F401 (puts the repo root on sys.path)
+import corpus
+from scraper import BookMyShowScraper
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=64)
+    parser.add_argument('--scale', type=int, default=10)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunksize', type=int, default=None)
+    args = parser.parse_args()
+
+    names = sorted(corpus.LISTING_BLOCKS)
+    pages = {name: corpus.scale_listing(name, args.scale).encode('utf-8') for name in names}
+    payloads = [(pages[names[i % len(names)]], names[i % len(names)]) for i in range(args.pages)]
+    total_mb = sum(len(html) for html, _ in payloads) / 1e6
+
+    scraper = BookMyShowScraper()
+    scraper.extract_processes = args.processes
+    print(f"{args.pages} pages, {total_mb:.1f} MB, parser {scraper.parser.name}, {args.processes} processes")
+
+    with redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        serial = [scraper.extract_events_from_html(html.decode('utf-8'), source) for html, source in payloads]
+        serial_s = time.perf_counter() - started
+
+        # Start the workers outside the timed section: a long-running scraper pays that once
+        scraper.get_extract_pool()
+        list(scraper.extract_events_batch(payloads[:args.processes], chunksize=1))
+
+        started = time.perf_counter()
+        first_s = None
+        batched = [None] * len(payloads)
+        for index, source, events in scraper.extract_events_batch(payloads, chunksize=args.chunksize):
+            first_s = first_s or time.perf_counter() - started
+            batched[index] = events
+        batch_s = time.perf_counter() - started
+    scraper.close_extract_pool()
+
+    print(f"  serial: {serial_s:7.2f} s  {args.pages / serial_s:7.1f} pages/s  {total_mb / serial_s:6.1f} MB/s")
+    print(f"  batch:  {batch_s:7.2f} s  {args.pages / batch_s:7.1f} pages/s  {total_mb / batch_s:6.1f} MB/s  "
+          f"first result after {first_s * 1000:.0f} ms  speedup {serial_s / batch_s:.2f}x")
+    print(f"  results {'identical' if batched == serial else 'DIFFERENT'}")
+    sys.exit(0 if batched == serial else 1)
+
+if __name__ == "__main__":
+    main()
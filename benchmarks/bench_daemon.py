@@ -0,0 +1,78 @@
+"""Per-poll cost of a one-shot `python scraper.py` run against a warm daemon poll, fully offline.
+
+Usage: python benchmarks/bench_daemon.py [--polls N] [--latency MS] [--scale N]
+
+Cold: a fresh interpreter per poll, as the daily workflow runs it (startup, imports,
+store and cache reload). Warm: BookMyShowScraper.poll() repeatedly on one scraper
+with the store open, as daemon() does between its sleeps. Both talk to the stand-in
+server with their state in a temporary directory.
+"""
+import argparse
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from harness import REPO_DIR, percentile
+from bench_pipeline import configure
+from standin_server import start_server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--polls', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0, help='stand-in response latency in ms')
+    parser.add_argument('--scale', type=int, default=1, help='repeat listing cards N times')
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency, scale=args.scale)
+    workdir = tempfile.mkdtemp(prefix='bms-daemon-')
+    os.environ.update({'ENRICH': '0', 'ADAPTIVE_ORDER': '0'})
+    print(f"Stand-in server on {server.base_url}, latency {args.latency:g} ms, scale x{args.scale}, {args.polls} polls")
+
+    try:
+        cold_dir = os.path.join(workdir, 'cold')
+        os.makedirs(cold_dir)
+        configure(cold_dir, server, 'sequential')
+        cold = []
+        for _ in range(args.polls):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(REPO_DIR, 'scraper.py')], cwd=cold_dir, env=os.environ,
+                           stdout=subprocess.DEVNULL, check=True)
+            cold.append(time.perf_counter() - started)
+
+        warm_dir = os.path.join(workdir, 'warm')
+        os.makedirs(warm_dir)
+        configure(warm_dir, server, 'sequential')
+        from scraper import BookMyShowScraper, RunMetrics
+
+        warm = []
+        with redirect_stdout(io.StringIO()):
+            scraper = BookMyShowScraper()
+            scraper.open_store()
+            try:
+                for _ in range(args.polls):
+                    scraper.metrics = RunMetrics()
+                    scraper.transport.metrics = scraper.metrics
+                    started = time.perf_counter()
+                    scraper.poll()
+                    scraper.save_source_stats()
+                    scraper.save_fingerprints()
+                    warm.append(time.perf_counter() - started)
+            finally:
+                scraper.store.close()
+                scraper.transport.close()
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for name, timings in (('cold process', cold), ('warm daemon', warm)):
+        print(f"  {name:12s}  first {timings[0] * 1000:8.1f} ms  "
+              f"p50 {percentile(timings, 0.5) * 1000:8.1f} ms  p95 {percentile(timings, 0.95) * 1000:8.1f} ms")
+    print(f"  warm polls are {percentile(cold, 0.5) / percentile(warm, 0.5):.1f}x cheaper at p50")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Email delivery cost: a connection per message versus SmtpDispatcher's one connection per batch.
+
+Usage: python benchmarks/bench_email.py [--recipients N] [--events N] [--latency MS]
+
+Both paths deliver one digest per recipient to a local SMTP sink (smtp_sink.py) that
+adds --latency to every reply, standing in for the round trips to a real provider.
+Rendering is timed separately, as the cost of the single-join templates.
+"""
+import argparse
+import io
+import os
+import smtplib
+import sys
+import time
+from contextlib import redirect_stdout
+
+import harness  # noqa: F401 (puts the repo root on sys.path)
+from smtp_sink import start_sink
+from scraper import BookMyShowScraper, SmtpDispatcher
+
+def sample_events(count):
+    return [{
+        'id': f"bench-{i}",
+        'title': f"Bench Concert {i} <Live>",
+        'date': 'Sat, 14 Nov',
+        'venue': f"Venue {i % 7}, Mumbai",
+        'price': f"₹{499 + i}",
+        'url': f"https://in.bookmyshow.com/events/bench-concert-{i}/ET{i:08d}",
+        'lineup': 'Artist A, Artist B' if i % 3 == 0 else '',
+        'source': 'bench',
+        'city': 'mumbai' if i % 2 else 'bengaluru',
+        'category': 'music-shows'
+    } for i in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipients', type=int, default=50)
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=5, help='sink reply latency in ms')
+    args = parser.parse_args()
+
+    sink = start_sink(latency=args.latency)
+    port = sink.server_address[1]
+    os.environ.update({'SMTP_SERVER': '127.0.0.1', 'SMTP_PORT': str(port), 'SMTP_STARTTLS': '0',
+                       'SENDER_EMAIL': 'bench@example.com'})
+    os.environ.pop('SENDER_PASSWORD', None)
+
+    scraper = BookMyShowScraper()
+    events = sample_events(args.events)
+    recipients = [f"user{i}@example.com" for i in range(args.recipients)]
+
+    started = time.perf_counter()
+    text, html = scraper.create_email_text(events), scraper.create_email_html(events)
+    render_ms = (time.perf_counter() - started) * 1000
+    print(f"{args.recipients} recipients, {args.events} events per digest, sink latency {args.latency:g} ms, "
+          f"render {render_ms:.2f} ms ({len(html) / 1024:.1f} KiB HTML)")
+
+    messages = [scraper.create_email_message('bench@example.com', r, events, text, html) for r in recipients]
+
+    # The old send_email_alert: connect, (STARTTLS, login,) send and quit for every message
+    started = time.perf_counter()
+    for message in messages:
+        server = smtplib.SMTP('127.0.0.1', port)
+        server.send_message(message)
+        server.quit()
+    per_message_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with SmtpDispatcher.from_env() as dispatcher:
+        sent, failures = dispatcher.send_batch(messages)
+    batch_s = time.perf_counter() - started
+
+    with redirect_stdout(io.StringIO()):
+        os.environ['RECEIVER_EMAIL'] = ','.join(recipients)
+        started = time.perf_counter()
+        ok = scraper.send_email_alert(events)
+        alert_s = time.perf_counter() - started
+    sink.shutdown()
+
+    print(f"  connection per message: {per_message_s * 1000:8.1f} ms  {len(messages) / per_message_s:7.1f} msg/s")
+    print(f"  dispatcher batch:       {batch_s * 1000:8.1f} ms  {sent / batch_s:7.1f} msg/s  "
+          f"{dispatcher.connections} connection(s)  speedup {per_message_s / batch_s:.2f}x")
+    print(f"  send_email_alert:       {alert_s * 1000:8.1f} ms  (render + batch)")
+
+    expected = len(messages) * 2 + len(recipients)
+    print(f"  sink received {len(sink.messages)}/{expected} messages over {sink.connections} connections")
+    sys.exit(0 if ok and not failures and len(sink.messages) == expected else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare the embedded-JSON fast path against DOM extraction on pages that carry listing data.
+
+Usage: python benchmarks/bench_embedded_json.py [--scale N] [fixture.html ...]
+
+--scale N repeats the listing (cards and JSON events) N times to mimic a big explore page.
+Both paths must return the same events; exits non-zero if they don't.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+from contextlib import redirect_stdout
+
+from harness import best_of
+from corpus import FIXTURE_DIR
+import scraper
+from scraper import BookMyShowScraper
+
+def scale_page(html, scale):
+    """Repeat both the DOM cards and the __NEXT_DATA__ events `scale` times"""
+    start = html.index('<main class="listing">') + len('<main class="listing">')
+    end = html.index('</main>')
+    html = html[:start] + html[start:end] * scale + html[end:]
+
+    payload_start = html.index('>', html.index('id="__NEXT_DATA__"')) + 1
+    payload_end = html.index('</script>', payload_start)
+    data = json.loads(html[payload_start:payload_end])
+    listing = data['props']['pageProps']['listing']
+    listing['events'] = listing['events'] * scale
+    return html[:payload_start] + json.dumps(data, ensure_ascii=False) + html[payload_end:]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*')
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    paths = args.paths or [os.path.join(FIXTURE_DIR, 'explore_next_data.html')]
+    fast = BookMyShowScraper()
+    dom = BookMyShowScraper()
+    dom.embedded_json = False
+    scraper.json_loads('{}')  # binds the decoder actually used
+    print(f"Parser backend: {dom.parser.name}, JSON decoder: {scraper.json_loads.__module__}")
+
+    mismatches = 0
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            html = scale_page(f.read(), args.scale)
+
+        with redirect_stdout(io.StringIO()):
+            fast_events = fast.extract_events_from_html(html, 'bench')
+            dom_events = dom.extract_events_from_html(html, 'bench')
+            fast_ms = best_of(lambda: fast.extract_events_from_html(html, 'bench'), args.repeat)
+            dom_ms = best_of(lambda: dom.extract_events_from_html(html, 'bench'), args.repeat)
+
+        print(f"{os.path.basename(path)} x{args.scale} ({len(html) / 1024:.1f} KiB)")
+        print(f"  DOM path:      {dom_ms:9.2f} ms  ({len(dom_events)} events)")
+        print(f"  embedded JSON: {fast_ms:9.2f} ms  ({len(fast_events)} events)  speedup: {dom_ms / fast_ms:.1f}x")
+        if [dict(event) for event in fast_events] != [dict(event) for event in dom_events]:
+            mismatches += 1
+            print("  events DIFFER between the two paths")
+
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
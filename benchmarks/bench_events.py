@@ -0,0 +1,118 @@
+"""Per-event memory of Event against plain dicts, and history export size and speed per format.
+
+Usage: python benchmarks/bench_events.py [--events N]
+
+Synthetic history: N events over a few hundred venues, dates and prices, as months
+of scraping would accumulate. Exports: the legacy pretty-printed JSON list, columnar
+NDJSON (plain and gzip) and Parquet when pyarrow is installed. "venue scan" counts
+events per venue from the export, reading only that column where the format allows.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+import harness  # noqa: F401 (puts the repo root on sys.path)
+from scraper import HISTORY_FIELDS, Event, export_history_ndjson, export_history_parquet, read_history_ndjson
+
+def history_rows(count, seed=3):
+    rng = random.Random(seed)
+    venues = [f"Venue {i}, Area {i % 17}: Mumbai" for i in range(300)]
+    dates = [f"{day} {month} onwards" for day in range(1, 29) for month in ('Nov', 'Dec', 'Jan')]
+    prices = [f"₹{amount} onwards" for amount in range(199, 5000, 100)] + ['Check website']
+    rows = []
+    for i in range(count):
+        seen = f"2026-{1 + i * 12 // count:02d}-{1 + i % 28:02d}T10:00:00"
+        rows.append((
+            f"code:ET{i:08d}", f"Artist {i} - Live in Concert", rng.choice(dates), rng.choice(venues),
+            rng.choice(prices), f"https://in.bookmyshow.com/events/artist-{i}/ET{i:08d}",
+            rng.choice(['Web Archive', 'Google Cache', 'Mobile BookMyShow', 'BookMyShow API']),
+            rng.choice(['mumbai', 'pune', 'bengaluru']), rng.choice(['music-shows', 'comedy-shows']),
+            None, seen, seen, rng.randint(1, 30)
+        ))
+    return rows
+
+def event_bytes(rows, build):
+    """tracemalloc bytes per event for records built by `build` from history rows"""
+    # Field values are decoded fresh, as they would be from pages or the store
+    payloads = [json.loads(json.dumps(dict(zip(HISTORY_FIELDS[:10], row[:10])))) for row in rows]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [build(payload) for payload in payloads]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del records
+    return used / len(rows)
+
+def build_dict(payload):
+    return {key: value for key, value in payload.items() if value is not None}
+
+def build_event(payload):
+    return Event(**{key: value for key, value in payload.items() if value is not None})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100000)
+    args = parser.parse_args()
+
+    rows = history_rows(args.events)
+    sample = rows[:min(len(rows), 20000)]
+    dict_bytes = event_bytes(sample, build_dict)
+    slotted_bytes = event_bytes(sample, build_event)
+    print(f"{args.events} events")
+    print(f"  memory per event: dict {dict_bytes:6.0f} B  Event {slotted_bytes:6.0f} B  "
+          f"({(1 - slotted_bytes / dict_bytes) * 100:.0f}% smaller; record overhead, field strings shared)")
+
+    workdir = tempfile.mkdtemp(prefix='bms-export-')
+    batches = [rows[i:i + 10000] for i in range(0, len(rows), 10000)]
+    try:
+        def legacy(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump([dict(zip(HISTORY_FIELDS, row)) for row in rows], f, indent=2, ensure_ascii=False)
+
+        def legacy_scan(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return Counter(event['venue'] for event in json.load(f))
+
+        def columnar_scan(path):
+            venues = Counter()
+            for columns in read_history_ndjson(path, ['venue']):
+                venues.update(columns['venue'])
+            return venues
+
+        formats = [
+            ('pretty JSON', 'history.json', legacy, legacy_scan),
+            ('NDJSON', 'history.ndjson', lambda path: export_history_ndjson(batches, path), columnar_scan),
+            ('NDJSON.gz', 'history.ndjson.gz', lambda path: export_history_ndjson(batches, path), columnar_scan)
+        ]
+        try:
+            import pyarrow.parquet as pq
+
+            def parquet_scan(path):
+                return Counter(pq.read_table(path, columns=['venue']).column('venue').to_pylist())
+            formats.append(('Parquet', 'history.parquet', lambda path: export_history_parquet(batches, path), parquet_scan))
+        except ImportError:
+            print("  (pyarrow not installed, Parquet skipped)")
+
+        expected = None
+        for name, filename, write, scan in formats:
+            path = os.path.join(workdir, filename)
+            started = time.perf_counter()
+            write(path)
+            write_s = time.perf_counter() - started
+            started = time.perf_counter()
+            venues = scan(path)
+            scan_s = time.perf_counter() - started
+            expected = expected or venues
+            print(f"  {name:12s} {os.path.getsize(path) / 1e6:8.2f} MB  write {write_s * 1000:8.1f} ms  "
+                  f"venue scan {scan_s * 1000:8.1f} ms  {'ok' if venues == expected else 'MISMATCH'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Throughput, p50/p95 latency and peak memory of every extractor over the offline corpus.
+
+Usage: python benchmarks/bench_extractors.py [--repeat N] [--large-scale N] [--json out.json] [--compare base.json]
+
+Extractors:
+  html           extract_events_from_html with the embedded-JSON fast path off (DOM path)
+  embedded_json  extract_events_from_html with the fast path on
+  single_event   extract_single_event per matched card (parse and card match excluded)
+  json           json.loads + extract_events_from_json on the API payload (as extract_api_response does)
+  text           extract_events_from_text on the page text
+
+Peak memory is the Python heap high-water mark from tracemalloc; lxml and lexbor
+trees live outside it, see bench_parsers.py for whole-process RSS.
+"""
+import argparse
+import io
+import json
+from contextlib import redirect_stdout
+
+from harness import measure, percentile
+import corpus
+from scraper import BookMyShowScraper
+
+def card_extractor(scraper, html):
+    """extract_single_event over every card the listing extraction would use, on a pre-parsed page"""
+    parser = scraper.parser
+    document = parser.parse(html)
+    matches = scraper.card_engine.scan(parser.iter_all(document), parser)
+    cards = next((elements for elements in matches['card'] if len(elements) > 2), matches['fallback'][0])[:15]
+    return lambda: [scraper.extract_single_event(card, document) for card in cards], len(cards)
+
+def cases(item, dom, fast):
+    """(extractor, callable, items per call) for one corpus input"""
+    name, kind, content = item
+    if kind == 'html':
+        yield 'html', lambda: dom.extract_events_from_html(content, 'bench'), None
+        if 'id="__NEXT_DATA__"' in content:
+            yield 'embedded_json', lambda: fast.extract_events_from_html(content, 'bench'), None
+        yield ('single_event',) + card_extractor(dom, content)
+    elif kind == 'json':
+        yield 'json', lambda: dom.extract_events_from_json(json.loads(content), 'bench'), None
+    else:
+        yield 'text', lambda: dom.extract_events_from_text(content, 'bench'), None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--large-scale', type=int, default=150)
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='previous --json output to compare p50 against')
+    args = parser.parse_args()
+
+    dom = BookMyShowScraper()
+    dom.embedded_json = False
+    fast = BookMyShowScraper()
+    print(f"Parser backend: {dom.parser.name}, {args.repeat} calls per case")
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = {(r['input'], r['extractor']): r for r in json.load(f)['results']}
+
+    results = []
+    for item in corpus.corpus(args.large_scale):
+        name, kind, content = item
+        size = len(content.encode('utf-8'))
+        print(f"\n{name} ({size / 1024:.1f} KiB)")
+
+        for extractor, func, items in cases(item, dom, fast):
+            with redirect_stdout(io.StringIO()):
+                timings, result, peak_kib = measure(func, args.repeat)
+            events = len(result or [])
+            p50 = percentile(timings, 0.5)
+            row = {
+                'input': name,
+                'extractor': extractor,
+                'bytes': size,
+                'events': events,
+                'p50_ms': round(p50, 4),
+                'p95_ms': round(percentile(timings, 0.95), 4),
+                'mb_per_s': round(size / 1e6 / (p50 / 1000), 2) if extractor != 'single_event' else None,
+                'items_per_s': round((items or events) / (p50 / 1000), 1),
+                'peak_kib': round(peak_kib, 1)
+            }
+            results.append(row)
+
+            line = (f"  {extractor:14s} p50 {row['p50_ms']:9.3f} ms  p95 {row['p95_ms']:9.3f} ms  "
+                    f"{row['items_per_s']:10.1f} items/s  ")
+            line += f"{row['mb_per_s']:7.2f} MB/s  " if row['mb_per_s'] is not None else ' ' * 15
+            line += f"peak {row['peak_kib']:9.1f} KiB  events: {events}"
+            previous = baseline.get((name, extractor))
+            if previous:
+                line += f"  ({(row['p50_ms'] / previous['p50_ms'] - 1) * 100:+.0f}% vs baseline)"
+            print(line)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'parser': dom.parser.name, 'repeat': args.repeat, 'results': results}, f, indent=2)
+        print(f"\nWrote {len(results)} results to {args.json}")
+
+if __name__ == "__main__":
+    main()
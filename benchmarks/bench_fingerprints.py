@@ -0,0 +1,86 @@
+"""Cost of change detection against the extraction it skips, per listing fixture.
+
+Usage: python benchmarks/bench_fingerprints.py [--repeat N] [--scale N]
+
+For each page: page_fingerprint alone; full DOM extraction; and extraction of the
+same page with one card edited, with a warm ChangeDetector (only that card is
+re-extracted) and without one. Results of the warm pass must match a cold one.
+Then a page whose only change is its window.__INITIAL_STATE__ payload must be
+re-extracted rather than reused, while one whose only change is another inline
+script must be reused.
+"""
+import argparse
+import io
+import json
+import sys
+import time
+from contextlib import redirect_stdout
+
+from harness import percentile, timed
+import corpus
+from scraper import BookMyShowScraper, ChangeDetector, page_fingerprint
+
+def state_page(events, analytics=0):
+    """A page listing `events` titles only through window.__INITIAL_STATE__, plus one unrelated script"""
+    state = {'events': [{'name': f"Live Music Night {i}", 'url': f"https://in.bookmyshow.com/events/night-{i}/ET{i:08d}"}
+                        for i in range(events)]}
+    return (f"<html><body><div id=\"root\"></div><script>window.__INITIAL_STATE__={json.dumps(state)};</script>"
+            f"<script>var loadedAt = {analytics};</script></body></html>")
+
+def check_data_scripts(scraper):
+    """(events found on an unchanged page, on the page with a third event in its state payload)"""
+    scraper.embedded_json = True
+    scraper.change_detector = ChangeDetector()
+    candidate = {'url': 'https://in.bookmyshow.com/explore/events-mumbai', 'source': 'bench'}
+    with redirect_stdout(io.StringIO()):
+        found = []
+        for html in (state_page(2), state_page(2, analytics=1), state_page(3, analytics=1)):
+            found.append(len(scraper.extract_page(candidate, html, lambda: scraper.extract_events_from_html(html, 'bench'))))
+    return found, scraper.metrics.counter('pages_unchanged')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+
+    cold = BookMyShowScraper()
+    cold.embedded_json = False
+    warm = BookMyShowScraper()
+    warm.embedded_json = False
+    print(f"Parser backend: {cold.parser.name}, pages x{args.scale}, p50 of {args.repeat} calls")
+
+    identical = True
+    for name in sorted(corpus.LISTING_BLOCKS):
+        html = corpus.scale_listing(name, args.scale)
+        # The first card's text, edited; every other card is unchanged
+        edited = html.replace('Live', 'LIVE', 1)
+
+        with redirect_stdout(io.StringIO()):
+            fingerprint_ms, _ = timed(lambda: page_fingerprint(html), args.repeat)
+            full_ms, expected = timed(lambda: cold.extract_events_from_html(edited, 'bench'), args.repeat)
+
+            def changed_page():
+                warm.change_detector = ChangeDetector()
+                warm.extract_events_from_html(html, 'bench')
+                started = time.perf_counter()
+                events = warm.extract_events_from_html(edited, 'bench')
+                return time.perf_counter() - started, events
+            runs = [changed_page() for _ in range(args.repeat)]
+        cards_ms = percentile([seconds * 1000 for seconds, _ in runs], 0.5)
+        same = runs[-1][1] == expected
+        identical = identical and same
+
+        print(f"  {name:24s} {len(html) / 1024:7.0f} KiB  fingerprint {fingerprint_ms:7.2f} ms  "
+              f"extract {full_ms:7.2f} ms  one card changed {cards_ms:7.2f} ms  "
+              f"({'identical' if same else 'DIFFERENT'})")
+
+    found, reused = check_data_scripts(BookMyShowScraper())
+    state_ok = found == [2, 2, 3] and reused == 1
+    print(f"  __INITIAL_STATE__ only change: events {found}, {reused:.0f} page reused "
+          f"({'re-extracted' if state_ok else 'STALE'})")
+
+    sys.exit(0 if identical and state_ok else 1)
+
+if __name__ == "__main__":
+    main()
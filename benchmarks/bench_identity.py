@@ -0,0 +1,91 @@
+"""Event identity resolution: conformance cases, then resolve() throughput against a populated store.
+
+Usage: python benchmarks/bench_identity.py [--stored N] [--events N]
+
+The cases pin down when near-duplicate titles may be folded onto a stored event:
+never across (city, category) targets and never when both events carry different
+BookMyShow codes or slugs. Exits non-zero if any case fails.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import harness  # noqa: F401 (puts the repo root on sys.path)
+from scraper import Event, EventStore, IdentityIndex, make_event_id
+
+def event(title, url='', date='', city='mumbai', category='comedy-shows', venue='Venue'):
+    item = Event(title=title, url=url, date=date, city=city, category=category, venue=venue)
+    item['id'] = make_event_id(item)
+    return item
+
+MUMBAI = event("Comedy Open Mic Night - Live", 'https://in.bookmyshow.com/events/open-mic/ET00411111',
+               venue='Canvas Laugh Club')
+
+# (name, new event, expected to fold onto MUMBAI)
+CASES = [
+    ('different codes, different cities', event("Comedy Open Mic Night Live",
+     'https://in.bookmyshow.com/events/open-mic/ET00422222', '14 Nov', city='pune', venue='The Box'), False),
+    ('different codes, same target', event("Comedy Open Mic Night Live",
+     'https://in.bookmyshow.com/events/open-mic/ET00422222'), False),
+    ('no code, other city', event("Comedy Open Mic Night Live", city='pune'), False),
+    ('no code, other category', event("Comedy Open Mic Night Live", category='music-shows'), False),
+    ('no code, same target', event("Comedy Open Mic Night Live"), True),
+    ('same code, reworded title', event("Open Mic Night (Comedy)",
+     'https://in.bookmyshow.com/events/open-mic-night/ET00411111'), True)
+]
+
+def check_cases(workdir):
+    failures = 0
+    for name, candidate, should_fold in CASES:
+        store = EventStore(os.path.join(workdir, f"{len(name)}-{name.replace(' ', '_')}.db"))
+        store.upsert([MUMBAI])
+        index = IdentityIndex()
+        index.add(MUMBAI, MUMBAI['id'])
+
+        original_id = candidate['id']
+        in_memory = index.lookup(candidate) == MUMBAI['id']
+        store.resolve([candidate])
+        folded = candidate['id'] == MUMBAI['id']
+        reported_new = bool(store.new_ids([candidate['id']]))
+        store.upsert([candidate])
+        stored = dict(store.conn.execute('SELECT city, venue, url FROM events WHERE id = ?', (MUMBAI['id'],)).fetchone())
+        store.close()
+
+        ok = (folded == should_fold and in_memory == should_fold and reported_new != should_fold
+              and (should_fold or stored == {'city': 'mumbai', 'venue': 'Canvas Laugh Club', 'url': MUMBAI['url']}))
+        failures += not ok
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}: {original_id} -> {candidate['id']}"
+              f"{'' if reported_new else ' (not new)'}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stored', type=int, default=5000)
+    parser.add_argument('--events', type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bms-bench-')
+    try:
+        failures = check_cases(workdir)
+
+        store = EventStore(os.path.join(workdir, 'throughput.db'))
+        store.upsert([event(f"Stored Show {i} Live", f"https://in.bookmyshow.com/events/show-{i}/ET{10000000 + i}")
+                      for i in range(args.stored)])
+        incoming = [event(f"Stored Show {i} - Live") for i in range(0, args.stored, max(args.stored // args.events, 1))]
+        started = time.perf_counter()
+        resolved = store.resolve(incoming)
+        elapsed = time.perf_counter() - started
+        store.close()
+        print(f"  resolve: {len(incoming)} events against {args.stored} stored in {elapsed * 1000:.1f} ms "
+              f"({len(incoming) / elapsed:.0f} events/s), {resolved} folded")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"  {len(CASES) - failures}/{len(CASES)} identity cases pass")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare the compiled keyword matcher against per-line any(keyword in line.lower()) scans.
+
+Usage: python benchmarks/bench_keywords.py [--scale N] [--repeat N]
+
+Inputs are the raw listing fixtures (the text fallback runs on raw page content)
+and the text-only fixture, each also scaled up; both sides must find the same lines.
+Both sides stop at the fallback's limit of 10 lines.
+"""
+import argparse
+import itertools
+
+from harness import best_of
+import corpus
+from scraper import CATEGORY_KEYWORDS, DEFAULT_TARGET, KeywordMatcher
+
+KEYWORDS = CATEGORY_KEYWORDS[DEFAULT_TARGET[1]]
+
+def legacy_text_lines(text, limit=10):
+    """The pre-matcher text fallback: split, strip and lower() every line, two any() scans"""
+    lines = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if len(line) < 10 or len(line) > 200:
+            continue
+        if any(keyword in line.lower() for keyword in KEYWORDS['include']):
+            if any(skip in line.lower() for skip in KEYWORDS['exclude']):
+                continue
+            lines.append(line)
+            if len(lines) >= limit:
+                break
+    return lines
+
+def matcher_text_lines(matcher, text, limit=10):
+    """What extract_events_from_text now does before building events"""
+    return list(itertools.islice(matcher.iter_lines(text, min_length=10, max_length=200), limit))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=150)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    matcher = KeywordMatcher(KEYWORDS['include'], KEYWORDS['exclude'])
+    inputs = [(name, corpus.load(name)) for name in sorted(corpus.LISTING_BLOCKS)]
+    inputs.append(('text_listing.txt', corpus.load('text_listing.txt')))
+    inputs += [(f"{name} x{args.scale}", corpus.scale_listing(name, args.scale)) for name in sorted(corpus.LISTING_BLOCKS)]
+    inputs.append((f"text_listing.txt x{args.scale}", corpus.load('text_listing.txt') * args.scale))
+    # Worst case for the early exit: a big page with no matching line at all
+    inputs.append(('no matches', 'Lorem ipsum dolor sit amet, consectetur\n' * 20000 * max(args.scale // 150, 1)))
+
+    for name, text in inputs:
+        engine = matcher_text_lines(matcher, text)
+        engine_ms = best_of(lambda: matcher_text_lines(matcher, text), args.repeat)
+        legacy = legacy_text_lines(text)
+        legacy_ms = best_of(lambda: legacy_text_lines(text), args.repeat)
+
+        same = 'identical' if engine == legacy else 'DIFFERENT'
+        print(f"{name:30s} {len(text) / 1024:9.1f} KiB  any/lower: {legacy_ms:9.3f} ms  "
+              f"matcher: {engine_ms:9.3f} ms  speedup: {legacy_ms / engine_ms:6.2f}x  lines: {len(engine)} ({same})")
+
+    # The per-card title filter in extract_single_event
+    titles = [line.strip() for line in corpus.load('text_listing.txt').split('\n') if line.strip()] * 200
+    legacy_ms = best_of(lambda: [any(k in t.lower() for k in KEYWORDS['include']) for t in titles], args.repeat)
+    engine_ms = best_of(lambda: [matcher.has_keyword(t) for t in titles], args.repeat)
+    print(f"{'card titles':30s} {len(titles):6d} titles  any/lower: {legacy_ms:9.3f} ms  "
+          f"matcher: {engine_ms:9.3f} ms  speedup: {legacy_ms / engine_ms:6.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Conformance check and parse-time / memory comparison of the HTML parser backends.
+
+Every installed backend must produce exactly the same events as html.parser on
+every fixture; the script exits non-zero otherwise.
+
+Usage: python benchmarks/bench_parsers.py [--scale N] [fixture.html ...]
+
+--scale N also benchmarks a synthetic large explore page made by repeating the
+cards of explore_cards.html N times.
+"""
+import argparse
+import glob
+import io
+import os
+import subprocess
+import sys
+from contextlib import redirect_stdout
+
+from harness import REPO_DIR, best_of
+from corpus import FIXTURE_DIR
+from scraper import BookMyShowScraper, available_parser_backends, get_parser_backend
+
+def make_large_page(scale):
+    """Repeat the listing block of the explore fixture to get a multi-megabyte page"""
+    with open(os.path.join(FIXTURE_DIR, 'explore_cards.html'), 'r', encoding='utf-8') as f:
+        html = f.read()
+    start = html.index('<main class="listing">') + len('<main class="listing">')
+    end = html.index('</main>')
+    return html[:start] + html[start:end] * scale + html[end:]
+
+def extract(backend_name, html):
+    """Run the full HTML extraction with one backend, silencing progress output"""
+    scraper = BookMyShowScraper()
+    scraper.parser = get_parser_backend(backend_name)
+    with redirect_stdout(io.StringIO()):
+        return scraper.extract_events_from_html(html, 'bench')
+
+def peak_parse_memory(backend_name, path):
+    """Peak RSS growth (KiB) caused by parsing `path`, measured in a fresh interpreter
+
+    Reads VmHWM from /proc because ru_maxrss survives exec and would report the
+    benchmark process's own peak instead of the child's.
+    """
+    code = (
+        "import sys\n"
+        f"sys.path.insert(0, {REPO_DIR!r})\n"
+        "from scraper import get_parser_backend\n"
+        "def peak():\n"
+        "    with open('/proc/self/status') as f:\n"
+        "        return next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))\n"
+        f"backend = get_parser_backend({backend_name!r})\n"
+        f"html = open({path!r}, encoding='utf-8').read()\n"
+        "before = peak()\n"
+        "document = backend.parse(html)\n"
+        "print(peak() - before)\n"
+    )
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return int(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*')
+    parser.add_argument('--scale', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html')))
+    if args.scale:
+        large_path = os.path.join(FIXTURE_DIR, f'.explore_x{args.scale}.html')
+        with open(large_path, 'w', encoding='utf-8') as f:
+            f.write(make_large_page(args.scale))
+        paths.append(large_path)
+
+    backends = available_parser_backends()
+    print(f"Backends: {', '.join(backends)}")
+    failures = 0
+
+    try:
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                html = f.read()
+            print(f"\n{os.path.basename(path)} ({len(html) / 1024:.1f} KiB)")
+
+            reference = extract('html.parser', html)
+            for name in backends:
+                events = extract(name, html)
+                conforms = events == reference
+                failures += not conforms
+
+                backend = get_parser_backend(name)
+                parse_ms = best_of(lambda: backend.parse(html), args.repeat)
+                extract_ms = best_of(lambda: extract(name, html), args.repeat)
+                memory_kib = peak_parse_memory(name, path)
+
+                print(f"  {name:12s} parse: {parse_ms:8.2f} ms  extract: {extract_ms:8.2f} ms  "
+                      f"peak RSS +{memory_kib:7d} KiB  events: {len(events):3d}  "
+                      f"{'conforms' if conforms else 'MISMATCH vs html.parser'}")
+    finally:
+        if args.scale:
+            os.remove(large_path)
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""End-to-end scrape_events benchmark against the local stand-in server, fully offline.
+
+Usage: python benchmarks/bench_pipeline.py [--runs N] [--mode sequential|race] [--latency MS]
+                                           [--scale N] [--dead HOST ...] [--volatile] [--cold]
+
+Every run builds a fresh scraper pointed at the stand-in server via UPSTREAM_OVERRIDE,
+with its event store, response cache and enrichment cache in a temporary directory.
+Runs share that directory (warm caches and method history) unless --cold is given.
+Per-host rate limits are switched off (HOST_MIN_INTERVAL=0); bench_ratelimit.py covers them.
+--volatile serves pages that change only in noise and carry no ETag, so repeat runs
+exercise page fingerprinting instead of 304s; each run prints its page and card skip counts.
+"""
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from harness import percentile
+from standin_server import start_server
+
+def configure(workdir, server, mode):
+    """Environment for one scraper instance: stand-in upstream, private state, no politeness gaps"""
+    os.environ.update({
+        'UPSTREAM_OVERRIDE': server.base_url,
+        'SCRAPE_MODE': mode,
+        'HOST_MIN_INTERVAL': '0',
+        'EVENTS_DB': os.path.join(workdir, 'events.db'),
+        'HTTP_CACHE_DIR': os.path.join(workdir, '.http_cache'),
+        'ENRICH_CACHE_FILE': os.path.join(workdir, 'enrichment_cache.json'),
+        'RUN_REPORT_FILE': os.path.join(workdir, 'run_report.json'),
+        'METRICS_FILE': os.path.join(workdir, 'metrics.prom')
+    })
+
+def run_once(workdir, server, mode):
+    """One scrape_events pass through open_store/save; returns (seconds, events, stage totals, change detection)"""
+    configure(workdir, server, mode)
+    from scraper import BookMyShowScraper
+
+    scraper = BookMyShowScraper()
+    with redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        scraper.open_store()
+        try:
+            events = scraper.scrape_events()
+            scraper.find_new_events(events)
+            scraper.save_events(events)
+        finally:
+            scraper.save_source_stats()
+            scraper.save_fingerprints()
+            scraper.save_response_cache()
+            scraper.store.close()
+            scraper.close_extract_pool()
+            scraper.transport.close()
+        elapsed = time.perf_counter() - started
+
+    stages = {stage: stats['total'] for stage, stats in scraper.metrics.summary().items()}
+    return elapsed, len(events), stages, scraper.change_detection_summary()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--mode', choices=['sequential', 'race'], default='sequential')
+    parser.add_argument('--latency', type=float, default=0, help='stand-in response latency in ms')
+    parser.add_argument('--scale', type=int, default=1, help='repeat listing cards N times')
+    parser.add_argument('--dead', action='append', default=[], help='host the stand-in answers 404 for')
+    parser.add_argument('--volatile', action='store_true', help='noisy pages without ETags')
+    parser.add_argument('--cold', action='store_true', help='fresh store and caches for every run')
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency, scale=args.scale, dead=args.dead, volatile=args.volatile)
+    workdir = tempfile.mkdtemp(prefix='bms-bench-')
+    print(f"Stand-in server on {server.base_url}, mode {args.mode}, latency {args.latency:g} ms, "
+          f"scale x{args.scale}, {'cold' if args.cold else 'warm'} runs")
+
+    timings = []
+    try:
+        for run in range(1, args.runs + 1):
+            # Race mode leaves losing requests running, so cold runs get a new directory instead of a wiped one
+            run_dir = os.path.join(workdir, f'run-{run}') if args.cold else workdir
+            os.makedirs(run_dir, exist_ok=True)
+            requests_before = server.requests
+            elapsed, events, stages, changes = run_once(run_dir, server, args.mode)
+            timings.append(elapsed)
+
+            slowest = sorted(stages.items(), key=lambda item: -item[1])[:4]
+            print(f"  run {run}: {elapsed * 1000:8.1f} ms  {events:3d} events  "
+                  f"{server.requests - requests_before:3d} requests  "
+                  f"{changes['pages_unchanged']}/{changes['pages_checked']} pages, "
+                  f"{changes['cards_reused']} cards reused  "
+                  + ', '.join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in slowest))
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"scrape_events p50 {percentile(timings, 0.5) * 1000:.1f} ms, "
+          f"p95 {percentile(timings, 0.95) * 1000:.1f} ms over {len(timings)} runs")
+
+if __name__ == "__main__":
+    main()
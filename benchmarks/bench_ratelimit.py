@@ -0,0 +1,99 @@
+"""Multi-target crawl against the stand-in server with real per-host politeness limits.
+
+Usage: python benchmarks/bench_ratelimit.py [--targets N] [--concurrency N] [--interval S] [--burst N]
+                                            [--latency MS] [--failing HOST ...] [--dead HOST ...]
+
+By default Google Cache answers 503 (Retry-After: 1) and the archives 404, so every
+target falls through to the mobile pages and several targets compete for the same
+hosts. Prints the crawl time, the time spent waiting on rate limits, and for every
+host the number of requests, the smallest gap between two of them and the most
+requests seen in any window of --interval seconds. The window must stay within
+--burst and, with a burst of 1, no two requests to a host may be less than
+--interval apart (less a small allowance for network jitter).
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+import harness  # noqa: F401 (puts the repo root on sys.path)
+from bench_pipeline import configure
+from standin_server import start_server
+
+# Arrival gaps may come out this much shorter than the gaps between request starts
+GAP_TOLERANCE = 0.05
+
+CITIES = ['mumbai', 'pune', 'delhi', 'bengaluru', 'hyderabad', 'chennai', 'kolkata', 'ahmedabad']
+
+def busiest_window(arrivals, window):
+    """Most arrivals falling within any `window` seconds"""
+    best = start = 0
+    for end, arrived in enumerate(arrivals):
+        while arrived - arrivals[start] >= window:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--targets', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--interval', type=float, default=2.0, help='HOST_MIN_INTERVAL, seconds per token')
+    parser.add_argument('--burst', type=int, default=1, help='HOST_BURST')
+    parser.add_argument('--latency', type=float, default=20, help='stand-in response latency in ms')
+    parser.add_argument('--failing', action='append', default=None, help='host the stand-in answers 503 for')
+    parser.add_argument('--dead', action='append', default=None, help='host the stand-in answers 404 for')
+    args = parser.parse_args()
+
+    failing = args.failing if args.failing is not None else ['webcache.googleusercontent.com']
+    dead = args.dead if args.dead is not None else ['archive.today', 'web.archive.org']
+    server = start_server(latency=args.latency, failing=failing, dead=dead)
+    workdir = tempfile.mkdtemp(prefix='bms-bench-')
+
+    try:
+        configure(workdir, server, 'sequential')
+        os.environ.update({
+            'SCRAPE_TARGETS': ','.join(f"{city}:music-shows" for city in CITIES[:args.targets]),
+            'CRAWL_CONCURRENCY': str(args.concurrency),
+            'HOST_MIN_INTERVAL': str(args.interval),
+            'HOST_BURST': str(args.burst),
+            'ADAPTIVE_ORDER': '0'
+        })
+        from scraper import BookMyShowScraper
+
+        scraper = BookMyShowScraper()
+        print(f"{args.targets} targets, concurrency {args.concurrency}, one request per {args.interval:g}s "
+              f"per host (burst {args.burst}), failing {failing}, dead {dead}")
+
+        with redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            events = scraper.scrape_events()
+            elapsed = time.perf_counter() - started
+        scraper.transport.close()
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    waits = scraper.metrics.summary().get('rate_limit_wait', {'total': 0.0, 'count': 0})
+    print(f"  crawl {elapsed:.2f} s, {len(events)} events, {waits['count']} waits totalling {waits['total']:.2f} s, "
+          f"{scraper.metrics.counter('throttled'):.0f} throttled responses")
+
+    within = True
+    for host, arrivals in sorted(server.arrivals.items()):
+        gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+        window = busiest_window(arrivals, args.interval)
+        within = within and window <= args.burst
+        if args.burst == 1 and gaps:
+            within = within and min(gaps) >= args.interval - GAP_TOLERANCE
+        print(f"  {host:32s} {len(arrivals):3d} requests  min gap "
+              + (f"{min(gaps):6.2f} s" if gaps else '     - ')
+              + f"  busiest {args.interval:g}s window {window}")
+    print(f"  per-host rate {'within' if within else 'ABOVE'} the limit")
+    sys.exit(0 if within else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Record a crawl into an HTTP archive, then measure crawl throughput replaying it under clean, slow and flaky upstreams.
+
+Usage: python benchmarks/bench_replay.py [--archive run.jsonl.gz] [--runs N] [--targets N] [--mode sequential|race]
+                                         [--scenario clean|slow|flaky ...] [--seed N]
+
+Without --archive the recording is made against the corpus stand-in server (the same
+thing `python scraper.py scrape --record FILE` does against the real hosts); pass a
+real recording to replay that instead. Every replayed run is cold, with its own store
+and caches, so each one fetches everything. In sequential mode the clean replay must
+find exactly the events the recording run found; race mode may crown another winner.
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from harness import percentile
+from bench_pipeline import configure
+from bench_ratelimit import CITIES
+from standin_server import start_server
+
+SCENARIOS = {
+    'clean': {},
+    'slow': {'recorded_latency': True, 'latency': 150, 'jitter': 100},
+    'flaky': {'error_rate': 0.2, 'error_statuses': (500, 503), 'reset_rate': 0.05}
+}
+
+def crawl(workdir, server, mode, targets, record=None):
+    """One cold scrape_events over `targets`; returns (seconds, event titles, scraper)"""
+    os.makedirs(workdir, exist_ok=True)
+    configure(workdir, server, mode)
+    os.environ['SCRAPE_TARGETS'] = ','.join(f"{city}:music-shows" for city in targets)
+    os.environ['CRAWL_CONCURRENCY'] = str(len(targets))
+    os.environ.pop('RECORD_ARCHIVE', None)
+    if record:
+        os.environ['RECORD_ARCHIVE'] = record
+    from scraper import BookMyShowScraper
+
+    scraper = BookMyShowScraper()
+    with redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        scraper.open_store()
+        try:
+            events = scraper.scrape_events()
+        finally:
+            scraper.store.close()
+            scraper.close_recorder()
+            scraper.transport.close()
+        elapsed = time.perf_counter() - started
+    return elapsed, sorted(event['title'] for event in events), scraper
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--archive', default=None, help='replay this recording instead of making one')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--targets', type=int, default=4)
+    parser.add_argument('--mode', choices=['sequential', 'race'], default='sequential')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), default=None)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    targets = CITIES[:args.targets]
+    workdir = tempfile.mkdtemp(prefix='bms-bench-')
+    try:
+        archive = args.archive
+        expected = None
+        if archive is None:
+            archive = os.path.join(workdir, 'recording.jsonl.gz')
+            server = start_server()
+            try:
+                _, expected, recording = crawl(os.path.join(workdir, 'record'), server, args.mode, targets, archive)
+            finally:
+                server.shutdown()
+            print(f"Recorded {recording.recorder.records} responses ({len(recording.recorder.digests)} distinct bodies) "
+                  f"into {os.path.getsize(archive) / 1024:.1f} KiB, {len(expected)} events")
+
+        for name in args.scenario or ['clean', 'slow', 'flaky']:
+            server = start_server(archive=archive, seed=args.seed, **SCENARIOS[name])
+            timings = []
+            events = []
+            errors = 0.0
+            try:
+                for run in range(args.runs):
+                    elapsed, titles, scraper = crawl(os.path.join(workdir, f'{name}-{run}'), server, args.mode, targets)
+                    timings.append(elapsed)
+                    events.append(len(titles))
+                    errors += scraper.metrics.counter('throttled')
+                    if name == 'clean' and args.mode == 'sequential' and expected is not None and titles != expected:
+                        print(f"  clean replay run {run + 1} found different events")
+                        sys.exit(1)
+            finally:
+                server.shutdown()
+
+            p50 = percentile(timings, 0.5)
+            print(f"  {name:6s} p50 {p50 * 1000:8.1f} ms  p95 {percentile(timings, 0.95) * 1000:8.1f} ms  "
+                  f"{len(targets) / p50:6.1f} targets/s  events min {min(events)} max {max(events)}  "
+                  f"{server.requests} requests, {errors:.0f} throttled")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
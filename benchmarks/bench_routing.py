@@ -0,0 +1,105 @@
+"""Routing cost of SubscriberIndex against checking every subscriber, as subscribers grow.
+
+Usage: python benchmarks/bench_routing.py [--subscribers 100 1000 10000] [--events N] [--seed N]
+
+Subscribers get random mixes of city, category, venue, price-ceiling and keyword
+filters; events are drawn from the same vocabulary. Both routers must produce the
+same digests.
+
+"match" is computing each event's audience mask, which stays flat as subscribers
+grow; "route" adds expanding the masks into digests, which grows with deliveries.
+"""
+import argparse
+import random
+import sys
+import time
+
+import harness  # noqa: F401 (puts the repo root on sys.path)
+from scraper import SubscriberIndex
+
+CITIES = ['mumbai', 'bengaluru', 'delhi-ncr', 'pune', 'hyderabad', 'chennai', 'kolkata', 'navi-mumbai']
+CATEGORIES = ['music-shows', 'comedy-shows', 'performances']
+VENUES = ['NSCI Dome', 'Jio World Garden', 'Phoenix Marketcity', 'Bandra Fort', 'Palace Grounds',
+          'Hard Rock Cafe', 'Blue Frog', 'Canvas Laugh Club', 'Antisocial', 'Prithvi Theatre']
+WORDS = ['jazz', 'rock', 'indie', 'techno', 'sufi', 'qawwali', 'acoustic', 'metal', 'bollywood night',
+         'open mic', 'stand up', 'orchestra', 'tribute', 'unplugged', 'hip hop', 'festival']
+
+def random_subscriber(rng, number):
+    subscriber = {'email': f"user{number}@example.com"}
+    if rng.random() < 0.8:
+        subscriber['cities'] = rng.sample(CITIES, rng.randint(1, 2))
+    if rng.random() < 0.5:
+        subscriber['categories'] = rng.sample(CATEGORIES, 1)
+    if rng.random() < 0.2:
+        subscriber['venues'] = rng.sample(VENUES, rng.randint(1, 3))
+    if rng.random() < 0.4:
+        subscriber['max_price'] = rng.choice([500, 999, 1500, 2500, 5000])
+    if rng.random() < 0.3:
+        subscriber['keywords'] = rng.sample(WORDS, rng.randint(1, 3))
+    return subscriber
+
+def random_event(rng, number):
+    return {
+        'id': f"event-{number}",
+        'title': f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} Live {number}",
+        'venue': f"{rng.choice(VENUES)}, {rng.choice(CITIES).title()}",
+        'price': rng.choice([f"₹{rng.randint(199, 6000)} onwards", 'Check website', 'Free']),
+        'city': rng.choice(CITIES),
+        'category': rng.choice(CATEGORIES)
+    }
+
+def linear_route(index, events):
+    """The baseline: every event checked against every subscriber"""
+    digests = {}
+    for event in events:
+        for subscriber in index.subscribers:
+            if index.matches(subscriber, event):
+                recipients = digests.setdefault(subscriber['email'], [])
+                if not recipients or recipients[-1] is not event:
+                    recipients.append(event)
+    return digests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscribers', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    events = [random_event(rng, i) for i in range(args.events)]
+    identical = True
+
+    for count in args.subscribers:
+        subscribers = [random_subscriber(rng, i) for i in range(count)]
+        started = time.perf_counter()
+        index = SubscriberIndex(subscribers)
+        build_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for event in events:
+            index.audience(event)
+        match_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        indexed = index.route(events)
+        indexed_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        linear = linear_route(index, events)
+        linear_s = time.perf_counter() - started
+
+        deliveries = sum(len(routed) for routed in indexed.values())
+        same = indexed == linear
+        identical = identical and same
+        print(f"{count:6d} subscribers: build {build_ms:8.1f} ms  "
+              f"match {match_s / len(events) * 1e6:6.1f} µs/event  "
+              f"route {indexed_s / len(events) * 1e6:8.1f} µs/event  "
+              f"linear {linear_s / len(events) * 1e6:10.1f} µs/event  "
+              f"speedup {linear_s / indexed_s:6.1f}x  {deliveries} deliveries  "
+              f"{'identical' if same else 'DIFFERENT'}")
+
+    sys.exit(0 if identical else 1)
+
+if __name__ == "__main__":
+    main()
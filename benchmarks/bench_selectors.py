@@ -0,0 +1,130 @@
+"""Compare the compiled selector engine against the old per-selector soup.select path.
+
+Usage: python benchmarks/bench_selectors.py [fixture.html ...]  (default: the listing fixtures)
+
+The old path gets the same outermost-card filter the scraper applies since cards
+nested in other cards stopped counting twice, so only the selector matching
+itself is compared. Exits non-zero if any page's events differ.
+"""
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+from harness import best_of
+from corpus import FIXTURE_DIR, LISTING_BLOCKS
+from scraper import BookMyShowScraper, CARD_SELECTORS, FIELD_SELECTORS
+
+MUSIC_KEYWORDS = ['music', 'concert', 'live', 'show', 'performance', 'gig', 'festival']
+
+def legacy_extract_single_event(element):
+    """The pre-engine card extraction: one select_one per selector per field"""
+    event = {'title': '', 'date': '', 'venue': '', 'price': '', 'url': '', 'id': ''}
+
+    for selector in FIELD_SELECTORS['title']:
+        title_elem = element.select_one(selector)
+        if title_elem:
+            title = title_elem.get_text(strip=True)
+            if title and len(title) > 5:
+                event['title'] = title
+                break
+
+    if not event['title']:
+        text = element.get_text(strip=True)
+        if text and len(text) < 150:
+            event['title'] = text
+
+    for field in ('date', 'venue', 'price'):
+        for selector in FIELD_SELECTORS[field]:
+            field_elem = element.select_one(selector)
+            if field_elem:
+                event[field] = field_elem.get_text(strip=True)
+                break
+
+    event['venue'] = event['venue'] or 'Mumbai'
+    event['price'] = event['price'] or 'Check website'
+
+    if element.get('href'):
+        href = element.get('href')
+    else:
+        link_elem = element.find('a')
+        href = link_elem.get('href') if link_elem else ''
+    if href and href.startswith('/'):
+        event['url'] = f"https://in.bookmyshow.com{href}"
+    elif href and href.startswith('http'):
+        event['url'] = href
+
+    title_for_id = event['title'][:50] if event['title'] else 'event'
+    date_for_id = event['date'][:20] if event['date'] else datetime.now().strftime('%Y%m%d')
+    event['id'] = f"{title_for_id}_{date_for_id}".replace(' ', '_').lower()
+
+    if any(keyword in event['title'].lower() for keyword in MUSIC_KEYWORDS):
+        return event
+    return None
+
+def legacy_outermost(elements, limit):
+    """BookMyShowScraper.outermost for bs4 elements: the first `limit` not nested in an earlier one"""
+    kept = []
+    for element in elements:
+        if len(kept) >= limit:
+            break
+        if not any(parent is earlier for parent in element.parents for earlier in kept):
+            kept.append(element)
+    return kept
+
+def legacy_extract_events_from_html(html_content, source):
+    """The pre-engine listing extraction: one full-document soup.select per card selector"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    event_elements = []
+    for selector in CARD_SELECTORS:
+        elements = soup.select(selector)
+        if elements and len(elements) > 2:
+            event_elements = elements
+            break
+
+    if not event_elements:
+        event_elements = soup.find_all('a', href=lambda x: x and 'events' in x)[:20]
+
+    events = []
+    for element in legacy_outermost(event_elements, 15):
+        event = legacy_extract_single_event(element)
+        if event and event.get('title'):
+            event['source'] = source
+            events.append(event)
+    return events
+
+def strip_ids(events):
+    return [{key: value for key, value in event.items() if key != 'id'} for event in events]
+
+def main(paths, repeat=20):
+    quiet = BookMyShowScraper()
+    quiet.embedded_json = False  # compare DOM paths only
+    mismatches = 0
+
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        # The scraper prints progress for every page; keep the benchmark output readable
+        with redirect_stdout(io.StringIO()):
+            engine_events = quiet.extract_events_from_html(html, 'bench')
+            engine_ms = best_of(lambda: quiet.extract_events_from_html(html, 'bench'), repeat)
+
+        legacy_events = legacy_extract_events_from_html(html, 'bench')
+        legacy_ms = best_of(lambda: legacy_extract_events_from_html(html, 'bench'), repeat)
+
+        # Ids are derived differently since events got stable identities; compare the extracted fields
+        same = 'identical' if strip_ids(engine_events) == strip_ids(legacy_events) else 'DIFFERENT'
+        mismatches += same != 'identical'
+        print(f"{os.path.basename(path):30s} {len(html) / 1024:8.1f} KiB  "
+              f"select: {legacy_ms:8.2f} ms  engine: {engine_ms:8.2f} ms  "
+              f"speedup: {legacy_ms / engine_ms:5.2f}x  events: {len(engine_events)} ({same})")
+
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or [os.path.join(FIXTURE_DIR, name) for name in sorted(LISTING_BLOCKS)])
@@ -0,0 +1,99 @@
+"""Conformance check and timing of streaming extraction against the lxml DOM path.
+
+Usage: python benchmarks/bench_streaming.py [--chunk BYTES ...] [--repeat N] [fixture.html ...]
+
+Every fixture, plus synthetic pages where a lower-priority card selector leads
+early and is overtaken later in the page, is fed to extract_events_streaming in
+chunks of each size. The streamed events must be exactly the ones
+extract_events_from_html finds with the lxml backend and embedded JSON off; the
+script exits non-zero otherwise.
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+from contextlib import redirect_stdout
+
+from harness import best_of
+from corpus import FIXTURE_DIR
+from scraper import BookMyShowScraper, get_parser_backend
+
+def card(markup, number):
+    return markup.format(n=number, title=f"Live Show {number}")
+
+ANCHOR = '<a href="/events/show-{n}/ET{n:08d}"><h3>{title}</h3><span class="date">1{n} Nov</span></a>'
+EVENT_CARD = '<div class="event-card"><h3>{title}</h3><div class="venue">Hall {n}</div></div>'
+TESTID = ('<div data-testid="event-card"><h3>{title}</h3>'
+          '<div data-testid="event-date">2{n} Nov</div></div>')
+
+def page(*blocks):
+    return f"<html><body>{''.join(blocks)}</body></html>"
+
+SYNTHETIC = {
+    'overtaken late': page(*(card(ANCHOR, n) for n in range(3)), '<p>' + 'x' * 40000 + '</p>',
+                           *(card(EVENT_CARD, n) for n in range(10, 14))),
+    'nested matches': page(*(card(TESTID, n) for n in range(20))),
+    'fallback only': page(*(f'<p><a href="/all-events?page={n}">Live events page {n}</a></p>' for n in range(25)))
+}
+
+class ChunkedResponse:
+    """Just enough of a requests.Response for the streaming extractor"""
+    headers = {'Content-Type': 'text/html; charset=utf-8'}
+    encoding = 'utf-8'
+
+    def __init__(self, content, chunk):
+        self.content = content
+        self.chunk = chunk
+
+    def iter_content(self, chunk_size=None):
+        for start in range(0, len(self.content), self.chunk):
+            yield self.content[start:start + self.chunk]
+
+    def close(self):
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*')
+    parser.add_argument('--chunk', type=int, action='append', default=None)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    pages = {}
+    for path in args.paths or sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    if not args.paths:
+        pages.update(SYNTHETIC)
+
+    scraper = BookMyShowScraper()
+    scraper.parser = get_parser_backend('lxml')
+    scraper.embedded_json = False
+    failures = 0
+
+    for name, html in pages.items():
+        content = html.encode('utf-8')
+        with redirect_stdout(io.StringIO()):
+            reference = scraper.extract_events_from_html(html, 'bench')
+        print(f"{name} ({len(content) / 1024:.1f} KiB), DOM path: {len(reference)} events")
+
+        for chunk in args.chunk or [512, 16384]:
+            with redirect_stdout(io.StringIO()):
+                events = scraper.extract_events_streaming(ChunkedResponse(content, chunk), 'bench')
+            conforms = events == reference
+            failures += not conforms
+
+            state = {}
+            list(scraper.iter_events_streaming(ChunkedResponse(content, chunk), 'bench', state=state))
+
+            best = best_of(lambda: list(scraper.iter_events_streaming(ChunkedResponse(content, chunk), 'bench')),
+                           args.repeat)
+            print(f"  chunk {chunk:6d}  {best:8.2f} ms  read {state['bytes'] / 1024:7.1f} KiB"
+                  f"{' (aborted early)' if state['aborted'] else ''}  events: {len(events):3d}  "
+                  f"{'conforms' if conforms else 'MISMATCH vs DOM path'}")
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Offline corpus of recorded-style BookMyShow pages shared by the benchmarks and the stand-in server.
+
+Fixtures live in benchmarks/fixtures; multi-megabyte pages are made on the fly by
+repeating the listing block of a fixture, so they never need to be committed.
+"""
+import json
+import os
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Listing pages, with the markers around the block of cards that scale_listing repeats
+LISTING_BLOCKS = {
+    'explore_cards.html': ('<main class="listing">', '</main>'),
+    'explore_next_data.html': ('<main class="listing">', '</main>'),
+    'archive_snapshot.html': ('<div class="sc-1ljcxl3-0">', '</div>\n</body>'),
+    'mobile_listing.html': ('<ul class="m-listing">', '</ul>')
+}
+
+def load(name):
+    with open(os.path.join(FIXTURE_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+def scale_listing(name, scale):
+    """A fixture listing page with its cards (and embedded JSON events) repeated `scale` times"""
+    html = load(name)
+    if scale <= 1:
+        return html
+
+    start_marker, end_marker = LISTING_BLOCKS[name]
+    start = html.index(start_marker) + len(start_marker)
+    end = html.index(end_marker, start)
+    html = html[:start] + html[start:end] * scale + html[end:]
+
+    if 'id="__NEXT_DATA__"' in html:
+        payload_start = html.index('>', html.index('id="__NEXT_DATA__"')) + 1
+        payload_end = html.index('</script>', payload_start)
+        data = json.loads(html[payload_start:payload_end])
+        listing = data['props']['pageProps']['listing']
+        listing['events'] = listing['events'] * scale
+        html = html[:payload_start] + json.dumps(data, ensure_ascii=False) + html[payload_end:]
+    return html
+
+def scale_api(scale):
+    """The JSON API fixture with its event list repeated `scale` times"""
+    data = json.loads(load('api_events.json'))
+    data['data'] = data['data'] * max(scale, 1)
+    data['count'] = len(data['data'])
+    return json.dumps(data, ensure_ascii=False)
+
+def corpus(large_scale=150):
+    """Every benchmark input as (name, kind, content); kind is 'html', 'json' or 'text'
+
+    Each listing fixture also appears scaled by `large_scale`, which puts the
+    explore pages in the multi-megabyte range of a real explore page.
+    """
+    items = []
+    for name in sorted(LISTING_BLOCKS):
+        items.append((name, 'html', load(name)))
+    items.append(('api_events.json', 'json', load('api_events.json')))
+    items.append(('text_listing.txt', 'text', load('text_listing.txt')))
+
+    if large_scale > 1:
+        for name in sorted(LISTING_BLOCKS):
+            items.append((f"{name} x{large_scale}", 'html', scale_listing(name, large_scale)))
+        items.append((f"api_events.json x{large_scale}", 'json', scale_api(large_scale)))
+    return items
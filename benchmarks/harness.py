@@ -0,0 +1,47 @@
+"""Plumbing shared by the benchmark scripts: the repo root on sys.path, and timing helpers.
+
+Import it before scraper: `python benchmarks/bench_x.py` only puts benchmarks/ on
+sys.path, and this module adds the repo root so `import scraper` works.
+"""
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+def samples(func, repeat):
+    """Per-call wall-clock times (ms) of `repeat` calls, and the last call's result"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, result
+
+def best_of(func, repeat):
+    """Best wall-clock time of `repeat` calls, in milliseconds"""
+    return min(samples(func, repeat)[0])
+
+def timed(func, repeat):
+    """(p50 ms, last result) over `repeat` calls"""
+    timings, result = samples(func, repeat)
+    return percentile(timings, 0.5), result
+
+def measure(func, repeat):
+    """Per-call latencies (ms) over `repeat` calls, the last result and the tracemalloc peak (KiB) of one call"""
+    timings, result = samples(func, repeat)
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return timings, result, peak / 1024
@@ -0,0 +1,93 @@
+"""Minimal local SMTP sink that accepts and counts messages, for exercising the email dispatcher.
+
+    python benchmarks/smtp_sink.py --port 8025 &
+    SMTP_SERVER=127.0.0.1 SMTP_PORT=8025 SMTP_STARTTLS=0 SENDER_EMAIL=bot@example.com \
+        RECEIVER_EMAIL=a@example.com,b@example.com python scraper.py
+
+Only the commands smtplib needs without TLS or AUTH are implemented. With aiosmtpd
+installed, `python -m aiosmtpd -n -l 127.0.0.1:8025` is an equivalent sink.
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency / 1000)
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply('220 sink ready')
+        recipients = []
+
+        for raw in self.rfile:
+            command = raw.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply('250 sink')
+            elif verb == 'MAIL':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.partition(':')[2].strip(' <>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                size = 0
+                for line in self.rfile:
+                    if line in (b'.\r\n', b'.\n'):
+                        break
+                    size += len(line)
+                with self.server.lock:
+                    self.server.messages.append((recipients, size))
+                self.reply('250 OK queued')
+            elif verb == 'RSET':
+                recipients = []
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, latency=0):
+        super().__init__(address, SinkHandler)
+        self.latency = latency
+        self.messages = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+def start_sink(port=0, latency=0):
+    """Start a sink on a background thread; returns it (port in .server_address[1])"""
+    sink = SmtpSink(('127.0.0.1', port), latency=latency)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    return sink
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--latency', type=float, default=0, help='milliseconds added before every reply')
+    args = parser.parse_args()
+
+    sink = SmtpSink(('127.0.0.1', args.port), latency=args.latency)
+    print(f"SMTP sink on 127.0.0.1:{args.port}")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.server_close()
+        print(f"{len(sink.messages)} messages over {sink.connections} connections")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Local stand-in for every upstream the scraper talks to, serving the offline corpus.
+
+Point the scraper at it with UPSTREAM_OVERRIDE, which rewrites
+https://host/path?query to {override}/host/path?query:
+
+    python benchmarks/standin_server.py --port 8765 --latency 40 --scale 150 &
+    UPSTREAM_OVERRIDE=http://127.0.0.1:8765 HOST_MIN_INTERVAL=0 python scraper.py
+
+Responses carry an ETag and answer If-None-Match with 304, so the response cache
+is exercised the same way as against the real snapshot sources. With --volatile,
+HTML pages instead come without validators and with a fresh timestamp comment and
+tracking script on every response, like pages whose only changes are ads and clocks.
+
+With --archive it replays a recording made with `python scraper.py scrape --record
+run.jsonl.gz` instead of the corpus: every URL answers with its recorded responses
+in order (the last one repeating), optionally after its recorded upstream latency.
+--jitter, --error-rate/--error-status and --reset-rate make any upstream slow or
+flaky on top, reproducibly with --seed.
+"""
+import argparse
+import hashlib
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import harness  # noqa: F401 (puts the repo root on sys.path)
+import corpus
+
+# (host, path prefix) -> fixture; first match wins
+ROUTES = [
+    ('webcache.googleusercontent.com', '/search', 'explore_cards.html'),
+    ('archive.today', '/newest/', 'archive_snapshot.html'),
+    ('web.archive.org', '/web/', 'archive_snapshot.html'),
+    ('m.bookmyshow.com', '/explore/', 'mobile_listing.html'),
+    ('in.bookmyshow.com', '/mobile/', 'mobile_listing.html'),
+    ('in.bookmyshow.com', '/api/', 'api_events.json'),
+    ('in.bookmyshow.com', '/serv/', 'api_events.json'),
+    ('in.bookmyshow.com', '/bms/', 'api_events.json'),
+    ('in.bookmyshow.com', '/events/', 'event_detail.html'),
+    ('in.bookmyshow.com', '/explore/', 'explore_next_data.html')
+]
+
+CONTENT_TYPES = {'.json': 'application/json', '.txt': 'text/plain', '.html': 'text/html'}
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real hosts
+
+    def do_GET(self):
+        host, _, path = self.path.lstrip('/').partition('/')
+        path = '/' + path
+        options = self.server.options
+        with self.server.lock:
+            self.server.arrivals.setdefault(host, []).append(time.monotonic())
+
+        latency = options['latency'] + self.server.random() * options['jitter']
+        if latency:
+            time.sleep(latency / 1000)
+
+        if host in options['dead']:
+            return self.send_body(404, b'Not Found', 'text/plain')
+        if host in options['failing']:
+            return self.send_body(503, b'Service Unavailable', 'text/plain', {'Retry-After': '1'})
+
+        if self.server.random() < options['reset_rate']:
+            # Drop the connection without an answer, like a flaky upstream or middlebox
+            self.close_connection = True
+            return
+        if self.server.random() < options['error_rate']:
+            status = options['error_statuses'][int(self.server.random() * len(options['error_statuses']))]
+            return self.send_body(status, b'Injected error', 'text/plain', {'Retry-After': '1'} if status in (429, 503) else None)
+
+        if self.server.archive is not None:
+            return self.replay()
+
+        for route_host, prefix, fixture in ROUTES:
+            if host == route_host and path.startswith(prefix):
+                body, etag = self.server.page(fixture)
+                if options['volatile'] and fixture.endswith('.html'):
+                    served = time.time()
+                    noise = f'<!-- served {served} --><script>window.__ts = {served};</script>'.encode('utf-8')
+                    body = body.replace(b'</body>', noise + b'</body>', 1)
+                    etag = None
+                if etag and self.headers.get('If-None-Match') == etag:
+                    return self.send_body(304, b'', None, {'ETag': etag})
+                content_type = CONTENT_TYPES[os.path.splitext(fixture)[1]]
+                return self.send_body(200, body, f'{content_type}; charset=utf-8', {'ETag': etag} if etag else None)
+
+        self.send_body(404, b'Not Found', 'text/plain')
+
+    def replay(self):
+        """Answer with the next recorded response for this URL"""
+        entry = self.server.next_entry(self.path)
+        if entry is None:
+            return self.send_body(404, b'Not Found', 'text/plain')
+        if self.server.options['recorded_latency']:
+            time.sleep(entry['elapsed'])
+
+        headers = dict(entry['headers'])
+        etag = next((value for name, value in headers.items() if name.lower() == 'etag'), None)
+        if entry['status'] == 200 and etag and self.headers.get('If-None-Match') == etag:
+            return self.send_body(304, b'', None, {'ETag': etag})
+        self.send_body(entry['status'], entry['body'], None, headers)
+
+    def send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.requests += 1
+
+    def log_message(self, format, *args):
+        if self.server.options['verbose']:
+            super().log_message(format, *args)
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0, scale=1, dead=(), failing=(), volatile=False, verbose=False,
+                 archive=None, recorded_latency=False, jitter=0, error_rate=0, error_statuses=(503,),
+                 reset_rate=0, seed=None):
+        super().__init__(address, StandinHandler)
+        self.options = {
+            'latency': latency,
+            'jitter': jitter,
+            'dead': set(dead),
+            'failing': set(failing),
+            'volatile': volatile,
+            'verbose': verbose,
+            'recorded_latency': recorded_latency,
+            'error_rate': error_rate,
+            'error_statuses': list(error_statuses) or [503],
+            'reset_rate': reset_rate
+        }
+        self.rng = random.Random(seed)
+        self.archive = load_archive(archive) if archive else None
+        self.replayed = {}  # request path -> responses already served from its recording
+        self.scale = scale
+        self.pages = {}
+        self.requests = 0
+        self.arrivals = {}  # host -> monotonic arrival times, for checking per-host request rates
+        self.lock = threading.Lock()
+
+    def page(self, fixture):
+        """Encoded (scaled) fixture and its ETag, built once per fixture"""
+        with self.lock:
+            if fixture not in self.pages:
+                if fixture in corpus.LISTING_BLOCKS:
+                    text = corpus.scale_listing(fixture, self.scale)
+                elif fixture == 'api_events.json':
+                    text = corpus.scale_api(self.scale)
+                else:
+                    text = corpus.load(fixture)
+                body = text.encode('utf-8')
+                self.pages[fixture] = (body, '"%s"' % hashlib.sha1(body).hexdigest())
+            return self.pages[fixture]
+
+    def random(self):
+        with self.lock:
+            return self.rng.random()
+
+    def next_entry(self, path):
+        """The recorded response to serve next for a request path: each in turn, then the last again"""
+        entries = self.archive.get(path)
+        if not entries:
+            return None
+        with self.lock:
+            served = self.replayed.get(path, 0)
+            self.replayed[path] = served + 1
+        return entries[min(served, len(entries) - 1)]
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+def load_archive(path):
+    """{request path on the stand-in: [recorded responses in order]} from an HttpArchive file"""
+    from scraper import HttpArchive, rewrite_upstream
+
+    archive = {}
+    for entry in HttpArchive.read(path):
+        archive.setdefault(rewrite_upstream(entry['url'], ''), []).append(entry)
+    return archive
+
+def start_server(port=0, **options):
+    """Start a stand-in server on a background thread; returns it (see .base_url)"""
+    server = StandinServer(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0, help='milliseconds added before every response')
+    parser.add_argument('--scale', type=int, default=1, help='repeat listing cards N times')
+    parser.add_argument('--dead', action='append', default=[], help='host answering 404 (repeatable)')
+    parser.add_argument('--failing', action='append', default=[], help='host answering 503 (repeatable)')
+    parser.add_argument('--volatile', action='store_true', help='HTML without ETags and with per-response noise')
+    parser.add_argument('--archive', default=None, help='replay this recording instead of the corpus')
+    parser.add_argument('--recorded-latency', action='store_true', help='wait each response\'s recorded latency')
+    parser.add_argument('--jitter', type=float, default=0, help='up to this many random extra milliseconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with an error')
+    parser.add_argument('--error-status', type=int, action='append', default=[], help='injected status (default 503)')
+    parser.add_argument('--reset-rate', type=float, default=0, help='fraction of connections dropped unanswered')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    server = StandinServer(('127.0.0.1', args.port), latency=args.latency, scale=args.scale,
+                           dead=args.dead, failing=args.failing, volatile=args.volatile, verbose=args.verbose,
+                           archive=args.archive, recorded_latency=args.recorded_latency, jitter=args.jitter,
+                           error_rate=args.error_rate, error_statuses=args.error_status,
+                           reset_rate=args.reset_rate, seed=args.seed)
+    source = f"{sum(map(len, server.archive.values()))} recorded responses" if args.archive else 'the offline corpus'
+    print(f"Serving {source} on {server.base_url} (UPSTREAM_OVERRIDE={server.base_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
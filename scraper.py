@@ -1,18 +1,2170 @@
-import requests
-from bs4 import BeautifulSoup
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+# requests/urllib3, the HTML parsers (bs4, lxml, selectolax), orjson, smtplib/email and
+# multiprocessing are imported where they are first needed, so commands that never fetch,
+# parse or send mail start without them
+import base64
+import io
 import json
 import os
-from datetime import datetime
+import gzip
+import hashlib
+import importlib.util
+from html import escape
+import math
+import re
+import sqlite3
+from datetime import datetime, date, timedelta
 import time
 import random
+import signal
+import sys
 import urllib.parse
+import itertools
+import bisect
+import threading
+from collections import defaultdict
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext, redirect_stdout
+
+def json_loads(payload):
+    """Decode JSON with orjson if it is installed, else the stdlib
+    
+    The first call imports the decoder and rebinds json_loads to it, so later calls
+    go straight to orjson.loads / json.loads.
+    """
+    global json_loads
+    try:
+        import orjson
+        json_loads = orjson.loads
+    except ImportError:
+        json_loads = json.loads
+    return json_loads(payload)
+
+class RunMetrics:
+    """Thread-safe per-stage timings and counters for one run, exported as a JSON report and Prometheus text"""
+    
+    QUANTILES = (0.5, 0.95)
+    
+    def __init__(self, prefix='bookmyshow'):
+        self.prefix = prefix
+        self.started = time.time()
+        self.samples = defaultdict(list)
+        self.counters = defaultdict(float)
+        self.lock = threading.Lock()
+    
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one observation of `name`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+    
+    def observe(self, name, seconds):
+        with self.lock:
+            self.samples[name].append(seconds)
+    
+    def count(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+    
+    def counter(self, name):
+        """A counter's value summed over all its labels"""
+        with self.lock:
+            return sum(value for (counter, _), value in self.counters.items() if counter == name)
+    
+    @staticmethod
+    def quantile(values, q):
+        """Nearest-rank quantile of an already sorted list"""
+        return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+    
+    def summary(self):
+        """{stage: count, total, mean, p50, p95 and max seconds}"""
+        with self.lock:
+            samples = {name: sorted(values) for name, values in self.samples.items()}
+        
+        summary = {}
+        for name, values in sorted(samples.items()):
+            total = sum(values)
+            summary[name] = {
+                'count': len(values),
+                'total': round(total, 6),
+                'mean': round(total / len(values), 6),
+                'p50': round(self.quantile(values, 0.5), 6),
+                'p95': round(self.quantile(values, 0.95), 6),
+                'max': round(values[-1], 6)
+            }
+        return summary
+    
+    def report(self, **extra):
+        """JSON-serialisable run report: stage timings, counters and whatever the caller adds"""
+        with self.lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+        report = {
+            'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'duration': round(time.time() - self.started, 3),
+            'stages': self.summary(),
+            'counters': counters
+        }
+        report.update(extra)
+        return report
+    
+    def prometheus(self):
+        """Prometheus text exposition format (also readable by node_exporter's textfile collector)"""
+        name = f"{self.prefix}_stage_seconds"
+        lines = [
+            f"# HELP {name} Wall-clock seconds spent per scraper stage in the last run",
+            f"# TYPE {name} summary"
+        ]
+        with self.lock:
+            samples = {stage: sorted(values) for stage, values in self.samples.items()}
+            counters = sorted(self.counters.items())
+        
+        for stage, values in sorted(samples.items()):
+            for q in self.QUANTILES:
+                lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} {self.quantile(values, q):.6f}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {sum(values):.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {len(values)}')
+        
+        declared = set()
+        for (counter, labels), value in counters:
+            metric = f"{self.prefix}_{counter}_total"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            label_text = ','.join(f'{key}="{value_}"' for key, value_ in labels)
+            lines.append(f"{metric}{{{label_text}}} {value:g}" if label_text else f"{metric} {value:g}")
+        
+        lines.append(f"# TYPE {self.prefix}_last_run_timestamp_seconds gauge")
+        lines.append(f"{self.prefix}_last_run_timestamp_seconds {self.started:.0f}")
+        lines.append(f"# TYPE {self.prefix}_last_run_duration_seconds gauge")
+        lines.append(f"{self.prefix}_last_run_duration_seconds {time.time() - self.started:.3f}")
+        return '\n'.join(lines) + '\n'
+
+def find_regressions(report, history, ratio=1.5, min_seconds=0.5):
+    """(stage, baseline, total) for stages whose total time exceeds `ratio` x their median over `history`"""
+    regressions = []
+    for stage, stats in report['stages'].items():
+        totals = sorted(run['stages'][stage]['total'] for run in history if stage in run.get('stages', {}))
+        if not totals:
+            continue
+        baseline = totals[len(totals) // 2]
+        if stats['total'] > baseline * ratio and stats['total'] - baseline > min_seconds:
+            regressions.append((stage, baseline, stats['total']))
+    return regressions
+
+# The RunMetrics of the request being sent on this thread, for the connection classes below
+fetch_context = threading.local()
+
+class TimedConnectionMixin:
+    """Report socket setup time (DNS lookup + TCP connect) to the active RunMetrics"""
+    
+    connect_seconds = 0.0
+    
+    def _new_conn(self):
+        started = time.perf_counter()
+        sock = super()._new_conn()
+        self.connect_seconds = time.perf_counter() - started
+        
+        metrics = getattr(fetch_context, 'metrics', None)
+        if metrics is not None:
+            metrics.observe('fetch_connect', self.connect_seconds)
+        return sock
+
+timed_pool_classes_cache = {}
+
+def timed_pool_classes():
+    """urllib3 pool classes (by scheme) whose connections report connect/TLS time; built on first use"""
+    if not timed_pool_classes_cache:
+        from urllib3.connection import HTTPConnection, HTTPSConnection
+        from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+        
+        class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+            pass
+        
+        class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+            def connect(self):
+                """Connect, then report the TLS handshake as whatever connect() took beyond the socket setup"""
+                started = time.perf_counter()
+                self.connect_seconds = 0.0
+                super().connect()
+                
+                metrics = getattr(fetch_context, 'metrics', None)
+                if metrics is not None:
+                    metrics.observe('fetch_tls', max(time.perf_counter() - started - self.connect_seconds, 0.0))
+        
+        class TimedHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = TimedHTTPConnection
+        
+        class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = TimedHTTPSConnection
+        
+        timed_pool_classes_cache.update({'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool})
+    return timed_pool_classes_cache
+
+class HttpTransport:
+    """Pooled keep-alive HTTP session shared by every fetch method (requests is imported on first use)"""
+    
+    def __init__(self, pool_size=4, host_pool_sizes=None, retries=2, backoff=0.5, timeout=30, host_pools=16):
+        self.timeout = timeout
+        self.pool_size = pool_size  # connections kept per host
+        self.host_pools = host_pools  # per-host pools kept before the least recently used is closed
+        self.host_pool_sizes = host_pool_sizes or {}
+        self.retries = retries
+        self.backoff = backoff
+        self.adapters = []
+        self.metrics = None  # RunMetrics receiving connect/TLS/TTFB/download timings, if any
+        self._session = None
+        self.session_lock = threading.Lock()
+    
+    @property
+    def session(self):
+        with self.session_lock:
+            if self._session is None:
+                self._session = self.make_session()
+            return self._session
+    
+    def make_session(self):
+        import requests
+        from urllib3.util.retry import Retry
+        
+        session = requests.Session()
+        # Retry connection errors and 5xx responses with exponential backoff; 429/503 come back
+        # to the caller so HostRateLimiter can pause that host instead of sleeping in this thread
+        self.retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=(500, 502, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+        
+        default_adapter = self.make_adapter(self.pool_size)
+        session.mount('https://', default_adapter)
+        session.mount('http://', default_adapter)
+        
+        # Hosts we hit harder (e.g. several API URLs) can get their own, bigger pool
+        for host, size in self.host_pool_sizes.items():
+            adapter = self.make_adapter(size)
+            session.mount(f'https://{host}/', adapter)
+            session.mount(f'http://{host}/', adapter)
+        return session
+    
+    @classmethod
+    def from_env(cls):
+        """Build a transport from HTTP_* environment variables"""
+        host_pool_sizes = {}
+        for item in os.environ.get('HTTP_HOST_POOL_SIZES', '').split(','):
+            if '=' in item:
+                host, size = item.split('=', 1)
+                host_pool_sizes[host.strip()] = int(size)
+        
+        return cls(
+            pool_size=int(os.environ.get('HTTP_POOL_SIZE', '4')),
+            host_pools=int(os.environ.get('HTTP_HOST_POOLS', '16')),
+            host_pool_sizes=host_pool_sizes,
+            retries=int(os.environ.get('HTTP_RETRIES', '2')),
+            backoff=float(os.environ.get('HTTP_BACKOFF', '0.5'))
+        )
+    
+    def make_adapter(self, pool_size):
+        """Create an HTTPAdapter keeping up to pool_size connections per host, with the shared retry policy"""
+        from requests.adapters import HTTPAdapter
+        
+        # pool_connections is how many hosts keep a pool, not connections per host: below the
+        # number of hosts a crawl touches, pools are evicted in turn and nothing is reused
+        adapter = HTTPAdapter(pool_connections=self.host_pools, pool_maxsize=pool_size, max_retries=self.retry)
+        adapter.poolmanager.pool_classes_by_scheme = dict(timed_pool_classes())
+        self.adapters.append(adapter)
+        return adapter
+    
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        """GET through the pooled session, timing time-to-first-byte and (unless streamed) the download"""
+        fetch_context.metrics = self.metrics
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, headers=headers, timeout=timeout or self.timeout, **kwargs)
+        finally:
+            fetch_context.metrics = None
+        
+        if self.metrics is not None:
+            # requests' elapsed runs from sending the request until the headers are parsed
+            ttfb = response.elapsed.total_seconds()
+            self.metrics.observe('fetch_ttfb', ttfb)
+            if not kwargs.get('stream'):
+                self.metrics.observe('fetch_download', max(time.perf_counter() - started - ttfb, 0.0))
+            self.metrics.count('http_responses', status=response.status_code)
+        return response
+    
+    def stats(self):
+        """Connection reuse stats summed over every per-host connection pool"""
+        connections = 0
+        requests_made = 0
+        hosts = 0
+        
+        for adapter in self.adapters:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                hosts += 1
+                connections += pool.num_connections
+                requests_made += pool.num_requests
+        
+        return {
+            'hosts': hosts,
+            'requests': requests_made,
+            'connections_opened': connections,
+            'connections_reused': max(requests_made - connections, 0)
+        }
+    
+    def close(self):
+        """Close the session and every pooled connection"""
+        if self._session is not None:
+            self._session.close()
+
+class HttpArchive:
+    """Append-only record of HTTP responses for replaying a run offline (a compact take on WARC)
+    
+    One gzip-compressed JSON line per response, after a header line: URL, status,
+    headers, the upstream's time to first byte and the body (text, or base64 when it
+    is not UTF-8). A body already in the archive is stored once and referred to by
+    its SHA-1, like a WARC revisit record, so repeated polls of unchanged pages cost
+    a few dozen bytes each.
+    """
+    
+    FORMAT = 'bookmyshow-http-archive'
+    # The stored body is already decoded and de-chunked
+    SKIP_HEADERS = frozenset(['content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'])
+    
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.digests = set()
+        self.records = 0
+        self.closed = False
+        self.lock = threading.Lock()
+    
+    def record(self, url, response, elapsed):
+        """Append one response (reading its body, even if it was requested streamed)"""
+        body = response.content or b''
+        digest = hashlib.sha1(body).hexdigest()
+        entry = {
+            'url': url,
+            'status': response.status_code,
+            'headers': {name: value for name, value in response.headers.items()
+                        if name.lower() not in self.SKIP_HEADERS},
+            'elapsed': round(elapsed, 4),
+            'recorded': datetime.now().isoformat(timespec='seconds'),
+            'digest': digest
+        }
+        
+        with self.lock:
+            # Race-mode losers can finish after the run closed the archive
+            if self.closed:
+                return
+            if digest not in self.digests:
+                try:
+                    entry['body'] = body.decode('utf-8')
+                except UnicodeDecodeError:
+                    entry['body'] = base64.b64encode(body).decode('ascii')
+                    entry['encoding'] = 'base64'
+                self.digests.add(digest)
+            
+            if self.file is None:
+                self.file = gzip.open(self.path, 'wt', encoding='utf-8', compresslevel=6)
+                self.file.write(json.dumps({'format': self.FORMAT, 'version': 1}) + '\n')
+            self.file.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+            self.records += 1
+    
+    def close(self):
+        with self.lock:
+            self.closed = True
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+    
+    @classmethod
+    def read(cls, path):
+        """Yield the archived responses in order, each with its body as bytes"""
+        bodies = {}
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            header = json.loads(f.readline() or '{}')
+            if header.get('format') != cls.FORMAT:
+                raise ValueError(f"{path} is not an HTTP archive")
+            
+            for line in f:
+                entry = json.loads(line)
+                if 'body' in entry:
+                    body = entry.pop('body')
+                    if entry.pop('encoding', None) == 'base64':
+                        bodies[entry['digest']] = base64.b64decode(body)
+                    else:
+                        bodies[entry['digest']] = body.encode('utf-8')
+                entry['body'] = bodies[entry['digest']]
+                yield entry
+
+class CachedResponse:
+    """Response stand-in rebuilt from the on-disk cache after a 304 Not Modified"""
+    
+    def __init__(self, url, body, headers, events):
+        self.url = url
+        self.status_code = 200
+        self.text = body
+        self.headers = headers
+        self.events = events
+        self.not_modified = True
+    
+    def json(self):
+        return json.loads(self.text)
+    
+    def close(self):
+        pass
+
+class ResponseCache:
+    """Persistent URL-keyed response cache with ETag/Last-Modified validators and LRU eviction"""
+    
+    def __init__(self, directory='.http_cache', max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(directory, 'index.json')
+        self.lock = threading.Lock()
+        self.index = self.load_index()
+        self.dirty = False  # access times changed since the index was last written
+    
+    def load_index(self):
+        """Load the cache index (url -> validators, body file, size, last access, events)"""
+        try:
+            if os.path.exists(self.index_file):
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Error loading response cache index: {e}")
+        return {}
+    
+    def save_index(self):
+        """Write the index atomically so a killed run can't leave it half-written"""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False)
+        os.replace(tmp_file, self.index_file)
+        self.dirty = False
+    
+    def flush(self):
+        """Write the index if cache hits have updated access times since it was last saved"""
+        with self.lock:
+            if self.dirty:
+                self.save_index()
+    
+    def body_path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.html.gz')
+    
+    def validators(self, url, digest=None):
+        """Conditional request headers for a URL we have cached (none if a 304 would leave nothing to reuse)"""
+        entry = self.index.get(url)
+        headers = {}
+        if entry and (entry['size'] or entry.get('digest') == digest):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def get(self, url, digest=None):
+        """Rebuild the cached response for a URL, or None if it was never stored
+        
+        Cached events are only returned if they were extracted with settings hashing to
+        `digest` (see BookMyShowScraper.extraction_digest); otherwise the body is re-extracted.
+        """
+        with self.lock:
+            entry = self.index.get(url)
+            if not entry:
+                return None
+            
+            body = None
+            if entry['size']:
+                try:
+                    with gzip.open(self.body_path(url), 'rt', encoding='utf-8') as f:
+                        body = f.read()
+                except Exception as e:
+                    print(f"⚠️ Cached body for {url} unreadable: {e}")
+            
+            events = entry.get('events') if entry.get('digest') == digest else None
+            # Streamed responses only keep their events; without either there is nothing to reuse
+            if body is None and events is None:
+                return None
+            
+            # Only LRU order depends on this, so it is written once at the end of the run
+            entry['accessed'] = time.time()
+            self.dirty = True
+        
+        headers = {}
+        if entry.get('etag'):
+            headers['ETag'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['Last-Modified'] = entry['last_modified']
+        if events is not None:
+            events = [Event.from_dict(event) for event in events]
+        return CachedResponse(url, body, headers, events)
+    
+    def store(self, url, headers, body, events, digest=None):
+        """Store a response body (gzip-compressed, if there is one) with its validators, events and extraction digest"""
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        
+        # Nothing to revalidate against next time, so don't spend disk on it
+        if not etag and not last_modified:
+            return
+        
+        with self.lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                path = self.body_path(url)
+                size = 0
+                if body is not None:
+                    with gzip.open(path, 'wt', encoding='utf-8') as f:
+                        f.write(body)
+                    size = os.path.getsize(path)
+                elif os.path.exists(path):
+                    os.remove(path)
+                
+                self.index[url] = {
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'size': size,
+                    'accessed': time.time(),
+                    'events': [dict(event) for event in events],
+                    'digest': digest
+                }
+                self.evict()
+                self.save_index()
+            except Exception as e:
+                print(f"⚠️ Error caching {url}: {e}")
+    
+    def evict(self):
+        """Drop least recently used entries until the bodies fit in max_bytes"""
+        total = sum(entry['size'] for entry in self.index.values())
+        
+        for url, entry in sorted(self.index.items(), key=lambda item: item[1]['accessed']):
+            if total <= self.max_bytes:
+                break
+            if entry['size']:
+                try:
+                    os.remove(self.body_path(url))
+                except OSError:
+                    pass
+            total -= entry['size']
+            del self.index[url]
+
+# Listing card selectors, in priority order: the first one matching 3+ nodes wins
+CARD_SELECTORS = [
+    '[data-testid*="event"]',
+    '.event-card', '.eventCard',
+    '.event-item', '.eventItem',
+    '.listing-card', '.listingCard',
+    'div[class*="event"]',
+    'article[class*="event"]',
+    '.card[href*="/events/"]',
+    'a[href*="/events/"]'
+]
+
+# Used when no card selector matches enough nodes
+FALLBACK_CARD_SELECTORS = ['a[href*="events"]']
+
+# Per-card field selectors, in priority order
+FIELD_SELECTORS = {
+    'title': ['h1', 'h2', 'h3', 'h4', '[data-testid*="title"]', '.title', '.name'],
+    'date': [
+        '[data-testid*="date"]', '.date', '.event-date',
+        'time', '.datetime', '[class*="date"]'
+    ],
+    'venue': [
+        '[data-testid*="venue"]', '.venue', '.location',
+        '[class*="venue"]', '[class*="location"]'
+    ],
+    'price': [
+        '[data-testid*="price"]', '.price', '[class*="price"]',
+        '[class*="cost"]', '.amount'
+    ]
+}
+
+SELECTOR_TOKEN_RE = re.compile(r'([a-zA-Z][\w-]*)|\.([\w-]+)|\[([\w-]+)(?:([*^$]?=)"([^"]*)")?\]')
+
+class SelectorRule:
+    """One simple CSS selector (tag, .class and [attr op "value"] parts) compiled to a predicate"""
+    
+    def __init__(self, selector, group, index):
+        self.selector = selector
+        self.group = group
+        self.index = index
+        self.tag = None
+        self.classes = []
+        self.attrs = []
+        
+        position = 0
+        for match in SELECTOR_TOKEN_RE.finditer(selector):
+            if match.start() != position:
+                break
+            tag, class_name, attr, op, value = match.groups()
+            if tag:
+                self.tag = tag.lower()
+            elif class_name:
+                self.classes.append(class_name)
+            else:
+                self.attrs.append((attr.lower(), op, value))
+            position = match.end()
+        
+        if position != len(selector) or position == 0:
+            raise ValueError(f"Unsupported selector: {selector}")
+    
+    def dispatch_key(self):
+        """The cheapest property a node must have for this rule to possibly match"""
+        if self.tag:
+            return ('tag', self.tag)
+        if self.classes:
+            return ('class', self.classes[0])
+        return ('attr', self.attrs[0][0])
+    
+    def matches(self, name, classes, attrs):
+        if self.tag and self.tag != name:
+            return False
+        for class_name in self.classes:
+            if class_name not in classes:
+                return False
+        for attr, op, value in self.attrs:
+            actual = attrs.get(attr)
+            if actual is None:
+                return False
+            if op == '*=' and (not value or value not in actual):
+                return False
+            if op == '^=' and (not value or not actual.startswith(value)):
+                return False
+            if op == '$=' and (not value or not actual.endswith(value)):
+                return False
+            if op == '=' and actual != value:
+                return False
+        return True
+
+class SelectorEngine:
+    """Classifies nodes against whole groups of selectors in a single traversal"""
+    
+    def __init__(self, groups):
+        self.groups = {group: len(selectors) for group, selectors in groups.items()}
+        self.rules = {}
+        
+        # Index rules by tag / class / attribute name so each node only tests rules it could match
+        for group, selectors in groups.items():
+            for index, selector in enumerate(selectors):
+                rule = SelectorRule(selector, group, index)
+                self.rules.setdefault(rule.dispatch_key(), []).append(rule)
+    
+    def classify(self, node, backend):
+        """Every rule (from any group) that matches a single node"""
+        name, classes, attrs = backend.describe(node)
+        rules = self.rules
+        
+        candidates = rules.get(('tag', name), [])
+        for class_name in classes:
+            candidates = candidates + rules.get(('class', class_name), [])
+        for attr in attrs:
+            candidates = candidates + rules.get(('attr', attr), [])
+        
+        return [rule for rule in candidates if rule.matches(name, classes, attrs)]
+    
+    def scan(self, nodes, backend, first_only=False):
+        """Match every node once; returns {group: [matches per selector]} in document order
+        
+        With first_only each entry is the first matching node (or None) instead of a list.
+        """
+        if first_only:
+            results = {group: [None] * size for group, size in self.groups.items()}
+        else:
+            results = {group: [[] for _ in range(size)] for group, size in self.groups.items()}
+        
+        for node in nodes:
+            for rule in self.classify(node, backend):
+                if first_only:
+                    if results[rule.group][rule.index] is None:
+                        results[rule.group][rule.index] = node
+                else:
+                    results[rule.group][rule.index].append(node)
+        
+        return results
+
+# Text inside these tags is never part of an element's visible text
+NON_TEXT_TAGS = ('script', 'style', 'template')
+
+class Bs4Backend:
+    """BeautifulSoup tree built with the stdlib html.parser"""
+    name = 'html.parser'
+    
+    def parse(self, html_content):
+        from bs4 import BeautifulSoup
+        return BeautifulSoup(html_content, 'html.parser')
+    
+    def iter_all(self, document):
+        """Every element of the document, in document order"""
+        return document.find_all(True)
+    
+    def descendants(self, node):
+        """Every element below node (node itself excluded), in document order"""
+        return node.find_all(True)
+    
+    def describe(self, node):
+        """(tag name, class list, attributes as strings) for selector matching"""
+        attrs = {}
+        for attr, value in node.attrs.items():
+            attrs[attr] = ' '.join(value) if isinstance(value, list) else value
+        return node.name, node.get('class') or [], attrs
+    
+    def text(self, node):
+        return node.get_text(strip=True)
+    
+    def attr(self, node, name):
+        return node.get(name)
+    
+    def find(self, node, tag):
+        return node.find(tag)
+    
+    def outer_html(self, node):
+        """The node's markup as bytes (for fingerprinting)"""
+        return str(node).encode('utf-8')
+    
+    def node_id(self, node):
+        """A key identifying the node within its document"""
+        return id(node)
+
+class LxmlBackend:
+    """Native lxml.html tree (libxml2 parser)"""
+    name = 'lxml'
+    
+    def parse(self, html_content):
+        from lxml import html as lxml_html
+        try:
+            return lxml_html.document_fromstring(html_content)
+        except ValueError:
+            # Unicode strings with an XML encoding declaration must be handed over as bytes
+            return lxml_html.document_fromstring(html_content.encode('utf-8'))
+    
+    def iter_all(self, document):
+        from lxml import etree
+        return document.iter(etree.Element)
+    
+    def descendants(self, node):
+        from lxml import etree
+        return node.iterdescendants(etree.Element)
+    
+    def describe(self, node):
+        attrs = dict(node.attrib)
+        return node.tag, attrs.get('class', '').split(), attrs
+    
+    def text(self, node):
+        strings = node.xpath('.//text()[not(parent::script or parent::style or parent::template)]')
+        return ''.join(s.strip() for s in strings)
+    
+    def attr(self, node, name):
+        return node.get(name)
+    
+    def find(self, node, tag):
+        return next(node.iterdescendants(tag), None)
+    
+    def outer_html(self, node):
+        from lxml import etree
+        return etree.tostring(node, with_tail=False)
+    
+    def node_id(self, node):
+        # lxml hands out the same proxy for a node while any reference to it is alive
+        return id(node)
+
+class SelectolaxBackend:
+    """selectolax tree built by the lexbor HTML5 engine"""
+    name = 'selectolax'
+    
+    def parse(self, html_content):
+        from selectolax.lexbor import LexborHTMLParser
+        return LexborHTMLParser(html_content)
+    
+    def iter_all(self, document):
+        if document.root is None:
+            return []
+        return (node for node in document.root.traverse() if not node.tag.startswith('-'))
+    
+    def descendants(self, node):
+        elements = (child for child in node.traverse() if not child.tag.startswith('-'))
+        return itertools.islice(elements, 1, None)
+    
+    def describe(self, node):
+        attrs = {attr: value or '' for attr, value in node.attributes.items()}
+        return node.tag, attrs.get('class', '').split(), attrs
+    
+    def text(self, node):
+        strings = []
+        for child in node.traverse(include_text=True):
+            if child.tag == '-text' and child.parent.tag not in NON_TEXT_TAGS:
+                strings.append(child.text_content.strip())
+        return ''.join(strings)
+    
+    def attr(self, node, name):
+        return node.attributes.get(name)
+    
+    def find(self, node, tag):
+        return next((child for child in self.descendants(node) if child.tag == tag), None)
+    
+    def outer_html(self, node):
+        return (node.html or '').encode('utf-8')
+    
+    def node_id(self, node):
+        # Node wrappers are created afresh on every traversal; mem_id is the lexbor node itself
+        return node.mem_id
+
+PARSER_BACKENDS = {
+    'html.parser': Bs4Backend,
+    'lxml': LxmlBackend,
+    'selectolax': SelectolaxBackend
+}
+
+def available_parser_backends():
+    """Names of the parser backends whose libraries are installed, fastest first (without importing them)"""
+    available = []
+    if importlib.util.find_spec('selectolax.lexbor') is not None:
+        available.append('selectolax')
+    if importlib.util.find_spec('lxml') is not None:
+        available.append('lxml')
+    available.append('html.parser')
+    return available
+
+def get_parser_backend(name='auto'):
+    """Instantiate a parser backend by name; 'auto' picks the fastest one installed"""
+    available = available_parser_backends()
+    
+    if name == 'auto':
+        name = available[0]
+    elif name not in available:
+        print(f"⚠️ HTML parser '{name}' not available, falling back to html.parser")
+        name = 'html.parser'
+    
+    return PARSER_BACKENDS[name]()
+
+# Detail-page selectors used by the enrichment stage, in priority order
+DETAIL_SELECTORS = {
+    'date': FIELD_SELECTORS['date'],
+    'venue': FIELD_SELECTORS['venue'],
+    'price': FIELD_SELECTORS['price'],
+    'lineup': ['[data-testid*="artist"]', '[class*="artist"]', '[class*="lineup"]', '[class*="performer"]']
+}
+
+# Script payloads that carry a page's listing data, as (marker, kind)
+EMBEDDED_JSON_MARKERS = [
+    ('id="__NEXT_DATA__"', 'script'),
+    ('type="application/ld+json"', 'script'),
+    ('window.__INITIAL_STATE__', 'assignment')
+]
+
+TITLE_KEYS = ('name', 'title', 'eventName')
+EVENT_DETAIL_KEYS = ('date', 'eventDate', 'startDate', 'url', 'bookingUrl', 'venue', 'location')
+
+def is_event_like(item):
+    """Whether a JSON object looks like an event (has a title plus a date, URL or venue)"""
+    if not isinstance(item, dict):
+        return False
+    if str(item.get('@type', '')).endswith('Event'):
+        return True
+    return any(isinstance(item.get(key), str) for key in TITLE_KEYS) and any(key in item for key in EVENT_DETAIL_KEYS)
+
+def find_event_list(payload):
+    """The largest list of event-like objects anywhere in a decoded JSON payload"""
+    best = []
+    stack = [payload]
+    
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            # schema.org ItemList wraps each event in a ListItem
+            items = [item.get('item') if isinstance(item, dict) and isinstance(item.get('item'), dict) else item
+                     for item in node]
+            events = [item for item in items if is_event_like(item)]
+            if len(events) > len(best):
+                best = events
+            stack.extend(items)
+    
+    return best
+
+# (city, category) crawled when SCRAPE_TARGETS is not set
+DEFAULT_TARGET = ('mumbai', 'music-shows')
+
+def parse_targets(spec):
+    """Parse 'mumbai:music-shows,pune:comedy-shows' into (city, category) tuples"""
+    targets = []
+    for item in spec.split(','):
+        item = item.strip().lower()
+        if not item:
+            continue
+        city, _, category = item.partition(':')
+        targets.append((city, category or DEFAULT_TARGET[1]))
+    return targets or [DEFAULT_TARGET]
+
+def listing_url(target):
+    """BookMyShow explore page for a (city, category) target"""
+    city, category = target
+    return f"https://in.bookmyshow.com/explore/events-{city}?categories={category}"
+
+def city_name(target):
+    return target[0].replace('-', ' ').title()
+
+def placeholder_values(target):
+    """Per field, the values extraction fills in when a listing doesn't give one"""
+    return {
+        'date': ('', 'Check website'),
+        'venue': ('', city_name(target)),
+        'price': ('', 'Check website')
+    }
+
+# Keywords a card title or text line must contain to count as an event of that category. The text
+# fallback also drops lines with an exclude keyword (page chrome); unlisted categories use DEFAULT_TARGET's.
+CATEGORY_KEYWORDS = {
+    'music-shows': {
+        'include': ['music', 'concert', 'live', 'show', 'performance', 'gig', 'festival'],
+        'exclude': ['menu', 'login', 'sign up', 'footer', 'header', 'search']
+    },
+    'comedy-shows': {
+        'include': ['comedy', 'comic', 'stand-up', 'standup', 'stand up', 'open mic', 'roast', 'improv', 'show', 'live'],
+        'exclude': ['menu', 'login', 'sign up', 'footer', 'header', 'search']
+    },
+    'performances': {
+        'include': ['theatre', 'theater', 'play', 'dance', 'drama', 'musical', 'performance', 'show', 'live'],
+        'exclude': ['menu', 'login', 'sign up', 'footer', 'header', 'search']
+    }
+}
+
+class KeywordMatcher:
+    """Include / exclude keyword sets, each compiled into one alternation matched against lowercased text
+    
+    Lowercasing a short line and running a case-sensitive pattern is several times
+    faster than an IGNORECASE pattern in the re engine. The include set is also
+    compiled for bytes, so raw and streamed pages can be checked without decoding.
+    """
+    
+    def __init__(self, include, exclude=()):
+        self.include = self.compile(include)
+        self.exclude = self.compile(exclude)
+        self.include_bytes = re.compile(self.include.pattern.encode('utf-8')) if self.include is not None else None
+        self.longest = max((len(keyword.encode('utf-8')) for keyword in include if keyword), default=0)
+    
+    @staticmethod
+    def compile(keywords):
+        if not any(keywords):
+            return None
+        # Longest first, so a keyword is never shadowed by one of its own prefixes
+        ordered = sorted(set(keyword.lower() for keyword in keywords if keyword), key=len, reverse=True)
+        return re.compile('|'.join(re.escape(keyword) for keyword in ordered))
+    
+    def has_keyword(self, text):
+        """Whether lowercased `text` (str or bytes) contains an include keyword"""
+        pattern = self.include_bytes if isinstance(text, bytes) else self.include
+        return pattern is not None and pattern.search(text.lower()) is not None
+    
+    def iter_lines(self, text, min_length=0, max_length=None):
+        """Stripped lines with an include keyword and no exclude keyword, in one lazy scan of the raw text
+        
+        Lines are sliced out one at a time rather than splitting the whole page, so the
+        scan stops as soon as the caller has enough; the length check runs before the
+        (single) regex search, so long markup lines are never searched at all.
+        """
+        if self.include is None:
+            return
+        
+        include = self.include.search
+        exclude = self.exclude.search if self.exclude is not None else None
+        position = 0
+        size = len(text)
+        
+        while position <= size:
+            end = text.find('\n', position)
+            if end == -1:
+                end = size
+            line = text[position:end]
+            position = end + 1
+            
+            if len(line) < min_length:
+                continue
+            line = line.strip()
+            if len(line) < min_length or (max_length is not None and len(line) > max_length):
+                continue
+            lowered = line.lower()
+            if include(lowered) is None or (exclude is not None and exclude(lowered) is not None):
+                continue
+            yield line
+
+# Pages from third-party caches must at least mention the site to count as usable
+SITE_KEYWORD = KeywordMatcher(['bookmyshow'])
+
+def load_category_keywords(path=None):
+    """CATEGORY_KEYWORDS, with categories from an optional JSON file (same shape) added or replaced"""
+    keywords = dict(CATEGORY_KEYWORDS)
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            keywords.update(json.load(f))
+    return keywords
+
+def event_target(event):
+    """The (city, category) target an event was scraped for"""
+    return (event.get('city') or DEFAULT_TARGET[0], event.get('category') or DEFAULT_TARGET[1])
+
+def target_label(target):
+    """Human label such as 'Mumbai Music'"""
+    return f"{city_name(target)} {target[1].split('-')[0].title()}"
+
+def rewrite_upstream(url, base):
+    """Route a URL through a stand-in server: https://host/path?q -> {base}/host/path?q"""
+    parts = urllib.parse.urlsplit(url)
+    query = f"?{parts.query}" if parts.query else ''
+    return f"{base.rstrip('/')}/{parts.netloc}{parts.path or '/'}{query}"
+
+EVENT_CODE_RE = re.compile(r'\b(ET\d{8})\b', re.IGNORECASE)
+EVENT_SLUG_RE = re.compile(r'/events/([a-z0-9][a-z0-9-]*)', re.IGNORECASE)
+ISO_DATE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+DAY_MONTH_RE = re.compile(r'(\d{1,2})(?:st|nd|rd|th)?\s+([a-z]{3})[a-z]*\.?,?(?:\s+(\d{4}))?', re.IGNORECASE)
+MONTH_DAY_RE = re.compile(r'([a-z]{3})[a-z]*\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?(?:\s+(\d{4}))?', re.IGNORECASE)
+MONTHS = {name: number for number, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], 1)}
+
+# Near-duplicate titles: MinHash over character trigrams, banded for LSH lookups.
+# 10 bands of 3 rows find pairs at Jaccard 0.7 ~98% of the time and pairs at 0.3 ~24%;
+# candidates are then verified with the exact trigram Jaccard.
+MINHASH_BANDS = 10
+MINHASH_ROWS = 3
+NEAR_DUPLICATE_JACCARD = 0.7
+MINHASH_PRIME = (1 << 61) - 1
+MINHASH_PERMUTATIONS = [
+    (random.Random(seed).randrange(1, MINHASH_PRIME), random.Random(-seed - 1).randrange(MINHASH_PRIME))
+    for seed in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+
+def event_code(url):
+    """BookMyShow event code (ET00123456) from an event URL, or ''"""
+    match = EVENT_CODE_RE.search(url or '')
+    return match.group(1).upper() if match else ''
+
+def url_slug(url):
+    """The /events/<slug> part of an event URL, or '' for listing/other pages"""
+    match = EVENT_SLUG_RE.search(url or '')
+    return match.group(1).lower() if match else ''
+
+def normalize_title(title):
+    """Lowercase, punctuation-free, single-spaced title"""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', (title or '').lower()).split())
+
+def parse_event_date(text, today=None):
+    """Best-effort ISO date (YYYY-MM-DD) from a listing date string, or '' if none
+    
+    Dates without a year get the next occurrence, allowing for events that started
+    up to 60 days ago.
+    """
+    text = text or ''
+    match = ISO_DATE_RE.search(text)
+    if match:
+        return '-'.join(match.groups())
+    
+    day = month = year = None
+    match = DAY_MONTH_RE.search(text)
+    if match and match.group(2).lower() in MONTHS:
+        day, month, year = int(match.group(1)), MONTHS[match.group(2).lower()], match.group(3)
+    else:
+        match = MONTH_DAY_RE.search(text)
+        if match and match.group(1).lower() in MONTHS:
+            day, month, year = int(match.group(2)), MONTHS[match.group(1).lower()], match.group(3)
+    if not day:
+        return ''
+    
+    today = today or date.today()
+    try:
+        if year:
+            return date(int(year), month, day).isoformat()
+        parsed = date(today.year, month, day)
+        if parsed < today - timedelta(days=60):
+            parsed = date(today.year + 1, month, day)
+        return parsed.isoformat()
+    except ValueError:
+        return ''
+
+def title_trigrams(title):
+    """Character trigrams of a normalized title"""
+    text = f" {title} "
+    return {text[i:i + 3] for i in range(max(len(text) - 2, 1))}
+
+def trigram_jaccard(first, second):
+    a, b = title_trigrams(first), title_trigrams(second)
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def title_bands(title):
+    """(band number, band hash) LSH keys of a normalized title's MinHash signature"""
+    hashes = [int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest(), 'big')
+              for gram in title_trigrams(title)]
+    signature = [min((a * h + b) % MINHASH_PRIME for h in hashes) for a, b in MINHASH_PERMUTATIONS]
+    
+    bands = []
+    for band in range(MINHASH_BANDS):
+        rows = signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]
+        digest = hashlib.blake2b(repr(rows).encode('ascii'), digest_size=8).digest()
+        bands.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return bands
+
+def fuzzy_identity(event, title=None):
+    """(normalized title, parsed date, code, slug, target) that identity matching compares"""
+    url = event.get('url')
+    return (title or normalize_title(event.get('title')), parse_event_date(event.get('date')),
+            event_code(url), url_slug(url), event_target(event))
+
+def compatible_identities(identity, other, same_target=True):
+    """False when both events carry different codes or slugs, or (with same_target) belong to different targets"""
+    for mine, theirs in zip(identity[2:4], other[2:4]):
+        if mine and theirs and mine != theirs:
+            return False
+    return not same_target or identity[4] == other[4]
+
+def is_near_duplicate(identity, other):
+    """Near-identical titles on compatible dates, for the same target and without conflicting codes/slugs"""
+    return (compatible_identities(identity, other) and same_event_date(identity[1], other[1])
+            and trigram_jaccard(identity[0], other[0]) >= NEAR_DUPLICATE_JACCARD)
+
+def key_match_allowed(key, identity, other):
+    """A code key always identifies; a slug key must not contradict codes, a title key must also share the target"""
+    return key.startswith('code:') or compatible_identities(identity, other, same_target=key.startswith('title:'))
+
+def identity_keys(event):
+    """Exact identity keys of an event, strongest first"""
+    keys = []
+    code = event_code(event.get('url'))
+    if code:
+        keys.append(f"code:{code}")
+    slug = url_slug(event.get('url'))
+    if slug:
+        keys.append(f"slug:{slug}")
+    title = normalize_title(event.get('title'))
+    if title:
+        keys.append(f"title:{title}|{parse_event_date(event.get('date'))}")
+    return keys
+
+def make_event_id(event):
+    """Stable event id: BookMyShow code, else URL slug, else normalized title + parsed date"""
+    keys = identity_keys(event)
+    return keys[0].replace(' ', '_') if keys else 'event'
+
+def same_event_date(first, second):
+    """Dates are compatible when equal or when either side is unknown"""
+    return not first or not second or first == second
+
+EVENT_FIELDS = ('id', 'title', 'date', 'venue', 'price', 'url', 'source', 'city', 'category', 'lineup')
+
+EVENT_FIELD_SET = frozenset(EVENT_FIELDS)
+
+# Low-cardinality fields whose strings are interned, so months of events share one copy of each value
+INTERNED_FIELDS = frozenset(['date', 'venue', 'price', 'source', 'city', 'category'])
+
+class Event(MutableMapping):
+    """One scraped event: a slotted record that reads and writes like the dicts events used to be
+    
+    Fields never assigned are absent, exactly as missing dict keys were, so
+    event.get('lineup'), 'lineup' in event and dict(event) behave as before;
+    assigning a key outside EVENT_FIELDS raises KeyError.
+    """
+    
+    __slots__ = EVENT_FIELDS
+    
+    def __init__(self, **fields):
+        for key, value in fields.items():
+            self[key] = value
+    
+    @classmethod
+    def from_dict(cls, data):
+        """An Event from a dict (stored or cached), ignoring keys that aren't event fields"""
+        event = cls()
+        for key in EVENT_FIELDS:
+            if key in data:
+                event[key] = data[key]
+        return event
+    
+    def __getitem__(self, key):
+        if key in EVENT_FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+    
+    def __setitem__(self, key, value):
+        if key not in EVENT_FIELD_SET:
+            raise KeyError(key)
+        if key in INTERNED_FIELDS and type(value) is str:
+            value = sys.intern(value)
+        setattr(self, key, value)
+    
+    def __delitem__(self, key):
+        try:
+            delattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+    
+    def __iter__(self):
+        return (key for key in EVENT_FIELDS if hasattr(self, key))
+    
+    def __len__(self):
+        return sum(1 for _ in self)
+    
+    def __contains__(self, key):
+        return key in EVENT_FIELD_SET and hasattr(self, key)
+    
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in EVENT_FIELD_SET else default
+    
+    def copy(self):
+        return Event.from_dict(self)
+    
+    def __reduce__(self):
+        return Event.from_dict, (dict(self),)
+    
+    def __repr__(self):
+        return f"Event({dict(self)!r})"
+
+class IdentityIndex:
+    """In-memory exact-key and MinHash-band index for matching events to known identities"""
+    
+    def __init__(self):
+        self.keys = {}
+        self.identities = {}
+        self.bands = defaultdict(list)
+    
+    def lookup(self, event):
+        """Id of a known event this one matches, or None"""
+        identity = fuzzy_identity(event)
+        for key in identity_keys(event):
+            event_id = self.keys.get(key)
+            if event_id is not None and key_match_allowed(key, identity, self.identities[event_id]):
+                return event_id
+        
+        title = identity[0]
+        if not title:
+            return None
+        for band in title_bands(title):
+            for other, event_id in self.bands[band]:
+                if is_near_duplicate(identity, other):
+                    return event_id
+        return None
+    
+    def add(self, event, event_id):
+        for key in identity_keys(event):
+            self.keys.setdefault(key, event_id)
+        
+        identity = fuzzy_identity(event)
+        self.identities.setdefault(event_id, identity)
+        if identity[0]:
+            entry = (identity, event_id)
+            for band in title_bands(identity[0]):
+                self.bands[band].append(entry)
+
+class SourceStats:
+    """Success, latency and yield history per method and per URL, with a Thompson-sampling ranking
+    
+    Each source keeps a Beta(successes + 1, failures + 1) posterior of its success
+    rate; ranking samples it and divides by the mean latency, so reliable fast
+    sources float to the top while unlucky ones still get re-tried now and then.
+    Untried sources rank first. After `failure_threshold` consecutive failures a
+    source is benched for a cooldown that doubles with every further failure.
+    """
+    
+    PRIOR_LATENCY = 5.0
+    
+    def __init__(self, rows=None, failure_threshold=3, base_cooldown=6 * 3600, max_cooldown=7 * 86400):
+        self.rows = rows or {}
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.lock = threading.Lock()
+        self.rng = random.Random()
+    
+    @classmethod
+    def from_env(cls, rows=None):
+        return cls(
+            rows,
+            failure_threshold=int(os.environ.get('SOURCE_FAILURE_THRESHOLD', '3')),
+            base_cooldown=float(os.environ.get('SOURCE_COOLDOWN_HOURS', '6')) * 3600,
+            max_cooldown=float(os.environ.get('SOURCE_MAX_COOLDOWN_HOURS', '168')) * 3600
+        )
+    
+    def record(self, key, success, latency, events=0):
+        """Fold one attempt into a source's history and trip or reset its circuit breaker"""
+        now = time.time()
+        with self.lock:
+            row = self.rows.setdefault(key, {
+                'attempts': 0, 'successes': 0, 'consecutive_failures': 0,
+                'total_latency': 0.0, 'total_events': 0, 'last_attempt': 0.0, 'cooldown_until': 0.0
+            })
+            row['attempts'] += 1
+            row['total_latency'] += latency
+            row['total_events'] += events
+            row['last_attempt'] = now
+            
+            if success:
+                row['successes'] += 1
+                row['consecutive_failures'] = 0
+                row['cooldown_until'] = 0.0
+            else:
+                row['consecutive_failures'] += 1
+                extra = row['consecutive_failures'] - self.failure_threshold
+                if extra >= 0:
+                    row['cooldown_until'] = now + min(self.base_cooldown * 2 ** extra, self.max_cooldown)
+    
+    def in_cooldown(self, key, now=None):
+        row = self.rows.get(key)
+        return bool(row) and row['cooldown_until'] > (now or time.time())
+    
+    def score(self, key):
+        """Sampled success probability per second of expected latency (untried sources score highest)"""
+        row = self.rows.get(key)
+        if not row or not row['attempts']:
+            return float('inf')
+        
+        failures = row['attempts'] - row['successes']
+        with self.lock:
+            success = self.rng.betavariate(row['successes'] + 1, failures + 1)
+        latency = row['total_latency'] / row['attempts']
+        return success / max(latency, 0.1)
+    
+    def rank(self, keys):
+        """Order keys best-first, dropping benched ones; if all are benched keep the one closest to parole"""
+        now = time.time()
+        ready = [key for key in keys if not self.in_cooldown(key, now)]
+        if not ready and keys:
+            ready = [min(keys, key=lambda key: self.rows[key]['cooldown_until'])]
+        
+        scores = {key: self.score(key) for key in ready}
+        return sorted(ready, key=lambda key: -scores[key])
+    
+    def summary(self, key):
+        """Human-readable one-liner for progress output"""
+        row = self.rows.get(key)
+        if not row or not row['attempts']:
+            return 'untried'
+        return (f"{row['successes']}/{row['attempts']} ok, "
+                f"{row['total_latency'] / row['attempts']:.1f}s avg, "
+                f"{row['total_events'] / row['attempts']:.1f} events avg")
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date); None if absent or unparseable"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    
+    from email.utils import parsedate_to_datetime
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(when.timestamp() - (now or time.time()), 0.0)
+
+class HostRateLimiter:
+    """Per-host token buckets (`burst` tokens, one more per `interval`) that back off on 429/503 and honor Retry-After"""
+    
+    THROTTLE_STATUSES = (429, 503)
+    
+    def __init__(self, interval=2.0, burst=1, backoff=10.0, max_backoff=300.0):
+        self.interval = interval
+        self.burst = max(burst, 1)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hosts = {}
+        self.lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls):
+        return cls(
+            interval=float(os.environ.get('HOST_MIN_INTERVAL', '2')),
+            burst=int(os.environ.get('HOST_BURST', '1')),
+            backoff=float(os.environ.get('HOST_BACKOFF', '10')),
+            max_backoff=float(os.environ.get('HOST_MAX_BACKOFF', '300'))
+        )
+    
+    def bucket(self, host, now):
+        """A host's state with its tokens refilled up to now (call with the lock held)"""
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = {'tokens': float(self.burst), 'updated': now, 'blocked_until': 0.0, 'throttles': 0}
+        elif self.interval > 0:
+            state['tokens'] = min(float(self.burst), state['tokens'] + (now - state['updated']) / self.interval)
+            state['updated'] = now
+        return state
+    
+    def wait_time(self, state, now):
+        wait = max(state['blocked_until'] - now, 0.0)
+        if self.interval > 0 and state['tokens'] < 1:
+            wait = max(wait, (1 - state['tokens']) * self.interval)
+        return wait
+    
+    def delay(self, host):
+        """Seconds until `host` can take another request (0 if it can now)"""
+        with self.lock:
+            now = time.monotonic()
+            return self.wait_time(self.bucket(host, now), now)
+    
+    def acquire(self, host, stop=None):
+        """Wait for a token for `host` and take it; returns seconds waited, or None if `stop` got set"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                state = self.bucket(host, now)
+                wait = self.wait_time(state, now)
+                if wait <= 0:
+                    if self.interval > 0:
+                        state['tokens'] -= 1
+                    return waited
+            
+            # Another thread may take the token first, so re-check after every wait
+            if stop is not None:
+                if stop.wait(wait):
+                    return None
+            else:
+                time.sleep(wait)
+            waited += wait
+    
+    def record(self, host, status, retry_after=None):
+        """Feed back a response status; returns the seconds `host` is now blocked for (0 if not throttled)"""
+        with self.lock:
+            now = time.monotonic()
+            state = self.bucket(host, now)
+            if status not in self.THROTTLE_STATUSES:
+                state['throttles'] = 0
+                return 0.0
+            
+            state['throttles'] += 1
+            pause = parse_retry_after(retry_after)
+            if pause is None:
+                pause = self.backoff * 2 ** (state['throttles'] - 1)
+            pause = min(pause, self.max_backoff)
+            state['blocked_until'] = max(state['blocked_until'], now + pause)
+            state['tokens'] = 0.0
+            return pause
+
+def target_slug(value):
+    """'Navi Mumbai' -> 'navi-mumbai', the form targets use"""
+    return '-'.join(value.lower().split())
+
+PRICE_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+def parse_price(text):
+    """Lowest amount mentioned in a price string ('₹499 onwards' -> 499.0), or None"""
+    amounts = [float(match.replace(',', '')) for match in PRICE_RE.findall(text or '')]
+    return min(amounts) if amounts else None
+
+class SubscriberIndex:
+    """Routes events to subscribers through bitmask indexes over their filters (cities, categories, venues, keywords, max_price)"""
+    
+    def __init__(self, subscribers):
+        self.subscribers = [dict(subscriber) for subscriber in subscribers if subscriber.get('email')]
+        self.everyone = (1 << len(self.subscribers)) - 1
+        self.exact = {'cities': {}, 'categories': {}}
+        self.phrases = {'venues': {}, 'keywords': {}}
+        self.wildcard = {dimension: 0 for dimension in ('cities', 'categories', 'venues', 'keywords', 'max_price')}
+        ceilings = []
+        
+        for position, subscriber in enumerate(self.subscribers):
+            bit = 1 << position
+            for dimension, index in self.exact.items():
+                values = [target_slug(value) for value in subscriber.get(dimension) or [] if value.strip()]
+                for value in values:
+                    index[value] = index.get(value, 0) | bit
+                if not values:
+                    self.wildcard[dimension] |= bit
+            
+            for dimension, index in self.phrases.items():
+                # First word -> [(all words, mask)], checked against each word of the event text
+                phrases = [tuple(normalize_title(value).split()) for value in subscriber.get(dimension) or []]
+                phrases = [words for words in phrases if words]
+                for words in phrases:
+                    entries = index.setdefault(words[0], {})
+                    entries[words] = entries.get(words, 0) | bit
+                if not phrases:
+                    self.wildcard[dimension] |= bit
+            
+            if subscriber.get('max_price') is None:
+                self.wildcard['max_price'] |= bit
+            else:
+                ceilings.append((float(subscriber['max_price']), bit))
+        
+        # Ascending ceilings, with the mask of every subscriber whose ceiling is at least each one
+        ceilings.sort()
+        self.ceilings = [ceiling for ceiling, _ in ceilings]
+        self.ceiling_masks = [0] * (len(ceilings) + 1)
+        for position in range(len(ceilings) - 1, -1, -1):
+            self.ceiling_masks[position] = self.ceiling_masks[position + 1] | ceilings[position][1]
+    
+    @classmethod
+    def load(cls, path, fallback_emails=()):
+        """Subscribers from a JSON list in `path`; without one, each fallback address gets every event"""
+        try:
+            if path and os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    subscribers = json.load(f)
+                print(f"👥 Loaded {len(subscribers)} subscribers from {path}")
+                return cls(subscribers)
+        except Exception as e:
+            print(f"⚠️ Could not load subscribers from {path}: {e}")
+        return cls([{'email': email} for email in fallback_emails])
+    
+    def __len__(self):
+        return len(self.subscribers)
+    
+    def phrase_mask(self, dimension, text):
+        index = self.phrases[dimension]
+        mask = self.wildcard[dimension]
+        if not index:
+            return mask
+        words = normalize_title(text).split()
+        for position, word in enumerate(words):
+            for phrase, phrase_mask in index.get(word, {}).items():
+                if tuple(words[position:position + len(phrase)]) == phrase:
+                    mask |= phrase_mask
+        return mask
+    
+    def audience(self, event):
+        """Mask of the subscribers whose filters the event passes"""
+        city, category = event_target(event)
+        mask = self.everyone
+        mask &= self.wildcard['cities'] | self.exact['cities'].get(target_slug(city), 0)
+        mask &= self.wildcard['categories'] | self.exact['categories'].get(target_slug(category), 0)
+        if not mask:
+            return 0
+        
+        price = parse_price(event.get('price'))
+        if price is not None:
+            mask &= self.wildcard['max_price'] | self.ceiling_masks[bisect.bisect_left(self.ceilings, price)]
+        if mask:
+            mask &= self.phrase_mask('venues', event.get('venue'))
+        if mask:
+            mask &= self.phrase_mask('keywords', event.get('title'))
+        return mask
+    
+    def route(self, events):
+        """{email: [events]} for every subscriber with at least one matching event"""
+        digests = {}
+        for event in events:
+            # Set bits, lowest first; str.find beats mask & -mask on masks thousands of bits wide
+            bits = bin(self.audience(event))[:1:-1]
+            position = bits.find('1')
+            while position >= 0:
+                recipients = digests.setdefault(self.subscribers[position]['email'], [])
+                # The same address may hold several subscriptions
+                if not recipients or recipients[-1] is not event:
+                    recipients.append(event)
+                position = bits.find('1', position + 1)
+        return digests
+    
+    def matches(self, subscriber, event):
+        """Whether one subscriber's filters pass an event, checked directly (the index's reference)"""
+        city, category = event_target(event)
+        if subscriber.get('cities') and target_slug(city) not in [target_slug(value) for value in subscriber['cities']]:
+            return False
+        if subscriber.get('categories') and target_slug(category) not in [target_slug(value) for value in subscriber['categories']]:
+            return False
+        price = parse_price(event.get('price'))
+        if subscriber.get('max_price') is not None and price is not None and price > float(subscriber['max_price']):
+            return False
+        for dimension, field in (('venues', 'venue'), ('keywords', 'title')):
+            phrases = [normalize_title(value) for value in subscriber.get(dimension) or [] if normalize_title(value)]
+            text = f" {normalize_title(event.get(field))} "
+            if phrases and not any(f" {phrase} " in text for phrase in phrases):
+                return False
+        return True
+
+# Markup that changes between fetches of an otherwise identical page: scripts (but not the
+# data scripts events are read from, see page_noise), styles, iframes, noscript blocks and comments
+PAGE_NOISE_RE = re.compile(
+    rb'<script\b[^>]*>.*?</script\s*>|<(style|noscript|iframe)\b[^>]*>.*?</\1\s*>|<!--.*?-->',
+    re.IGNORECASE | re.DOTALL
+)
+
+# A script containing any of these carries listing data, so it is part of the fingerprint
+DATA_SCRIPT_MARKERS = tuple(marker.encode('utf-8') for marker, _ in EMBEDDED_JSON_MARKERS) + (b'application/json',)
+
+# Bump when a change to the extractors alters what they return for the same markup,
+# so page and card fingerprints recorded by the old code stop matching
+EXTRACTOR_VERSION = 3
+
+def page_noise(match):
+    """PAGE_NOISE_RE replacement: drop the match unless it is an EMBEDDED_JSON_MARKERS data script"""
+    markup = match.group(0)
+    if markup[:7].lower() == b'<script' and any(marker in markup for marker in DATA_SCRIPT_MARKERS):
+        return markup
+    return b''
+
+def page_fingerprint(content):
+    """sha1 of a page (str or bytes) with its noise markup removed and whitespace runs collapsed"""
+    if isinstance(content, str):
+        content = content.encode('utf-8', errors='replace')
+    return hashlib.sha1(b' '.join(PAGE_NOISE_RE.sub(page_noise, content).split())).hexdigest()
+
+class ChangeDetector:
+    """Page and card fingerprints from earlier runs, for skipping extraction of unchanged content
+    
+    A page whose fingerprint matches the one stored for its URL reuses the events
+    extracted from it last time. On a changed page each card subtree is hashed, and
+    cards seen before reuse their event (or lack of one), so only new or edited cards
+    are extracted. Entries unused for max_age seconds are dropped on save.
+    """
+    
+    def __init__(self, pages=None, cards=None, max_age=7 * 86400):
+        self.pages = pages or {}  # url -> {'fingerprint', 'events', 'seconds', 'seen'}
+        self.cards = cards or {}  # card fingerprint -> {'event', 'seen'}
+        self.max_age = max_age
+        self.lock = threading.Lock()
+    
+    def unchanged_page(self, url, fingerprint):
+        """(copies of the events, extraction seconds) from the last time this exact page was seen, or None"""
+        with self.lock:
+            entry = self.pages.get(url)
+            if not entry or entry['fingerprint'] != fingerprint:
+                return None
+            entry['seen'] = time.time()
+            return [Event.from_dict(event) for event in entry['events']], entry['seconds']
+    
+    def record_page(self, url, fingerprint, events, seconds):
+        with self.lock:
+            self.pages[url] = {
+                'fingerprint': fingerprint,
+                'events': [dict(event) for event in events],
+                'seconds': seconds,
+                'seen': time.time()
+            }
+    
+    def card(self, fingerprint):
+        """(True, copy of the event or None) for a known card, (False, None) for a new one"""
+        with self.lock:
+            entry = self.cards.get(fingerprint)
+            if entry is None:
+                return False, None
+            entry['seen'] = time.time()
+            return True, Event.from_dict(entry['event']) if entry['event'] else None
+    
+    def record_card(self, fingerprint, event):
+        with self.lock:
+            self.cards[fingerprint] = {'event': dict(event) if event else None, 'seen': time.time()}
+    
+    def prune(self):
+        cutoff = time.time() - self.max_age
+        with self.lock:
+            self.pages = {url: entry for url, entry in self.pages.items() if entry['seen'] >= cutoff}
+            self.cards = {key: entry for key, entry in self.cards.items() if entry['seen'] >= cutoff}
+    
+    @classmethod
+    def load(cls, path):
+        """Detector with the fingerprints saved at `path` (gzipped JSON), empty if there are none"""
+        try:
+            if os.path.exists(path):
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    data = json.load(f)
+                return cls(data.get('pages'), data.get('cards'))
+        except Exception as e:
+            print(f"⚠️ Error loading page fingerprints: {e}")
+        return cls()
+    
+    def save(self, path):
+        """Prune, then write the fingerprints atomically to `path`"""
+        self.prune()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_file = path + '.tmp'
+        with self.lock:
+            with gzip.open(tmp_file, 'wt', encoding='utf-8') as f:
+                json.dump({'pages': self.pages, 'cards': self.cards}, f, ensure_ascii=False)
+        os.replace(tmp_file, path)
+
+class EventStore:
+    """SQLite (WAL mode) history of every event ever seen, with first/last-seen timestamps"""
+    
+    FIELDS = ('title', 'date', 'venue', 'price', 'url', 'source', 'city', 'category', 'lineup')
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS events (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            date TEXT,
+            venue TEXT,
+            price TEXT,
+            url TEXT,
+            source TEXT,
+            city TEXT,
+            category TEXT,
+            lineup TEXT,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT NOT NULL,
+            seen_count INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE INDEX IF NOT EXISTS events_first_seen ON events(first_seen);
+        CREATE INDEX IF NOT EXISTS events_last_seen ON events(last_seen);
+        CREATE INDEX IF NOT EXISTS events_target ON events(city, category, last_seen);
+        
+        CREATE TABLE IF NOT EXISTS identity_keys (
+            key TEXT PRIMARY KEY,
+            event_id TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS title_bands (
+            band INTEGER NOT NULL,
+            value INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            date TEXT NOT NULL,
+            event_id TEXT NOT NULL,
+            UNIQUE (band, value, event_id)
+        );
+        CREATE INDEX IF NOT EXISTS title_bands_lookup ON title_bands(band, value);
+        
+        CREATE TABLE IF NOT EXISTS source_stats (
+            key TEXT PRIMARY KEY,
+            attempts INTEGER NOT NULL,
+            successes INTEGER NOT NULL,
+            consecutive_failures INTEGER NOT NULL,
+            total_latency REAL NOT NULL,
+            total_events INTEGER NOT NULL,
+            last_attempt REAL NOT NULL,
+            cooldown_until REAL NOT NULL
+        );
+        
+        CREATE TABLE IF NOT EXISTS runs (
+            started TEXT PRIMARY KEY,
+            report TEXT NOT NULL
+        );
+        
+        -- Fingerprints live in the cache directory now (see ChangeDetector.save)
+        DROP TABLE IF EXISTS page_fingerprints;
+        DROP TABLE IF EXISTS card_fingerprints;
+    """
+    
+    STATS_FIELDS = ('attempts', 'successes', 'consecutive_failures', 'total_latency',
+                    'total_events', 'last_attempt', 'cooldown_until')
+    
+    # Run reports kept for regression baselines (recent_runs reads the last 10)
+    RUNS_KEPT = 30
+    
+    def __init__(self, path='events.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(self.SCHEMA)
+        self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS run_ids (id TEXT PRIMARY KEY)')
+        
+        # Stores created before the identity index existed: index their history once
+        if self.count() and not self.conn.execute('SELECT 1 FROM identity_keys LIMIT 1').fetchone():
+            rows = self.conn.execute('SELECT id, title, date, url FROM events').fetchall()
+            with self.conn:
+                self.index_identities([dict(row) for row in rows])
+    
+    def count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+    
+    def new_ids(self, ids):
+        """Which of `ids` have never been stored, via an indexed anti-join"""
+        with self.conn:
+            self.conn.execute('DELETE FROM run_ids')
+            self.conn.executemany('INSERT OR IGNORE INTO run_ids (id) VALUES (?)', ((i,) for i in ids))
+            rows = self.conn.execute(
+                'SELECT r.id FROM run_ids r LEFT JOIN events e ON e.id = r.id WHERE e.id IS NULL'
+            ).fetchall()
+        return {row[0] for row in rows}
+    
+    def resolve(self, events):
+        """Point each event's id at the stored event it is the same as (exact keys, then near-duplicate titles)"""
+        resolved = 0
+        for event in events:
+            event_id = self.lookup_identity(event)
+            if event_id and event_id != event['id']:
+                event['id'] = event_id
+                resolved += 1
+        return resolved
+    
+    def lookup_identity(self, event):
+        """Stored id matching an event, using only indexed lookups"""
+        identity = fuzzy_identity(event)
+        for key in identity_keys(event):
+            row = self.conn.execute(
+                'SELECT k.event_id, e.title, e.date, e.url, e.city, e.category FROM identity_keys k '
+                'JOIN events e ON e.id = k.event_id WHERE k.key = ?', (key,)
+            ).fetchone()
+            if row and key_match_allowed(key, identity, fuzzy_identity(dict(row))):
+                return row['event_id']
+        
+        title = identity[0]
+        if not title:
+            return None
+        
+        # The stored event supplies the code, slug and target a near-duplicate must not contradict
+        for band, value in title_bands(title):
+            rows = self.conn.execute(
+                'SELECT b.title, b.date, b.event_id, e.url, e.city, e.category FROM title_bands b '
+                'JOIN events e ON e.id = b.event_id WHERE b.band = ? AND b.value = ?', (band, value)
+            ).fetchall()
+            for row in rows:
+                if is_near_duplicate(identity, fuzzy_identity(dict(row), row['title'])):
+                    return row['event_id']
+        return None
+    
+    def index_identities(self, events):
+        """Record exact keys and title bands for events (first mapping of a key wins)"""
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO identity_keys (key, event_id) VALUES (?, ?)',
+            [(key, event['id']) for event in events for key in identity_keys(event)]
+        )
+        
+        band_rows = []
+        for event in events:
+            title = normalize_title(event.get('title'))
+            if title:
+                event_date = parse_event_date(event.get('date'))
+                band_rows.extend((band, value, title, event_date, event['id'])
+                                 for band, value in title_bands(title))
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO title_bands (band, value, title, date, event_id) VALUES (?, ?, ?, ?, ?)',
+            band_rows
+        )
+    
+    def upsert(self, events, seen_at=None):
+        """Insert new events and refresh known ones, all in one transaction
+        
+        A refresh never replaces a stored value with NULL or a placeholder (see
+        placeholder_values), so details filled in by enrichment survive later runs.
+        """
+        seen_at = seen_at or datetime.now().isoformat(timespec='seconds')
+        rows = []
+        for event in events:
+            row = {field: event.get(field) for field in self.FIELDS}
+            placeholders = placeholder_values(event_target(event))
+            for field in self.FIELDS:
+                row[f"known_{field}"] = None if row[field] in placeholders.get(field, ()) else row[field]
+            row.update(id=event['id'], seen_at=seen_at)
+            rows.append(row)
+        updates = ', '.join(f"{field} = COALESCE(:known_{field}, {field})" for field in self.FIELDS)
+        
+        with self.conn:
+            self.conn.executemany(f"""
+                INSERT INTO events (id, {', '.join(self.FIELDS)}, first_seen, last_seen)
+                VALUES (:id, {', '.join(':' + field for field in self.FIELDS)}, :seen_at, :seen_at)
+                ON CONFLICT(id) DO UPDATE SET {updates},
+                    last_seen = excluded.last_seen,
+                    seen_count = seen_count + 1
+            """, rows)
+            self.index_identities(events)
+    
+    def import_json(self, path):
+        """One-off migration of a legacy previous_events.json into the store"""
+        with open(path, 'r', encoding='utf-8') as f:
+            events = json.load(f)
+        
+        seen_at = datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec='seconds')
+        self.upsert([event for event in events if event.get('id')], seen_at)
+        return len(events)
+    
+    def first_seen_since(self, since):
+        """Events first stored at or after `since` (ISO timestamp), oldest first"""
+        rows = self.conn.execute(
+            f"SELECT id, {', '.join(self.FIELDS)}, first_seen FROM events WHERE first_seen >= ? ORDER BY first_seen, id",
+            (since,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def load_source_stats(self):
+        """Per-method / per-URL fetch history as {key: row dict}"""
+        rows = self.conn.execute(f"SELECT key, {', '.join(self.STATS_FIELDS)} FROM source_stats").fetchall()
+        return {row['key']: {field: row[field] for field in self.STATS_FIELDS} for row in rows}
+    
+    def save_source_stats(self, stats):
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO source_stats (key, {', '.join(self.STATS_FIELDS)}) "
+                f"VALUES ({', '.join('?' * (len(self.STATS_FIELDS) + 1))})",
+                [(key,) + tuple(row[field] for field in self.STATS_FIELDS) for key, row in stats.items()]
+            )
+    
+    def iter_history(self, since=None, batch_size=10000):
+        """Every stored event (first seen at or after `since`, if given) as batches of HISTORY_FIELDS tuples"""
+        query = f"SELECT {', '.join(HISTORY_FIELDS)} FROM events"
+        cursor = self.conn.execute(query + ' WHERE first_seen >= ? ORDER BY first_seen', (since,)) if since \
+            else self.conn.execute(query + ' ORDER BY first_seen')
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [tuple(row) for row in rows]
+    
+    def record_run(self, report):
+        """Store a run report, dropping all but the newest RUNS_KEPT"""
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO runs (started, report) VALUES (?, ?)',
+                              (report['started'], json.dumps(report)))
+            self.conn.execute('DELETE FROM runs WHERE started NOT IN '
+                              '(SELECT started FROM runs ORDER BY started DESC LIMIT ?)', (self.RUNS_KEPT,))
+    
+    def recent_runs(self, limit=10):
+        """Reports of the last `limit` runs, newest first"""
+        rows = self.conn.execute('SELECT report FROM runs ORDER BY started DESC LIMIT ?', (limit,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+    
+    def close(self):
+        """Checkpoint the WAL into the main file (so only events.db needs committing) and close"""
+        try:
+            self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        finally:
+            self.conn.close()
+
+# Columns of a history export; the low-cardinality ones are dictionary-encoded
+HISTORY_FIELDS = ('id',) + EventStore.FIELDS + ('first_seen', 'last_seen', 'seen_count')
+DICTIONARY_FIELDS = ('date', 'venue', 'price', 'source', 'city', 'category')
+
+def export_history_ndjson(batches, path):
+    """Write history batches as columnar NDJSON; returns the number of rows
+    
+    The first line is a header naming the fields; every further line holds one batch
+    as columns. Dictionary fields are stored as indexes into per-field dictionaries,
+    and each batch carries only the values new since the previous one, so readers
+    extend the dictionaries as they go (like Arrow dictionary deltas). A .gz path is
+    gzip-compressed.
+    """
+    dictionaries = {field: {} for field in DICTIONARY_FIELDS}
+    rows = 0
+    
+    if path.endswith('.gz'):
+        output = gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+    else:
+        output = open(path, 'w', encoding='utf-8')
+    with output as f:
+        header = {'format': 'bookmyshow-history', 'version': 1,
+                  'fields': HISTORY_FIELDS, 'dictionary_fields': DICTIONARY_FIELDS}
+        f.write(json.dumps(header) + '\n')
+        
+        for batch in batches:
+            columns = {}
+            additions = {}
+            for field, values in zip(HISTORY_FIELDS, zip(*batch)):
+                if field in dictionaries:
+                    codes = dictionaries[field]
+                    start = len(codes)
+                    values = [codes.setdefault(value, len(codes)) for value in values]
+                    if len(codes) > start:
+                        additions[field] = list(itertools.islice(codes, start, None))
+                columns[field] = list(values)
+            
+            f.write(json.dumps({'rows': len(batch), 'dictionary': additions, 'columns': columns},
+                               ensure_ascii=False, separators=(',', ':')) + '\n')
+            rows += len(batch)
+    return rows
+
+def read_history_ndjson(path, fields=None):
+    """Yield {field: values} per batch of a columnar NDJSON export, decoding only `fields` (default all)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        fields = fields or header['fields']
+        dictionaries = {field: [] for field in header['dictionary_fields']}
+        
+        for line in f:
+            batch = json_loads(line)
+            for field, values in batch['dictionary'].items():
+                dictionaries[field].extend(values)
+            columns = {}
+            for field in fields:
+                values = batch['columns'][field]
+                if field in dictionaries:
+                    lookup = dictionaries[field]
+                    values = [lookup[code] for code in values]
+                columns[field] = values
+            yield columns
+
+def export_history_parquet(batches, path):
+    """Write history batches to a Parquet file with dictionary-encoded string columns (needs pyarrow)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    types = {field: pa.dictionary(pa.int32(), pa.string()) if field in DICTIONARY_FIELDS else pa.string()
+             for field in HISTORY_FIELDS}
+    types['seen_count'] = pa.int64()
+    schema = pa.schema(list(types.items()))
+    rows = 0
+    
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for batch in batches:
+            arrays = []
+            for field, values in zip(HISTORY_FIELDS, zip(*batch)):
+                if field in DICTIONARY_FIELDS:
+                    arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+                else:
+                    arrays.append(pa.array(values, type=types[field]))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows += len(batch)
+    return rows
+
+# Email bodies are rendered from these pieces with one join per message
+EMAIL_HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; margin: 0; padding: 20px; }}
+        .header {{ background: linear-gradient(135deg, #e74c3c 0%, #c0392b 100%); color: white; padding: 20px; text-align: center; border-radius: 10px; margin-bottom: 20px; }}
+        .section {{ color: #c0392b; border-bottom: 2px solid #e74c3c; padding-bottom: 5px; margin-top: 30px; }}
+        .event-card {{ border: 1px solid #ddd; margin: 15px 0; padding: 20px; border-radius: 10px; background: #f9f9f9; }}
+        .event-title {{ font-size: 18px; font-weight: bold; color: #2c3e50; margin-bottom: 10px; }}
+        .event-detail {{ margin: 8px 0; }}
+        .source-tag {{ background: #3498db; color: white; padding: 3px 8px; border-radius: 3px; font-size: 12px; }}
+        .book-btn {{ background: #e74c3c; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; }}
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>🎵 BookMyShow {label} Events!</h1>
+        <p>Found {count} events</p>
+    </div>
+"""
+EMAIL_HTML_SECTION = """    <h2 class="section">{label} ({count})</h2>
+"""
+EMAIL_HTML_CARD = """    <div class="event-card">
+        <div class="event-title">{title} <span class="source-tag">{source}</span></div>
+        <div class="event-detail">📅 <strong>Date:</strong> {date}</div>
+        <div class="event-detail">📍 <strong>Venue:</strong> {venue}</div>
+        <div class="event-detail">💰 <strong>Price:</strong> {price}</div>
+{extra}    </div>
+"""
+EMAIL_HTML_LINEUP = """        <div class="event-detail">🎤 <strong>Lineup:</strong> {lineup}</div>
+"""
+EMAIL_HTML_LINK = """        <a href="{url}" class="book-btn">View Details →</a>
+"""
+EMAIL_HTML_FOOT = """    <div style="margin-top: 30px; padding: 20px; background: #ecf0f1; border-radius: 10px; text-align: center;">
+        <p>Generated on {generated}</p>
+        <p><a href="{url}">Visit BookMyShow directly</a></p>
+    </div>
+</body>
+</html>
+"""
+
+EMAIL_TEXT_HEAD = "🎵 BOOKMYSHOW {label} EVENTS!\n\nFound {count} events:\n" + "=" * 50 + "\n\n"
+EMAIL_TEXT_SECTION = "## {label} ({count})\n\n"
+EMAIL_TEXT_CARD = "{number}. {title} [{source}]\n   📅 {date}\n   📍 {venue}\n   💰 {price}\n{extra}\n" + "-" * 30 + "\n\n"
+EMAIL_TEXT_FOOT = "Generated: {generated}"
+
+class SmtpDispatcher:
+    """Delivers a batch of messages over one SMTP connection, doing STARTTLS and login once
+    
+    The connection is recycled after max_per_connection messages (providers cap this)
+    and re-opened once if the server drops it mid-batch. Without a password no login
+    is attempted and SMTP_STARTTLS=0 skips TLS, so a local sink (python -m aiosmtpd -n)
+    works as a test server.
+    """
+    
+    def __init__(self, host, port=587, username=None, password=None, starttls=True, use_ssl=False,
+                 timeout=30, max_per_connection=100):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.max_per_connection = max_per_connection
+        self.server = None
+        self.sent_on_connection = 0
+        self.connections = 0
+    
+    @classmethod
+    def from_env(cls):
+        """Build a dispatcher from SMTP_* / SENDER_* environment variables"""
+        port = int(os.environ.get('SMTP_PORT', '587'))
+        return cls(
+            os.environ.get('SMTP_SERVER'),
+            port,
+            username=os.environ.get('SMTP_USERNAME') or os.environ.get('SENDER_EMAIL'),
+            password=os.environ.get('SENDER_PASSWORD'),
+            starttls=os.environ.get('SMTP_STARTTLS', '1') != '0',
+            use_ssl=os.environ.get('SMTP_SSL') == '1' or port == 465,
+            max_per_connection=int(os.environ.get('SMTP_MAX_PER_CONNECTION', '100'))
+        )
+    
+    def connect(self):
+        import smtplib
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        server = smtp_class(self.host, self.port, timeout=self.timeout)
+        if self.starttls and not self.use_ssl:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        self.server = server
+        self.sent_on_connection = 0
+        self.connections += 1
+    
+    def send(self, message):
+        """Send one message on the open connection, (re)connecting when needed"""
+        import smtplib
+        if self.server is not None and self.sent_on_connection >= self.max_per_connection:
+            self.close()
+        
+        for attempt in (1, 2):
+            if self.server is None:
+                self.connect()
+            try:
+                self.server.send_message(message)
+                self.sent_on_connection += 1
+                return
+            except smtplib.SMTPServerDisconnected:
+                self.server = None
+                if attempt == 2:
+                    raise
+    
+    def send_batch(self, messages):
+        """Send every message; returns (sent, [(recipient, error)]) for per-message refusals
+        
+        Connection-level failures (the server is unreachable, login is refused) propagate.
+        """
+        import smtplib
+        sent = 0
+        failures = []
+        for message in messages:
+            try:
+                self.send(message)
+                sent += 1
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                failures.append((message['To'], e))
+        return sent, failures
+    
+    def close(self):
+        import smtplib
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
 
 class BookMyShowScraper:
     def __init__(self):
-        self.events_file = "previous_events.json"
+        self.events_file = "previous_events.json"  # legacy store, imported into events_db once
+        self.events_db = os.environ.get('EVENTS_DB', 'events.db')
+        self.store = None
         
         # Multiple approaches to access BookMyShow data
         self.methods = [
@@ -30,6 +2182,149 @@ class BookMyShowScraper:
             'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1',
             'Mozilla/5.0 (Android 13; Mobile; rv:109.0) Gecko/111.0 Firefox/111.0'
         ]
+        
+        # One pooled session for every method so connections (and TLS) are reused
+        self.transport = HttpTransport.from_env()
+        
+        # Conditional-GET cache for snapshot sources that rarely change between runs
+        self.response_cache = ResponseCache(
+            os.environ.get('HTTP_CACHE_DIR', '.http_cache'),
+            int(os.environ.get('HTTP_CACHE_MAX_MB', '50')) * 1024 * 1024
+        )
+        
+        # HTML parser backend: html.parser, lxml, selectolax or auto (fastest installed)
+        self.parser = get_parser_backend(os.environ.get('HTML_PARSER', 'auto'))
+        
+        # Read listing data from embedded JSON script payloads before building a DOM
+        self.embedded_json = os.environ.get('EMBEDDED_JSON', '1') != '0'
+        
+        # Optional detail-page enrichment for new events, with a per-URL TTL cache
+        self.enrich = os.environ.get('ENRICH_DETAILS') == '1'
+        self.enrich_workers = int(os.environ.get('ENRICH_WORKERS', '4'))
+        self.enrich_ttl = float(os.environ.get('ENRICH_TTL_HOURS', '24')) * 3600
+        self.enrichment_file = os.environ.get('ENRICH_CACHE_FILE', 'enrichment_cache.json')
+        self.enrichment_cache = None  # loaded on first use, then kept for the life of the scraper
+        self.detail_engine = SelectorEngine(DETAIL_SELECTORS)
+        
+        # Stream HTML pages and stop downloading once enough cards have been read (needs lxml)
+        self.streaming = os.environ.get('SCRAPE_STREAMING') == '1'
+        if self.streaming and 'lxml' not in available_parser_backends():
+            print("⚠️ Streaming extraction needs lxml, falling back to full downloads")
+            self.streaming = False
+        
+        # Compiled selector engines: one pass over the page for cards, one pass per card for fields
+        self.card_engine = SelectorEngine({'card': CARD_SELECTORS, 'fallback': FALLBACK_CARD_SELECTORS})
+        self.field_engine = SelectorEngine(FIELD_SELECTORS)
+        
+        # Per-category include/exclude keywords, compiled once per category on first use
+        self.category_keywords = load_category_keywords(os.environ.get('KEYWORDS_FILE'))
+        self.keyword_matchers = {}
+        
+        # (city, category) pairs to crawl, fanned out with a global concurrency cap
+        self.targets = parse_targets(os.environ.get('SCRAPE_TARGETS', ''))
+        self.crawl_concurrency = int(os.environ.get('CRAWL_CONCURRENCY', '4'))
+        
+        # 'sequential' tries one method after another, 'race' fires every candidate URL at once
+        self.mode = os.environ.get('SCRAPE_MODE', 'sequential')
+        
+        # Per-host politeness: max parallel requests, a token bucket per host and the longest
+        # a sequential scrape waits on a throttled host before moving on to other hosts
+        self.host_max_parallel = int(os.environ.get('HOST_MAX_PARALLEL', '2'))
+        self.rate_limiter = HostRateLimiter.from_env()
+        self.host_max_wait = float(os.environ.get('HOST_MAX_WAIT', '30'))
+        self.host_semaphores = {}
+        self.host_lock = threading.Lock()
+        
+        # Filled in by race mode with the winning source and timing, per target label
+        self.race_winners = {}
+        
+        # Hand HTML extraction to a process pool so parsing scales past the GIL (0 keeps it in-thread)
+        self.extract_processes = int(os.environ.get('EXTRACT_PROCESSES', '0'))
+        self.extract_pool = None
+        self.extract_pool_size = 0
+        self.extract_pool_lock = threading.Lock()
+        
+        # Send every request to a stand-in server instead (benchmarks/standin_server.py), e.g. http://127.0.0.1:8765
+        self.upstream_override = os.environ.get('UPSTREAM_OVERRIDE')
+        
+        # Record every upstream response for offline replay (standin_server.py --archive), e.g. run.jsonl.gz
+        record_path = os.environ.get('RECORD_ARCHIVE')
+        self.recorder = HttpArchive(record_path) if record_path else None
+        
+        # Reorder and bench methods / URLs from their history (loaded from the store in open_store)
+        self.adaptive = os.environ.get('ADAPTIVE_ORDER', '1') != '0'
+        self.source_stats = SourceStats.from_env()
+        
+        # Skip extracting pages / cards identical to earlier runs' (fingerprints load in open_store). They
+        # live beside the response cache, not in the committed events.db, since they churn every run
+        self.change_detection = os.environ.get('CHANGE_DETECTION', '1') != '0'
+        self.fingerprints_file = os.environ.get(
+            'FINGERPRINTS_FILE', os.path.join(os.environ.get('HTTP_CACHE_DIR', '.http_cache'), 'fingerprints.json.gz')
+        )
+        self.change_detector = None
+        self.extraction_state = None  # (parser, fast path) -> digest mixed into fingerprints, see extraction_digest
+        
+        # Who gets which new events (SUBSCRIBERS_FILE, else every RECEIVER_EMAIL address gets all of them)
+        self.subscribers = SubscriberIndex.load(os.environ.get('SUBSCRIBERS_FILE', 'subscribers.json'), self.recipients())
+        
+        # Daemon mode: poll every POLL_INTERVAL seconds, +/- POLL_JITTER of it, until SIGTERM
+        self.poll_interval = float(os.environ.get('POLL_INTERVAL', '900'))
+        self.poll_jitter = float(os.environ.get('POLL_JITTER', '0.2'))
+        self.known_ids = {}  # scraped event id -> stored id, for events matched in earlier polls
+        self.stop_event = threading.Event()
+        
+        # Per-stage timings for this run, written out as a JSON report and Prometheus text
+        self.metrics = RunMetrics()
+        self.transport.metrics = self.metrics
+        self.run_report_file = os.environ.get('RUN_REPORT_FILE', 'run_report.json')
+        self.metrics_file = os.environ.get('METRICS_FILE', 'metrics.prom')
+    
+    @classmethod
+    def for_extraction(cls, parser_name, embedded_json, category_keywords):
+        """A scraper with only what extract_events_from_html needs, for extraction pool workers
+        
+        Skips the transport, caches, recorder and subscribers that __init__ sets up:
+        a worker never fetches, and only the parent may append to RECORD_ARCHIVE.
+        """
+        scraper = cls.__new__(cls)
+        scraper.parser = get_parser_backend(parser_name)
+        scraper.embedded_json = embedded_json
+        scraper.card_engine = SelectorEngine({'card': CARD_SELECTORS, 'fallback': FALLBACK_CARD_SELECTORS})
+        scraper.field_engine = SelectorEngine(FIELD_SELECTORS)
+        scraper.category_keywords = category_keywords
+        scraper.keyword_matchers = {}
+        scraper.change_detector = None
+        scraper.extraction_state = None
+        scraper.metrics = RunMetrics()
+        return scraper
+    
+    def upstream_url(self, url):
+        """The URL actually requested: unchanged, or rewritten onto UPSTREAM_OVERRIDE"""
+        if self.upstream_override:
+            return rewrite_upstream(url, self.upstream_override)
+        return url
+    
+    def http_get(self, url, **kwargs):
+        """GET a URL through the transport (and UPSTREAM_OVERRIDE), adding the response to RECORD_ARCHIVE if set"""
+        started = time.perf_counter()
+        response = self.transport.get(self.upstream_url(url), **kwargs)
+        if self.recorder is not None:
+            self.recorder.record(url, response, time.perf_counter() - started)
+        return response
+    
+    def close_recorder(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"📼 Recorded {self.recorder.records} responses to {self.recorder.path}")
+    
+    def keyword_matcher(self, category):
+        """Compiled keyword matcher for a category (unlisted categories share DEFAULT_TARGET's)"""
+        matcher = self.keyword_matchers.get(category)
+        if matcher is None:
+            config = self.category_keywords.get(category) or self.category_keywords[DEFAULT_TARGET[1]]
+            matcher = KeywordMatcher(config.get('include', ()), config.get('exclude', ()))
+            self.keyword_matchers[category] = matcher
+        return matcher
     
     def get_headers(self):
         """Get randomized headers"""
@@ -48,48 +2343,282 @@ class BookMyShowScraper:
             'Pragma': 'no-cache'
         }
     
-    def method_1_google_cache(self):
+    def get_candidates(self, method_number, target=DEFAULT_TARGET):
+        """Build the fetch candidates for one method
+        
+        kind is 'html' or 'api' (JSON first, HTML second); require is a KeywordMatcher
+        the page text must match for the response to count as usable.
+        """
+        if method_number == 1:
+            # Google cache URL
+            original_url = listing_url(target)
+            cache_url = f"https://webcache.googleusercontent.com/search?q=cache:{urllib.parse.quote(original_url)}"
+            return [{
+                'method': 1,
+                'target': target,
+                'source': "Google Cache",
+                'url': cache_url,
+                'headers': self.get_headers(),
+                'cacheable': True,
+                'kind': 'html',
+                'require': SITE_KEYWORD
+            }]
+        
+        if method_number == 2:
+            # Try archive.today
+            archive_urls = [
+                f"https://archive.today/newest/{listing_url(target)}",
+                f"https://web.archive.org/web/2/{listing_url(target)}"
+            ]
+            return [{
+                'method': 2,
+                'target': target,
+                'source': "Web Archive",
+                'url': archive_url,
+                'headers': self.get_headers(),
+                'cacheable': True,
+                'kind': 'html',
+                'require': self.keyword_matcher(target[1])
+            } for archive_url in archive_urls]
+        
+        if method_number == 3:
+            # Mobile URLs sometimes have different blocking rules
+            city, category = target
+            mobile_urls = [
+                f"https://m.bookmyshow.com/explore/events-{city}?categories={category}",
+                f"https://in.bookmyshow.com/mobile/events-{city}?categories={category}"
+            ]
+            mobile_headers = self.get_headers()
+            mobile_headers['User-Agent'] = 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1'
+            return [{
+                'method': 3,
+                'target': target,
+                'source': "Mobile BookMyShow",
+                'url': mobile_url,
+                'headers': mobile_headers,
+                'kind': 'html',
+                'require': None
+            } for mobile_url in mobile_urls]
+        
+        if method_number == 4:
+            # Sometimes there are public API endpoints
+            city, category = target
+            api_urls = [
+                f"https://in.bookmyshow.com/api/explore/events?city={city}&category={category}",
+                f"https://in.bookmyshow.com/serv/getData?cmd=GETEVENTS&t=20250722&city={city.upper()}",
+                f"https://in.bookmyshow.com/bms/events?city={city}&type={category.split('-')[0]}"
+            ]
+            api_headers = self.get_headers()
+            api_headers.update({
+                'Accept': 'application/json, text/plain, */*',
+                'X-Requested-With': 'XMLHttpRequest',
+                'Referer': 'https://in.bookmyshow.com/'
+            })
+            return [{
+                'method': 4,
+                'target': target,
+                'source': "BookMyShow API",
+                'url': api_url,
+                'headers': api_headers,
+                'kind': 'api',
+                'require': None
+            } for api_url in api_urls]
+        
+        return []
+    
+    def extract_api_response(self, response, target=DEFAULT_TARGET):
+        """Extract events from an API response (JSON first, then HTML); None if unusable"""
+        try:
+            # Try JSON response
+            data = response.json()
+            print("✅ API endpoint worked!")
+            return self.extract_events_from_json(data, "BookMyShow API", target)
+        except:
+            # Try HTML response
+            if self.keyword_matcher(target[1]).has_keyword(response.text):
+                print("✅ API endpoint (HTML) worked!")
+                return self.extract_events_from_html(response.text, "BookMyShow API", target)
+        return None
+    
+    def request_candidate(self, candidate, stop=None):
+        """GET a candidate URL, revalidating against the response cache when the candidate allows it
+        
+        Returns None without requesting anything if `stop` got set while waiting for a host slot.
+        """
+        stream = self.streaming and candidate['kind'] == 'html'
+        headers = dict(candidate['headers'])
+        # A recording needs full bodies, not 304s, to be replayable
+        if candidate.get('cacheable') and self.recorder is None:
+            headers.update(self.response_cache.validators(candidate['url'], self.extraction_digest()))
+        
+        # Per-domain politeness applies to every request, whichever mode or target it serves
+        host = urllib.parse.urlsplit(candidate['url']).netloc
+        with self.host_slot(host, stop) as allowed:
+            if not allowed or (stop is not None and stop.is_set()):
+                return None
+            with self.metrics.stage('fetch'):
+                response = self.http_get(candidate['url'], headers=headers, stream=stream)
+        self.record_host_response(host, response)
+        
+        if not candidate.get('cacheable'):
+            return response
+        
+        if response.status_code == 304:
+            cached = self.response_cache.get(candidate['url'], self.extraction_digest())
+            if cached is not None:
+                self.metrics.count('cache_not_modified')
+                response.close()
+                return cached
+        return response
+    
+    def handle_candidate_response(self, candidate, response, stop=None):
+        """Validate and extract a candidate response; returns events, or None if unusable"""
+        if getattr(response, 'not_modified', False) and response.events is not None:
+            # 304 and we already know what this page contains: skip parsing entirely
+            print(f"♻️ {candidate['source']} not modified, reusing {len(response.events)} cached events")
+            return response.events
+        
+        if response.status_code != 200:
+            response.close()
+            return None
+        
+        body = None
+        if candidate['kind'] == 'api':
+            with self.metrics.stage('extract_api'):
+                events = self.extract_api_response(response, candidate['target'])
+            body = response.text
+        elif self.streaming and not getattr(response, 'not_modified', False):
+            with self.metrics.stage('extract_streaming'):
+                events = self.extract_events_streaming(response, candidate['source'], candidate['require'], stop,
+                                                       candidate['target'])
+        elif self.extract_processes and not getattr(response, 'not_modified', False):
+            # Ship the raw bytes to a worker process; only decode here if the cache needs the text
+            content = response.content
+            if candidate['require'] and not candidate['require'].has_keyword(content):
+                return None
+            events = self.extract_page(candidate, content, lambda: self.extract_events_offloaded(
+                content, response.encoding, candidate['source'], candidate['target']))
+            if candidate.get('cacheable'):
+                body = response.text
+        else:
+            body = response.text
+            if candidate['require'] and not candidate['require'].has_keyword(body):
+                return None
+            events = self.extract_page(candidate, body, lambda: self.extract_events_from_html(
+                body, candidate['source'], candidate['target']))
+        
+        if candidate.get('cacheable') and events is not None:
+            self.response_cache.store(candidate['url'], response.headers, body, events, self.extraction_digest())
+        return events
+    
+    def extract_page(self, candidate, content, extract):
+        """Run extract() on a fetched page, unless it is unchanged since an earlier run (then reuse its events)"""
+        if self.change_detector is None:
+            with self.metrics.stage('extract_html'):
+                return extract()
+        
+        with self.metrics.stage('fingerprint_page'):
+            fingerprint = f"{self.extraction_digest()}:{page_fingerprint(content)}"
+        self.metrics.count('pages_fingerprinted')
+        
+        unchanged = self.change_detector.unchanged_page(candidate['url'], fingerprint)
+        if unchanged is not None:
+            events, seconds = unchanged
+            self.metrics.count('pages_unchanged')
+            self.metrics.count('extract_seconds_saved', seconds)
+            print(f"🧬 {candidate['source']} unchanged since it was last extracted, reusing {len(events)} events")
+            return events
+        
+        started = time.perf_counter()
+        with self.metrics.stage('extract_html'):
+            events = extract()
+        if events is not None:
+            self.change_detector.record_page(candidate['url'], fingerprint, events, time.perf_counter() - started)
+        return events
+    
+    def extraction_digest(self):
+        """Short hash of what besides the markup decides extraction results: extractor version, keywords, parser, fast path"""
+        state = (self.parser.name, self.embedded_json)
+        if self.extraction_state is None or self.extraction_state[0] != state:
+            config = json.dumps([EXTRACTOR_VERSION, self.category_keywords, *state], sort_keys=True, default=sorted)
+            self.extraction_state = (state, hashlib.sha1(config.encode('utf-8')).hexdigest()[:12])
+        return self.extraction_state[1]
+    
+    def extract_card(self, element, soup, target=DEFAULT_TARGET):
+        """extract_single_event, reusing the result for a card identical to one extracted before"""
+        if self.change_detector is None:
+            with self.metrics.stage('extract_event'):
+                return self.extract_single_event(element, soup, target=target)
+        
+        with self.metrics.stage('fingerprint_card'):
+            prefix = f"{self.extraction_digest()}:{target[0]}:{target[1]}:".encode('utf-8')
+            key = hashlib.sha1(prefix + self.parser.outer_html(element)).hexdigest()
+        known, event = self.change_detector.card(key)
+        if known:
+            self.metrics.count('cards_reused')
+            return event
+        
+        with self.metrics.stage('extract_event'):
+            event = self.extract_single_event(element, soup, target=target)
+        self.change_detector.record_card(key, event)
+        self.metrics.count('cards_extracted')
+        return event
+    
+    def fetch_candidate(self, candidate):
+        """Fetch one candidate URL; returns extracted events, or None if the response is unusable"""
+        started = time.monotonic()
+        events = None
+        try:
+            response = self.request_candidate(candidate)
+            events = self.handle_candidate_response(candidate, response)
+            return events
+        finally:
+            self.source_stats.record(f"url:{candidate['url']}", bool(events),
+                                     time.monotonic() - started, len(events or []))
+    
+    def ranked_candidates(self, method_number, target=DEFAULT_TARGET):
+        """A method's candidate URLs, best-first by history, with benched URLs left out"""
+        candidates = self.get_candidates(method_number, target)
+        if not self.adaptive:
+            return candidates
+        
+        by_key = {f"url:{c['url']}": c for c in candidates}
+        ranked = [by_key[key] for key in self.source_stats.rank(list(by_key))]
+        if len(ranked) < len(candidates):
+            print(f"⏸️ Skipping {len(candidates) - len(ranked)} URLs of method {method_number} in cooldown")
+        return ranked
+    
+    def method_1_google_cache(self, target=DEFAULT_TARGET):
         """Try Google's cached version of BookMyShow"""
         print("🔍 Method 1: Trying Google Cache...")
         
         try:
-            # Google cache URL
-            original_url = "https://in.bookmyshow.com/explore/events-mumbai?categories=music-shows"
-            cache_url = f"https://webcache.googleusercontent.com/search?q=cache:{urllib.parse.quote(original_url)}"
-            
-            headers = self.get_headers()
-            response = requests.get(cache_url, headers=headers, timeout=30)
+            for candidate in self.schedule(self.ranked_candidates(1, target)):
+                events = self.fetch_candidate(candidate)
+                
+                if events is not None:
+                    print("✅ Google cache worked!")
+                    return events
             
-            if response.status_code == 200 and 'bookmyshow' in response.text.lower():
-                print("✅ Google cache worked!")
-                return self.extract_events_from_html(response.text, "Google Cache")
-            else:
-                print("❌ Google cache failed")
-                return []
+            print("❌ Google cache failed")
+            return []
                 
         except Exception as e:
             print(f"❌ Google cache error: {e}")
             return []
     
-    def method_2_web_archive(self):
+    def method_2_web_archive(self, target=DEFAULT_TARGET):
         """Try Archive.today/Web Archive versions"""
         print("🔍 Method 2: Trying Web Archive...")
         
         try:
-            # Try archive.today
-            archive_urls = [
-                "https://archive.today/newest/https://in.bookmyshow.com/explore/events-mumbai?categories=music-shows",
-                "https://web.archive.org/web/2/https://in.bookmyshow.com/explore/events-mumbai?categories=music-shows"
-            ]
-            
-            for archive_url in archive_urls:
+            for candidate in self.schedule(self.ranked_candidates(2, target)):
                 try:
-                    headers = self.get_headers()
-                    response = requests.get(archive_url, headers=headers, timeout=30)
+                    events = self.fetch_candidate(candidate)
                     
-                    if response.status_code == 200 and 'music' in response.text.lower():
+                    if events is not None:
                         print(f"✅ Archive version worked!")
-                        return self.extract_events_from_html(response.text, "Web Archive")
+                        return events
                 
                 except Exception as e:
                     print(f"Archive URL failed: {e}")
@@ -102,28 +2631,18 @@ class BookMyShowScraper:
             print(f"❌ Web archive error: {e}")
             return []
     
-    def method_3_mobile_version(self):
+    def method_3_mobile_version(self, target=DEFAULT_TARGET):
         """Try mobile version of BookMyShow"""
         print("🔍 Method 3: Trying Mobile Version...")
         
         try:
-            # Mobile URLs sometimes have different blocking rules
-            mobile_urls = [
-                "https://m.bookmyshow.com/explore/events-mumbai?categories=music-shows",
-                "https://in.bookmyshow.com/mobile/events-mumbai?categories=music-shows"
-            ]
-            
-            mobile_headers = self.get_headers()
-            mobile_headers['User-Agent'] = 'Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1'
-            
-            for mobile_url in mobile_urls:
+            for candidate in self.schedule(self.ranked_candidates(3, target)):
                 try:
-                    time.sleep(random.uniform(3, 8))  # Random delay
-                    response = requests.get(mobile_url, headers=mobile_headers, timeout=30)
+                    events = self.fetch_candidate(candidate)
                     
-                    if response.status_code == 200:
+                    if events is not None:
                         print("✅ Mobile version worked!")
-                        return self.extract_events_from_html(response.text, "Mobile BookMyShow")
+                        return events
                 
                 except Exception as e:
                     print(f"Mobile URL failed: {e}")
@@ -136,41 +2655,17 @@ class BookMyShowScraper:
             print(f"❌ Mobile version error: {e}")
             return []
     
-    def method_4_api_endpoint(self):
+    def method_4_api_endpoint(self, target=DEFAULT_TARGET):
         """Try to find API endpoints that BookMyShow might use"""
         print("🔍 Method 4: Trying API Endpoints...")
         
         try:
-            # Sometimes there are public API endpoints
-            api_urls = [
-                "https://in.bookmyshow.com/api/explore/events?city=mumbai&category=music-shows",
-                "https://in.bookmyshow.com/serv/getData?cmd=GETEVENTS&t=20250722&city=MUMBAI",
-                "https://in.bookmyshow.com/bms/events?city=mumbai&type=music"
-            ]
-            
-            api_headers = self.get_headers()
-            api_headers.update({
-                'Accept': 'application/json, text/plain, */*',
-                'X-Requested-With': 'XMLHttpRequest',
-                'Referer': 'https://in.bookmyshow.com/'
-            })
-            
-            for api_url in api_urls:
+            for candidate in self.schedule(self.ranked_candidates(4, target)):
                 try:
-                    time.sleep(random.uniform(2, 5))
-                    response = requests.get(api_url, headers=api_headers, timeout=30)
+                    events = self.fetch_candidate(candidate)
                     
-                    if response.status_code == 200:
-                        try:
-                            # Try JSON response
-                            data = response.json()
-                            print("✅ API endpoint worked!")
-                            return self.extract_events_from_json(data, "BookMyShow API")
-                        except:
-                            # Try HTML response
-                            if 'music' in response.text.lower():
-                                print("✅ API endpoint (HTML) worked!")
-                                return self.extract_events_from_html(response.text, "BookMyShow API")
+                    if events is not None:
+                        return events
                 
                 except Exception as e:
                     print(f"API URL failed: {e}")
@@ -183,158 +2678,376 @@ class BookMyShowScraper:
             print(f"❌ API endpoints error: {e}")
             return []
     
-    def extract_events_from_html(self, html_content, source):
+    def iter_embedded_json(self, html_content):
+        """Yield the raw text of every embedded JSON payload, found with plain substring scans"""
+        for marker, kind in EMBEDDED_JSON_MARKERS:
+            position = html_content.find(marker)
+            while position != -1:
+                if kind == 'script':
+                    start = html_content.find('>', position) + 1
+                else:
+                    start = html_content.find('=', position + len(marker)) + 1
+                end = html_content.find('</script>', start)
+                if start <= 0 or end == -1:
+                    break
+                
+                payload = html_content[start:end].strip()
+                if kind == 'assignment':
+                    payload = payload.rstrip(';')
+                if payload:
+                    yield payload
+                position = html_content.find(marker, end)
+    
+    def extract_events_from_embedded_json(self, html_content, source, target=DEFAULT_TARGET):
+        """Extract events from __NEXT_DATA__ / ld+json / initial-state payloads, without a DOM"""
+        loose_events = []
+        best = []
+        
+        for payload in self.iter_embedded_json(html_content):
+            try:
+                data = json_loads(payload)
+            except ValueError:
+                continue
+            
+            # ld+json pages often ship one script per event
+            for item in data if isinstance(data, list) else [data]:
+                if is_event_like(item):
+                    loose_events.append(item)
+            
+            found = find_event_list(data)
+            if len(found) > len(best):
+                best = found
+        
+        if len(loose_events) > len(best):
+            best = loose_events
+        if not best:
+            return []
+        
+        # The same category filter extract_single_event applies to DOM cards
+        matcher = self.keyword_matcher(target[1])
+        return [event for event in self.extract_events_from_json(best, source, target)
+                if matcher.has_keyword(event['title'])]
+    
+    def outermost(self, elements, limit):
+        """The first `limit` elements not nested in an earlier one, since a selector like
+        [data-testid*="event"] matches parts of a card as well as the card itself
+        """
+        parser = self.parser
+        kept = []
+        inside = set()
+        for element in elements:
+            if len(kept) >= limit:
+                break
+            if parser.node_id(element) in inside:
+                continue
+            kept.append(element)
+            inside.update(parser.node_id(node) for node in parser.descendants(element))
+        return kept
+    
+    def extract_events_from_html(self, html_content, source, target=DEFAULT_TARGET):
         """Extract events from HTML content"""
         events = []
         
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Multiple selectors to try for BookMyShow events
-            selectors = [
-                '[data-testid*="event"]',
-                '.event-card', '.eventCard',
-                '.event-item', '.eventItem',
-                '.listing-card', '.listingCard',
-                'div[class*="event"]',
-                'article[class*="event"]',
-                '.card[href*="/events/"]',
-                'a[href*="/events/"]'
-            ]
-            
-            event_elements = []
-            for selector in selectors:
-                elements = soup.select(selector)
-                if elements and len(elements) > 2:  # Need at least 3 events
-                    event_elements = elements
-                    print(f"✅ Found {len(elements)} events using selector: {selector}")
-                    break
-            
-            # If no specific selectors work, try to find event-like content
-            if not event_elements:
-                # Look for links containing 'events'
-                event_elements = soup.find_all('a', href=lambda x: x and 'events' in x)[:20]
-                if event_elements:
-                    print(f"✅ Found {len(event_elements)} event links as fallback")
+            if self.embedded_json:
+                with self.metrics.stage('embedded_json'):
+                    events = self.extract_events_from_embedded_json(html_content, source, target)
+                if events:
+                    print("⚡ Found embedded JSON listing data, skipped DOM parsing")
+                    print(f"📊 Extracted {len(events)} events from {source}")
+                    return events
+            
+            with self.metrics.stage('parse'):
+                soup = self.parser.parse(html_content)
+            
+            # Classify every node against all card selectors in one traversal
+            with self.metrics.stage('select'):
+                matches = self.card_engine.scan(self.parser.iter_all(soup), self.parser)
+            
+            event_elements = []
+            for selector, elements in zip(CARD_SELECTORS, matches['card']):
+                if elements and len(elements) > 2:  # Need at least 3 events
+                    event_elements = elements
+                    print(f"✅ Found {len(elements)} events using selector: {selector}")
+                    break
+            
+            # If no specific selectors work, try to find event-like content
+            if not event_elements:
+                # Look for links containing 'events'
+                event_elements = matches['fallback'][0][:20]
+                if event_elements:
+                    print(f"✅ Found {len(event_elements)} event links as fallback")
+            
+            for element in self.outermost(event_elements, 15):  # Limit to 15 events
+                try:
+                    event = self.extract_card(element, soup, target)
+                    if event and event.get('title'):
+                        event['source'] = source
+                        events.append(event)
+                except Exception as e:
+                    continue
+            
+            # Additional text-based extraction for cached pages
+            if not events:
+                with self.metrics.stage('extract_text'):
+                    events = self.extract_events_from_text(html_content, source, target)
+            
+            print(f"📊 Extracted {len(events)} events from {source}")
+            return events
+            
+        except Exception as e:
+            print(f"❌ HTML extraction error: {e}")
+            return []
+    
+    def get_extract_pool(self):
+        """Process pool for HTML extraction, started on first use
+        
+        Workers are spawned rather than forked because the parent runs fetch threads;
+        each builds an extraction-only scraper once with this scraper's parser and keyword settings.
+        """
+        with self.extract_pool_lock:
+            if self.extract_pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                
+                workers = self.extract_processes or os.cpu_count() or 1
+                self.extract_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=init_extract_worker,
+                    initargs=(self.parser.name, self.embedded_json, self.category_keywords)
+                )
+                self.extract_pool_size = workers
+            return self.extract_pool
+    
+    def close_extract_pool(self):
+        with self.extract_pool_lock:
+            if self.extract_pool is not None:
+                self.extract_pool.shutdown(cancel_futures=True)
+                self.extract_pool = None
+    
+    def extract_events_offloaded(self, content, encoding, source, target=DEFAULT_TARGET):
+        """extract_events_from_html for one raw page, run in the extraction process pool"""
+        future = self.get_extract_pool().submit(extract_chunk, [(0, content, encoding, source, target)])
+        events = future.result()[0][1]
+        print(f"📊 Extracted {len(events)} events from {source}")
+        return events
+    
+    def extract_events_batch(self, payloads, chunksize=None, target=DEFAULT_TARGET):
+        """Extract events from many (html, source[, target]) payloads across processes
+        
+        html may be bytes (decoded as UTF-8 in the worker, so nothing is re-encoded)
+        or str. Payloads are sent in chunks; (index, source, events) tuples are
+        yielded as each chunk completes, so results arrive out of order.
+        """
+        items = []
+        for index, payload in enumerate(payloads):
+            html, source = payload[0], payload[1]
+            if isinstance(html, str):
+                html = html.encode('utf-8')
+            items.append((index, html, 'utf-8', source, payload[2] if len(payload) > 2 else target))
+        if not items:
+            return
+        
+        pool = self.get_extract_pool()
+        chunksize = chunksize or max(1, math.ceil(len(items) / (self.extract_pool_size * 4)))
+        futures = [pool.submit(extract_chunk, items[i:i + chunksize]) for i in range(0, len(items), chunksize)]
+        
+        try:
+            for future in as_completed(futures):
+                for index, events in future.result():
+                    yield index, items[index][3], events
+        finally:
+            for future in futures:
+                future.cancel()
+    
+    def iter_events_streaming(self, response, source, max_cards=15, stop=None, state=None, target=DEFAULT_TARGET):
+        """Yield the events extract_events_from_html's DOM path would return, as a streamed response's cards close"""
+        from lxml import etree
+        
+        # The caller reads back download stats, whether state['require'] was seen and the raw bytes (until an event is yielded)
+        state = state if state is not None else {}
+        require = state.get('require')
+        state.update(require_seen=require is None, raw=[], bytes=0, aborted=False)
+        
+        parser = LxmlBackend()
+        content_type = response.headers.get('Content-Type', '')
+        encoding = response.encoding if 'charset=' in content_type else 'utf-8'
+        pull = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding)
+        
+        # Per card selector (fallback last): nodes opened so far, the card it kept that is still
+        # open, and one slot per kept card that is filled in when the card closes. As in
+        # outermost(), a node inside a kept card is not kept, and the fallback selector only
+        # considers its first 20 nodes. Only the top selector can't be overtaken later in the
+        # page, so only its cards go out (and end the download) before the page is complete.
+        fallback = len(CARD_SELECTORS)
+        pending = object()
+        opened = [0] * (fallback + 1)
+        open_kept = [None] * (fallback + 1)
+        slots = [[] for _ in range(fallback + 1)]
+        yielded = [0] * (fallback + 1)
+        open_cards = {}
+        tail = b''
+        
+        def current_winner():
+            for index in range(fallback):
+                if opened[index] > 2:
+                    return index
+            return fallback if opened[fallback] else None
+        
+        def process(events):
+            for action, element in events:
+                if action == 'start':
+                    positions = []
+                    for rule in self.card_engine.classify(element, parser):
+                        if rule.group == 'card':
+                            index = rule.index
+                        elif rule.index == 0:
+                            index = fallback
+                        else:
+                            continue
+                        if (open_kept[index] is None and len(slots[index]) < max_cards
+                                and (index < fallback or opened[index] < 20)):
+                            positions.append((index, len(slots[index])))
+                            slots[index].append(pending)
+                            open_kept[index] = element
+                        opened[index] += 1
+                    if positions:
+                        open_cards[element] = positions
+                    continue
+                
+                positions = open_cards.pop(element, None)
+                if positions:
+                    with self.metrics.stage('extract_event'):
+                        event = self.extract_single_event(element, None, parser, target)
+                    if event and event.get('title'):
+                        event['source'] = source
+                    else:
+                        event = None
+                    for index, position in positions:
+                        slots[index][position] = event
+                        open_kept[index] = None
+                
+                # Nothing still open needs this subtree any more
+                if not open_cards:
+                    element.clear(keep_tail=True)
+                    parent = element.getparent()
+                    while parent is not None and element.getprevious() is not None:
+                        del parent[0]
+        
+        def flush(winner):
+            while yielded[winner] < len(slots[winner]) and slots[winner][yielded[winner]] is not pending:
+                event = slots[winner][yielded[winner]]
+                yielded[winner] += 1
+                if event:
+                    state['raw'] = None
+                    yield event
+        
+        try:
+            for chunk in response.iter_content(chunk_size=16384):
+                if stop is not None and stop.is_set():
+                    state['aborted'] = True
+                    return
+                
+                state['bytes'] += len(chunk)
+                if not state['require_seen']:
+                    window = tail + chunk.lower()
+                    state['require_seen'] = require.has_keyword(window)
+                    tail = window[-require.longest:] if require.longest else b''
+                if state['raw'] is not None:
+                    state['raw'].append(chunk)
+                
+                pull.feed(chunk)
+                process(pull.read_events())
+                if opened[0] > 2:
+                    yield from flush(0)
+                    if yielded[0] >= max_cards:
+                        state['aborted'] = True
+                        return
             
-            for element in event_elements[:15]:  # Limit to 15 events
-                try:
-                    event = self.extract_single_event(element, soup)
-                    if event and event.get('title'):
-                        event['source'] = source
-                        events.append(event)
-                except Exception as e:
-                    continue
+            pull.close()
+            process(pull.read_events())
+            winner = current_winner()
+            if winner is not None:
+                yield from flush(winner)
+        finally:
+            response.close()
+    
+    def extract_events_streaming(self, response, source, require=None, stop=None, target=DEFAULT_TARGET):
+        """Streaming counterpart of extract_events_from_html; None if `require` never showed up"""
+        try:
+            state = {'require': require}
+            events = list(self.iter_events_streaming(response, source, stop=stop, state=state, target=target))
             
-            # Additional text-based extraction for cached pages
             if not events:
-                events = self.extract_events_from_text(html_content, source)
+                if not state['require_seen']:
+                    return None
+                
+                # Additional text-based extraction for cached pages
+                raw = b''.join(state['raw'] or [])
+                events = self.extract_events_from_text(raw.decode('utf-8', errors='replace'), source, target)
             
-            print(f"📊 Extracted {len(events)} events from {source}")
+            early = ', download aborted early' if state['aborted'] else ''
+            print(f"📊 Extracted {len(events)} events from {source} (streamed {state['bytes'] / 1024:.0f} KiB{early})")
             return events
             
         except Exception as e:
-            print(f"❌ HTML extraction error: {e}")
+            print(f"❌ Streaming extraction error: {e}")
             return []
     
-    def extract_single_event(self, element, soup):
+    def extract_single_event(self, element, soup, parser=None, target=DEFAULT_TARGET):
         """Extract single event details"""
-        event = {
-            'title': '',
-            'date': '',
-            'venue': '',
-            'price': '',
-            'url': '',
-            'id': ''
-        }
+        event = Event(title='', date='', venue='', price='', url='', id='')
         
         try:
+            # Classify every descendant against all field selectors in one traversal
+            parser = parser or self.parser
+            fields = self.field_engine.scan(parser.descendants(element), parser, first_only=True)
+            
             # Title extraction
-            title_selectors = ['h1', 'h2', 'h3', 'h4', '[data-testid*="title"]', '.title', '.name']
-            for selector in title_selectors:
-                title_elem = element.find(selector) if hasattr(element, 'find') else element.select_one(selector)
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
+            for title_elem in fields['title']:
+                if title_elem is not None:
+                    title = parser.text(title_elem)
                     if title and len(title) > 5:
                         event['title'] = title
                         break
             
-            # If no title found, use element text or href
+            # If no title found, use element text
             if not event['title']:
-                if hasattr(element, 'get_text'):
-                    text = element.get_text(strip=True)
-                    if text and len(text) < 150:
-                        event['title'] = text
-                elif hasattr(element, 'get') and element.get('href'):
-                    # Extract title from URL
-                    href = element.get('href', '')
-                    if '/events/' in href:
-                        title_from_url = href.split('/events/')[-1].replace('-', ' ').replace('/', '').title()
-                        event['title'] = title_from_url[:100]
-            
-            # Date extraction
-            date_selectors = [
-                '[data-testid*="date"]', '.date', '.event-date',
-                'time', '.datetime', '[class*="date"]'
-            ]
-            for selector in date_selectors:
-                date_elem = element.find(selector) if hasattr(element, 'find') else element.select_one(selector)
-                if date_elem:
-                    event['date'] = date_elem.get_text(strip=True)
-                    break
+                text = parser.text(element)
+                if text and len(text) < 150:
+                    event['title'] = text
             
-            # Venue extraction
-            venue_selectors = [
-                '[data-testid*="venue"]', '.venue', '.location',
-                '[class*="venue"]', '[class*="location"]'
-            ]
-            for selector in venue_selectors:
-                venue_elem = element.find(selector) if hasattr(element, 'find') else element.select_one(selector)
-                if venue_elem:
-                    event['venue'] = venue_elem.get_text(strip=True)
-                    break
+            # Date, venue and price: first selector (in priority order) that matched
+            for field in ('date', 'venue', 'price'):
+                for field_elem in fields[field]:
+                    if field_elem is not None:
+                        event[field] = parser.text(field_elem)
+                        break
             
             if not event['venue']:
-                event['venue'] = 'Mumbai'
-            
-            # Price extraction
-            price_selectors = [
-                '[data-testid*="price"]', '.price', '[class*="price"]',
-                '[class*="cost"]', '.amount'
-            ]
-            for selector in price_selectors:
-                price_elem = element.find(selector) if hasattr(element, 'find') else element.select_one(selector)
-                if price_elem:
-                    event['price'] = price_elem.get_text(strip=True)
-                    break
+                event['venue'] = city_name(target)
             
             if not event['price']:
                 event['price'] = 'Check website'
             
             # URL extraction
-            if hasattr(element, 'get') and element.get('href'):
-                href = element.get('href')
+            href = parser.attr(element, 'href')
+            if not href:
+                link_elem = parser.find(element, 'a')
+                href = parser.attr(link_elem, 'href') if link_elem is not None else None
+            
+            if href:
                 if href.startswith('/'):
                     event['url'] = f"https://in.bookmyshow.com{href}"
                 elif href.startswith('http'):
                     event['url'] = href
-            elif hasattr(element, 'find'):
-                link_elem = element.find('a')
-                if link_elem and link_elem.get('href'):
-                    href = link_elem.get('href')
-                    if href.startswith('/'):
-                        event['url'] = f"https://in.bookmyshow.com{href}"
-                    elif href.startswith('http'):
-                        event['url'] = href
             
             # Create unique ID
-            title_for_id = event['title'][:50] if event['title'] else 'event'
-            date_for_id = event['date'][:20] if event['date'] else datetime.now().strftime('%Y%m%d')
-            event['id'] = f"{title_for_id}_{date_for_id}".replace(' ', '_').lower()
+            event['id'] = make_event_id(event)
             
-            # Only return events that seem to be music-related
-            title_lower = event['title'].lower()
-            if any(keyword in title_lower for keyword in ['music', 'concert', 'live', 'show', 'performance', 'gig', 'festival']):
+            # Only return events that match the category's keywords
+            if self.keyword_matcher(target[1]).has_keyword(event['title']):
                 return event
             
             return None
@@ -343,7 +3056,7 @@ class BookMyShowScraper:
             print(f"⚠️ Error extracting single event: {e}")
             return None
     
-    def extract_events_from_json(self, json_data, source):
+    def extract_events_from_json(self, json_data, source, target=DEFAULT_TARGET):
         """Extract events from JSON API response"""
         events = []
         
@@ -359,17 +3072,31 @@ class BookMyShowScraper:
             
             for item in events_data[:15]:
                 try:
-                    event = {
-                        'title': item.get('name', item.get('title', item.get('eventName', ''))),
-                        'date': item.get('date', item.get('eventDate', item.get('startDate', ''))),
-                        'venue': item.get('venue', item.get('location', 'Mumbai')),
-                        'price': item.get('price', item.get('ticketPrice', 'Check website')),
-                        'url': item.get('url', item.get('bookingUrl', '')),
-                        'source': source
-                    }
+                    venue = item.get('venue', item.get('location', city_name(target)))
+                    if isinstance(venue, dict):
+                        # schema.org Place
+                        venue = venue.get('name') or venue.get('address', {}).get('addressLocality', city_name(target))
+                    
+                    price = item.get('price', item.get('ticketPrice', item.get('offers', 'Check website')))
+                    if isinstance(price, list):
+                        price = price[0] if price else 'Check website'
+                    if isinstance(price, dict):
+                        # schema.org Offer / AggregateOffer
+                        amount = price.get('lowPrice', price.get('price'))
+                        price = f"{price.get('priceCurrency', '')} {amount}".strip() if amount is not None else 'Check website'
+                    
+                    # JSON nulls become the same defaults as missing keys
+                    event = Event(
+                        title=str(item.get('name') or item.get('title') or item.get('eventName') or ''),
+                        date=str(item.get('date') or item.get('eventDate') or item.get('startDate') or ''),
+                        venue=str(venue or city_name(target)),
+                        price=str('Check website' if price is None else price),
+                        url=str(item.get('url') or item.get('bookingUrl') or ''),
+                        source=source
+                    )
                     
                     if event['title']:
-                        event['id'] = f"{event['title'][:50]}_{event['date'][:20]}".replace(' ', '_').lower()
+                        event['id'] = make_event_id(event)
                         events.append(event)
                         
                 except Exception as e:
@@ -381,41 +3108,29 @@ class BookMyShowScraper:
             print(f"❌ JSON extraction error: {e}")
             return []
     
-    def extract_events_from_text(self, text_content, source):
+    def extract_events_from_text(self, text_content, source, target=DEFAULT_TARGET):
         """Extract events from plain text (fallback method)"""
         events = []
         
         try:
-            # Look for patterns in text that might be events
-            lines = text_content.split('\n')
+            # Lines of 10-200 chars with a category keyword and no navigation/menu keyword
+            matcher = self.keyword_matcher(target[1])
             
-            for line in lines:
-                line = line.strip()
+            for line in matcher.iter_lines(text_content, min_length=10, max_length=200):
+                event = Event(
+                    title=line,
+                    date='Check website',
+                    venue=city_name(target),
+                    price='Check website',
+                    url=listing_url(target),
+                    source=source
+                )
+                event['id'] = make_event_id(event)
                 
-                # Skip empty lines or very short lines
-                if len(line) < 10 or len(line) > 200:
-                    continue
+                events.append(event)
                 
-                # Look for music-related keywords
-                if any(keyword in line.lower() for keyword in ['concert', 'music', 'live', 'show', 'festival', 'performance']):
-                    # Skip navigation/menu items
-                    if any(skip in line.lower() for skip in ['menu', 'login', 'sign up', 'footer', 'header', 'search']):
-                        continue
-                    
-                    event = {
-                        'title': line,
-                        'date': 'Check website',
-                        'venue': 'Mumbai',
-                        'price': 'Check website',
-                        'url': 'https://in.bookmyshow.com/explore/events-mumbai?categories=music-shows',
-                        'source': source,
-                        'id': f"{line[:50]}_{datetime.now().strftime('%Y%m%d')}".replace(' ', '_').lower()
-                    }
-                    
-                    events.append(event)
-                    
-                    if len(events) >= 10:  # Limit to 10 events from text
-                        break
+                if len(events) >= 10:  # Limit to 10 events from text
+                    break
             
             return events
             
@@ -423,197 +3138,887 @@ class BookMyShowScraper:
             print(f"❌ Text extraction error: {e}")
             return []
     
-    def scrape_events(self):
-        """Main scraping function that tries all methods"""
-        all_events = []
+    @contextmanager
+    def host_slot(self, host, stop=None):
+        """Hold one of the per-host request slots once the host's token bucket allows a request
+        
+        Yields False without a request slot if `stop` got set while waiting for the token.
+        """
+        with self.host_lock:
+            semaphore = self.host_semaphores.setdefault(host, threading.Semaphore(self.host_max_parallel))
+        
+        with semaphore:
+            waited = self.rate_limiter.acquire(host, stop)
+            if waited:
+                self.metrics.observe('rate_limit_wait', waited)
+            yield waited is not None
+    
+    def record_host_response(self, host, response):
+        """Tell the rate limiter how a host answered, pausing it on 429/503"""
+        pause = self.rate_limiter.record(host, response.status_code, response.headers.get('Retry-After'))
+        if pause:
+            self.metrics.count('throttled', host=host)
+            print(f"🚦 {host} answered {response.status_code}, pausing it for {pause:.0f}s")
+    
+    def schedule(self, candidates):
+        """Yield candidates in order, but any whose host is ready before those still waiting on a token
+        
+        A candidate whose host stays throttled longer than HOST_MAX_WAIT is skipped,
+        so one paused host never holds up the other hosts a method can use.
+        """
+        pending = list(candidates)
+        while pending:
+            delays = [self.rate_limiter.delay(urllib.parse.urlsplit(c['url']).netloc) for c in pending]
+            ready = [index for index, delay in enumerate(delays) if delay <= 0]
+            best = ready[0] if ready else min(range(len(pending)), key=delays.__getitem__)
+            candidate = pending.pop(best)
+            if delays[best] > self.host_max_wait:
+                print(f"⏳ Skipping {candidate['url']}: host throttled for another {delays[best]:.0f}s")
+                continue
+            yield candidate
+    
+    def race_candidate(self, candidate, stop):
+        """Fetch a candidate for race mode, bailing out early once another candidate has won"""
+        if stop.is_set():
+            return None
+        
+        started = time.monotonic()
+        key = f"url:{candidate['url']}"
+        try:
+            response = self.request_candidate(candidate, stop)
+            if response is None:
+                return None
+            
+            if stop.is_set():
+                response.close()
+                return None
+            
+            events = self.handle_candidate_response(candidate, response, stop)
+        except Exception:
+            self.source_stats.record(key, False, time.monotonic() - started)
+            raise
+        
+        # Candidates cut short by another winner say nothing about their own reliability
+        if events or not stop.is_set():
+            self.source_stats.record(key, bool(events), time.monotonic() - started, len(events or []))
+        return events
+    
+    def scrape_events_race(self, target=DEFAULT_TARGET):
+        """Fire every candidate URL of every method at once and keep the first validated result"""
+        candidates = [c for i in range(1, len(self.methods) + 1) for c in self.ranked_candidates(i, target)]
+        print(f"🏁 Race mode: firing {len(candidates)} candidate URLs across {len(self.methods)} methods...")
+        
+        stop = threading.Event()
+        started = time.monotonic()
+        pool = ThreadPoolExecutor(max_workers=len(candidates))
+        futures = {pool.submit(self.race_candidate, c, stop): c for c in candidates}
         
-        print("🚀 Starting BookMyShow scraping with multiple bypass methods...")
+        try:
+            for future in as_completed(futures):
+                candidate = futures[future]
+                
+                try:
+                    events = future.result()
+                except Exception as e:
+                    print(f"❌ {candidate['source']} ({candidate['url']}) failed: {e}")
+                    continue
+                
+                if events:
+                    elapsed = time.monotonic() - started
+                    self.race_winners[target_label(target)] = {
+                        'method': candidate['method'],
+                        'source': candidate['source'],
+                        'url': candidate['url'],
+                        'elapsed': round(elapsed, 3)
+                    }
+                    print(f"🏆 Method {candidate['method']} ({candidate['source']}) won in {elapsed:.2f}s with {len(events)} events")
+                    return events
+            
+            print(f"❌ No candidate produced events ({time.monotonic() - started:.2f}s)")
+            return []
+            
+        finally:
+            # Stop in-flight workers from extracting and drop everything not yet started
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def method_order(self):
+        """Method numbers to try, best-first by history (benched methods dropped) or in fixed order"""
+        numbers = list(range(1, len(self.methods) + 1))
+        if not self.adaptive:
+            return numbers
         
-        for i, method in enumerate(self.methods, 1):
-            print(f"\n🔄 Trying method {i}/4...")
+        ranked = self.source_stats.rank([f"method:{i}" for i in numbers])
+        order = [int(key.split(':')[1]) for key in ranked]
+        for i in numbers:
+            if i not in order:
+                print(f"⏸️ Method {i} is in cooldown ({self.source_stats.summary(f'method:{i}')})")
+        return order
+    
+    def scrape_events_sequential(self, target=DEFAULT_TARGET):
+        """Try each method in turn, stopping at the first one that finds events"""
+        order = self.method_order()
+        for position, i in enumerate(order, 1):
+            key = f"method:{i}"
+            print(f"\n🔄 Trying method {i} ({position}/{len(order)}, {self.source_stats.summary(key)})...")
+            started = time.monotonic()
             
             try:
-                events = method()
+                events = self.methods[i - 1](target)
+                self.source_stats.record(key, bool(events), time.monotonic() - started, len(events or []))
                 
                 if events:
                     print(f"✅ Method {i} found {len(events)} events!")
-                    all_events.extend(events)
-                    break  # Stop at first successful method
+                    return events  # Stop at first successful method
                 else:
                     print(f"❌ Method {i} found no events")
                 
-                # Add delay between methods
-                time.sleep(random.uniform(5, 10))
-                
             except Exception as e:
+                self.source_stats.record(key, False, time.monotonic() - started)
                 print(f"❌ Method {i} failed: {e}")
                 continue
         
-        # Remove duplicates
+        return []
+    
+    def scrape_target(self, target=DEFAULT_TARGET):
+        """Scrape one (city, category) target with the configured mode"""
+        print(f"🚀 Starting BookMyShow scraping for {target_label(target)} with multiple bypass methods...")
+        
+        with self.metrics.stage('scrape_target'):
+            if self.mode == 'race':
+                all_events = self.scrape_events_race(target)
+            else:
+                all_events = self.scrape_events_sequential(target)
+        
+        # Remove duplicates (same code/slug/title+date, or a near-identical title)
         unique_events = []
-        seen_titles = set()
+        seen = IdentityIndex()
         
-        for event in all_events:
-            title_key = event['title'].lower().strip()[:30]
-            if title_key not in seen_titles and len(title_key) > 5:
-                seen_titles.add(title_key)
+        with self.metrics.stage('dedup'):
+            for event in all_events:
+                event['city'], event['category'] = target
+                if len(event['title'].strip()) <= 5 or seen.lookup(event):
+                    continue
+                seen.add(event, event['id'])
                 unique_events.append(event)
         
-        print(f"\n📊 Final result: {len(unique_events)} unique events found")
+        self.metrics.count('events_found', len(unique_events), target=target_label(target))
+        print(f"\n📊 {target_label(target)}: {len(unique_events)} unique events found")
         return unique_events[:20]  # Limit to 20 events
     
-    def load_previous_events(self):
-        """Load previously found events"""
+    def crawl(self, targets):
+        """Fan targets out over a bounded worker pool; returns {target: events}
+        
+        CRAWL_CONCURRENCY caps how many targets are in flight at once, while
+        host_slot keeps every domain within its own parallelism and rate limits.
+        """
+        results = {}
+        started = time.monotonic()
+        print(f"🗺️ Crawling {len(targets)} targets with concurrency {self.crawl_concurrency}...")
+        
+        with ThreadPoolExecutor(max_workers=self.crawl_concurrency) as pool:
+            futures = {pool.submit(self.scrape_target, target): target for target in targets}
+            
+            for future in as_completed(futures):
+                target = futures[future]
+                try:
+                    results[target] = future.result()
+                except Exception as e:
+                    print(f"❌ {target_label(target)} failed: {e}")
+                    results[target] = []
+        
+        total = sum(len(events) for events in results.values())
+        print(f"🗺️ Crawled {len(targets)} targets in {time.monotonic() - started:.1f}s, {total} events")
+        return results
+    
+    def scrape_events(self):
+        """Main scraping function: every configured target, merged in target order"""
+        if len(self.targets) == 1:
+            return self.scrape_target(self.targets[0])
+        
+        results = self.crawl(self.targets)
+        all_events = []
+        for target in self.targets:
+            all_events.extend(results.get(target, []))
+        
+        print(f"\n📊 Final result: {len(all_events)} events across {len(self.targets)} targets")
+        return all_events
+    
+    def load_enrichment_cache(self):
+        """Load cached detail-page results ({url: {'fetched': ts, 'details': {...}}})"""
+        if self.enrichment_cache is not None:
+            return self.enrichment_cache
         try:
-            if os.path.exists(self.events_file):
-                with open(self.events_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return []
+            if os.path.exists(self.enrichment_file):
+                with open(self.enrichment_file, 'r', encoding='utf-8') as f:
+                    self.enrichment_cache = json.load(f)
         except Exception as e:
-            print(f"⚠️ Error loading previous events: {e}")
-            return []
+            print(f"⚠️ Error loading enrichment cache: {e}")
+        if self.enrichment_cache is None:
+            self.enrichment_cache = {}
+        return self.enrichment_cache
+    
+    def save_enrichment_cache(self, cache):
+        """Save the enrichment cache, dropping entries past their TTL"""
+        try:
+            now = time.time()
+            fresh = {url: entry for url, entry in cache.items() if now - entry['fetched'] < self.enrich_ttl}
+            self.enrichment_cache = fresh
+            with open(self.enrichment_file, 'w', encoding='utf-8') as f:
+                json.dump(fresh, f, ensure_ascii=False)
+        except Exception as e:
+            print(f"❌ Error saving enrichment cache: {e}")
+    
+    def extract_event_details(self, html_content, target=DEFAULT_TARGET):
+        """Pull date/venue/price/lineup from an event detail page (embedded JSON first, then DOM)"""
+        details = {}
+        
+        for payload in self.iter_embedded_json(html_content):
+            try:
+                data = json_loads(payload)
+            except ValueError:
+                continue
+            
+            if isinstance(data, dict):
+                items = data.get('@graph', [data])
+            else:
+                items = data if isinstance(data, list) else []
+            
+            for item in items:
+                if not is_event_like(item):
+                    continue
+                
+                normalized = self.extract_events_from_json([item], "Detail page", target)
+                if normalized:
+                    for field in ('date', 'venue', 'price'):
+                        if normalized[0][field]:
+                            details.setdefault(field, normalized[0][field])
+                
+                performers = item.get('performer') or []
+                if isinstance(performers, dict):
+                    performers = [performers]
+                names = [p.get('name') for p in performers if isinstance(p, dict) and p.get('name')]
+                if names:
+                    details.setdefault('lineup', ', '.join(names))
+        
+        if len(details) == 4:
+            return details
+        
+        # DOM fallback for whatever the embedded data didn't cover
+        document = self.parser.parse(html_content)
+        fields = self.detail_engine.scan(self.parser.iter_all(document), self.parser, first_only=True)
+        for field, matches in fields.items():
+            for node in matches:
+                if node is not None:
+                    text = self.parser.text(node)
+                    if text:
+                        details.setdefault(field, text)
+                        break
+        
+        return details
+    
+    def fetch_event_details(self, url, target=DEFAULT_TARGET):
+        """Fetch one detail page and extract its details; None if the page is unusable"""
+        host = urllib.parse.urlsplit(url).netloc
+        with self.host_slot(host):
+            response = self.http_get(url, headers=self.get_headers())
+        self.record_host_response(host, response)
+        
+        if response.status_code != 200:
+            return None
+        return self.extract_event_details(response.text, target)
+    
+    def apply_event_details(self, event, details):
+        """Replace placeholder fields of an event with detail-page values"""
+        for field, empty_values in placeholder_values(event_target(event)).items():
+            if event.get(field, '') in empty_values and details.get(field):
+                event[field] = details[field]
+        if details.get('lineup'):
+            event['lineup'] = details['lineup']
+    
+    def enrich_events(self, events):
+        """Fill in real date/venue/price/lineup from each event's detail page, in parallel"""
+        cache = self.load_enrichment_cache()
+        now = time.time()
+        to_fetch = {}
+        cached = 0
+        
+        for event in events:
+            url = event.get('url')
+            # Text-fallback events only point back at the listing page
+            if not url or url == listing_url(event_target(event)):
+                continue
+            entry = cache.get(url)
+            if entry and now - entry['fetched'] < self.enrich_ttl:
+                self.apply_event_details(event, entry['details'])
+                cached += 1
+            else:
+                to_fetch.setdefault(url, []).append(event)
+        
+        print(f"🔎 Enriching {len(to_fetch)} events from detail pages ({cached} served from cache)...")
+        
+        with ThreadPoolExecutor(max_workers=self.enrich_workers) as pool:
+            futures = {
+                pool.submit(self.fetch_event_details, url, event_target(batch[0])): url
+                for url, batch in to_fetch.items()
+            }
+            
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    details = future.result()
+                except Exception as e:
+                    print(f"⚠️ Detail page {url} failed: {e}")
+                    continue
+                
+                if details is None:
+                    continue
+                cache[url] = {'fetched': time.time(), 'details': details}
+                for event in to_fetch[url]:
+                    self.apply_event_details(event, details)
+        
+        self.save_enrichment_cache(cache)
+        return events
+    
+    def open_store(self):
+        """Open the SQLite event store, importing the legacy JSON file into an empty store"""
+        self.store = EventStore(self.events_db)
+        self.source_stats = SourceStats.from_env(self.store.load_source_stats())
+        if self.change_detection:
+            self.change_detector = ChangeDetector.load(self.fingerprints_file)
+        
+        if self.store.count() == 0 and os.path.exists(self.events_file):
+            try:
+                imported = self.store.import_json(self.events_file)
+                print(f"📦 Imported {imported} events from {self.events_file}")
+            except Exception as e:
+                print(f"⚠️ Error importing previous events: {e}")
+        
+        return self.store
     
     def save_events(self, events):
-        """Save events to file"""
+        """Record this run's events in the store (history is kept, not overwritten)"""
         try:
-            with open(self.events_file, 'w', encoding='utf-8') as f:
-                json.dump(events, f, indent=2, ensure_ascii=False)
-            print(f"💾 Saved {len(events)} events to file")
+            self.store.upsert(events)
+            print(f"💾 Saved {len(events)} events to {self.events_db}")
         except Exception as e:
             print(f"❌ Error saving events: {e}")
     
-    def find_new_events(self, current_events, previous_events):
-        """Find new events by comparing current vs previous"""
-        previous_ids = {event['id'] for event in previous_events}
-        new_events = [event for event in current_events if event['id'] not in previous_ids]
+    def save_source_stats(self):
+        """Persist method / URL history so the next run starts from it"""
+        try:
+            self.store.save_source_stats(self.source_stats.rows)
+        except Exception as e:
+            print(f"⚠️ Error saving source stats: {e}")
+    
+    def save_response_cache(self):
+        """Write the response cache index once per run, with the access times of this run's hits"""
+        try:
+            self.response_cache.flush()
+        except Exception as e:
+            print(f"⚠️ Error saving response cache index: {e}")
+    
+    def save_fingerprints(self):
+        if self.change_detector is None:
+            return
+        try:
+            self.change_detector.save(self.fingerprints_file)
+        except Exception as e:
+            print(f"⚠️ Error saving page fingerprints: {e}")
+    
+    def find_new_events(self, current_events):
+        """Find events that have never been seen before in the store
+        
+        Events this scraper already matched (in earlier daemon polls) take their
+        stored id from memory, so a poll only resolves the delta since the last one.
+        """
+        unseen = []
+        for event in current_events:
+            if event['id'] in self.known_ids:
+                event['id'] = self.known_ids[event['id']]
+            else:
+                unseen.append(event)
+        if len(unseen) < len(current_events):
+            print(f"♻️ {len(current_events) - len(unseen)} events unchanged since the last poll")
+        
+        scraped_ids = [event['id'] for event in unseen]
+        resolved = self.store.resolve(unseen)
+        if resolved:
+            print(f"🪪 Matched {resolved} events to existing identities")
+        
+        new_ids = self.store.new_ids(event['id'] for event in unseen)
+        new_events = [event for event in unseen if event['id'] in new_ids]
+        
+        # Scraped id -> stored id, so later polls skip straight to the resolved identity
+        for scraped_id, event in zip(scraped_ids, unseen):
+            self.known_ids[scraped_id] = event['id']
         
         print(f"🆕 Found {len(new_events)} new events")
         return new_events
     
+    def monitor_label(self):
+        """'Mumbai Music' for a single target, otherwise 'Multi-city'"""
+        if len(self.targets) == 1:
+            return target_label(self.targets[0])
+        return "Multi-city"
+    
+    def monitor_url(self):
+        """Listing page to link from emails"""
+        if len(self.targets) == 1:
+            return listing_url(self.targets[0])
+        return "https://in.bookmyshow.com/explore/home"
+    
+    def recipients(self):
+        """RECEIVER_EMAIL, which may list several comma-separated addresses"""
+        return [address.strip() for address in os.environ.get('RECEIVER_EMAIL', '').split(',') if address.strip()]
+    
     def send_email_alert(self, events):
-        """Send email with events"""
+        """Send every recipient a digest of events"""
+        return self.send_digests({recipient: events for recipient in self.recipients()})
+    
+    def send_digests(self, digests):
+        """Send one digest per recipient ({recipient: events}) over a single SMTP connection"""
+        sender_email = os.environ.get('SENDER_EMAIL')
+        dispatcher = SmtpDispatcher.from_env()
+        
+        if not all([sender_email, dispatcher.host, digests]):
+            print("❌ Missing email credentials")
+            return False
+        
+        # Recipients with the same events share one rendering; one that fails to render is skipped
+        rendered = {}
+        messages = []
+        skipped = 0
+        for recipient, events in digests.items():
+            if not events:
+                continue
+            try:
+                key = tuple(event['id'] for event in events)
+                if key not in rendered:
+                    rendered[key] = (self.create_email_text(events), self.create_email_html(events))
+                messages.append(self.create_email_message(sender_email, recipient, events, *rendered[key]))
+            except Exception as e:
+                skipped += 1
+                print(f"❌ Error rendering email for {recipient}: {e}")
+        
         try:
-            sender_email = os.environ.get('SENDER_EMAIL')
-            sender_password = os.environ.get('SENDER_PASSWORD')
-            receiver_email = os.environ.get('RECEIVER_EMAIL')
-            smtp_server = os.environ.get('SMTP_SERVER')
-            
-            if not all([sender_email, sender_password, receiver_email]):
-                print("❌ Missing email credentials")
-                return False
-            
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = f"🎵 BookMyShow Mumbai Music Events - {len(events)} Found!"
-            msg['From'] = sender_email
-            msg['To'] = receiver_email
-            
-            # Create email body
-            html_body = self.create_email_html(events)
-            text_body = self.create_email_text(events)
-            
-            text_part = MIMEText(text_body, 'plain')
-            html_part = MIMEText(html_body, 'html')
-            
-            msg.attach(text_part)
-            msg.attach(html_part)
-            
-            with smtplib.SMTP(smtp_server, 587) as server:
-                server.starttls()
-                server.login(sender_email, sender_password)
-                server.send_message(msg)
-            
-            print("✅ Email sent successfully!")
-            return True
-            
+            with dispatcher:
+                sent, failures = dispatcher.send_batch(messages)
         except Exception as e:
             print(f"❌ Error sending email: {e}")
             return False
+        
+        for recipient, error in failures:
+            print(f"❌ Error sending email to {recipient}: {error}")
+        self.metrics.count('emails_sent', sent)
+        print(f"✅ Sent {sent} emails over {dispatcher.connections} SMTP connection(s)")
+        return not failures and not skipped
     
-    def create_email_html(self, events):
-        """Create HTML email body"""
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; margin: 0; padding: 20px; }}
-                .header {{ background: linear-gradient(135deg, #e74c3c 0%, #c0392b 100%); color: white; padding: 20px; text-align: center; border-radius: 10px; margin-bottom: 20px; }}
-                .event-card {{ border: 1px solid #ddd; margin: 15px 0; padding: 20px; border-radius: 10px; background: #f9f9f9; }}
-                .event-title {{ font-size: 18px; font-weight: bold; color: #2c3e50; margin-bottom: 10px; }}
-                .event-detail {{ margin: 8px 0; }}
-                .source-tag {{ background: #3498db; color: white; padding: 3px 8px; border-radius: 3px; font-size: 12px; }}
-                .book-btn {{ background: #e74c3c; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>🎵 BookMyShow Mumbai Music Events!</h1>
-                <p>Found {len(events)} events</p>
-            </div>
-        """
+    def create_email_message(self, sender_email, recipient, events, text_body, html_body):
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
         
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = f"🎵 BookMyShow {self.digest_label(events)} Events - {len(events)} Found!"
+        msg['From'] = sender_email
+        msg['To'] = recipient
+        msg.attach(MIMEText(text_body, 'plain'))
+        msg.attach(MIMEText(html_body, 'html'))
+        return msg
+    
+    def digest_label(self, events):
+        """Label for a digest: its one target's label, otherwise 'Multi-city'"""
+        targets = {event_target(event) for event in events}
+        if len(targets) == 1:
+            return target_label(targets.pop())
+        return "Multi-city"
+    
+    def group_by_target(self, events):
+        """[(target label, events)] in first-seen order"""
+        groups = {}
         for event in events:
-            html += f"""
-            <div class="event-card">
-                <div class="event-title">{event['title']} <span class="source-tag">{event['source']}</span></div>
-                <div class="event-detail">📅 <strong>Date:</strong> {event['date']}</div>
-                <div class="event-detail">📍 <strong>Venue:</strong> {event['venue']}</div>
-                <div class="event-detail">💰 <strong>Price:</strong> {event['price']}</div>
-                {f'<a href="{event["url"]}" class="book-btn">View Details →</a>' if event['url'] else ''}
-            </div>
-            """
-        
-        html += f"""
-            <div style="margin-top: 30px; padding: 20px; background: #ecf0f1; border-radius: 10px; text-align: center;">
-                <p>Generated on {datetime.now().strftime('%Y-%m-%d at %H:%M IST')}</p>
-                <p><a href="https://in.bookmyshow.com/explore/events-mumbai?categories=music-shows">Visit BookMyShow directly</a></p>
-            </div>
-        </body>
-        </html>
-        """
-        return html
+            groups.setdefault(target_label(event_target(event)), []).append(event)
+        return list(groups.items())
     
-    def create_email_text(self, events):
-        """Create plain text email"""
-        text = f"🎵 BOOKMYSHOW MUMBAI MUSIC EVENTS!\n\nFound {len(events)} events:\n" + "="*50 + "\n\n"
+    def create_email_html(self, events):
+        """Create HTML email body (one section per city/category when there are several)"""
+        groups = self.group_by_target(events)
+        parts = [EMAIL_HTML_HEAD.format(label=escape(self.digest_label(events)), count=len(events))]
         
-        for i, event in enumerate(events, 1):
-            text += f"{i}. {event['title']} [{event['source']}]\n"
-            text += f"   📅 {event['date']}\n"
-            text += f"   📍 {event['venue']}\n"
-            text += f"   💰 {event['price']}\n"
-            if event['url']:
-                text += f"   🔗 {event['url']}\n"
-            text += "\n" + "-"*30 + "\n\n"
+        for label, group in groups:
+            if len(groups) > 1:
+                parts.append(EMAIL_HTML_SECTION.format(label=escape(label), count=len(group)))
+            for event in group:
+                extra = ''
+                if event.get('lineup'):
+                    extra += EMAIL_HTML_LINEUP.format(lineup=escape(str(event['lineup'])))
+                if event['url']:
+                    extra += EMAIL_HTML_LINK.format(url=escape(str(event['url'])))
+                parts.append(EMAIL_HTML_CARD.format(
+                    title=escape(str(event['title'])), source=escape(str(event['source'])),
+                    date=escape(str(event['date'])), venue=escape(str(event['venue'])),
+                    price=escape(str(event['price'])), extra=extra
+                ))
         
-        text += f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M IST')}"
-        return text
+        parts.append(EMAIL_HTML_FOOT.format(
+            generated=datetime.now().strftime('%Y-%m-%d at %H:%M IST'), url=escape(self.monitor_url())
+        ))
+        return ''.join(parts)
     
-    def run(self):
-        """Main execution function"""
-        print("🚀 Starting BookMyShow Mumbai Music Events Monitor...")
-        print(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}")
+    def create_email_text(self, events):
+        """Create plain text email"""
+        groups = self.group_by_target(events)
+        parts = [EMAIL_TEXT_HEAD.format(label=self.digest_label(events).upper(), count=len(events))]
+        number = 0
         
-        # Load previous events
-        previous_events = self.load_previous_events()
-        print(f"📚 Loaded {len(previous_events)} previous events")
+        for label, group in groups:
+            if len(groups) > 1:
+                parts.append(EMAIL_TEXT_SECTION.format(label=label, count=len(group)))
+            for event in group:
+                number += 1
+                extra = ''
+                if event.get('lineup'):
+                    extra += f"   🎤 {event['lineup']}\n"
+                if event['url']:
+                    extra += f"   🔗 {event['url']}\n"
+                parts.append(EMAIL_TEXT_CARD.format(
+                    number=number, title=event['title'], source=event['source'], date=event['date'],
+                    venue=event['venue'], price=event['price'], extra=extra
+                ))
         
+        parts.append(EMAIL_TEXT_FOOT.format(generated=datetime.now().strftime('%Y-%m-%d %H:%M IST')))
+        return ''.join(parts)
+    
+    def report_connection_stats(self):
+        """Print how well the shared session reused its connections"""
+        stats = self.transport.stats()
+        print(f"🔌 HTTP: {stats['requests']} requests over {stats['connections_opened']} connections "
+              f"({stats['connections_reused']} reused, {stats['hosts']} host pools)")
+        return stats
+    
+    def change_detection_summary(self):
+        """How much extraction fingerprinting skipped this run, and roughly how much time that saved"""
+        counter = self.metrics.counter
+        pages, cards_reused = counter('pages_fingerprinted'), counter('cards_reused')
+        cards = cards_reused + counter('cards_extracted')
+        extract_event = self.metrics.summary().get('extract_event')
+        saved = counter('extract_seconds_saved') + cards_reused * (extract_event['mean'] if extract_event else 0.0)
+        return {
+            'pages_checked': int(pages),
+            'pages_unchanged': int(counter('pages_unchanged')),
+            'page_skip_rate': round(counter('pages_unchanged') / pages, 3) if pages else None,
+            'cards_reused': int(cards_reused),
+            'card_skip_rate': round(cards_reused / cards, 3) if cards else None,
+            'seconds_saved': round(saved, 4)
+        }
+    
+    def write_run_report(self):
+        """Write the JSON run report and Prometheus metrics, and warn about stages slower than usual"""
+        try:
+            report = self.metrics.report(
+                targets=[target_label(target) for target in self.targets],
+                mode=self.mode,
+                parser=self.parser.name,
+                http=self.transport.stats(),
+                race_winners=self.race_winners,
+                change_detection=self.change_detection_summary()
+            )
+            
+            for stage, baseline, total in find_regressions(report, self.store.recent_runs()):
+                print(f"🐢 {stage} took {total:.2f}s, usually {baseline:.2f}s")
+            self.store.record_run(report)
+            
+            with open(self.run_report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            with open(self.metrics_file, 'w', encoding='utf-8') as f:
+                f.write(self.metrics.prometheus())
+            
+            slowest = sorted(report['stages'].items(), key=lambda item: -item[1]['total'])[:5]
+            print("⏱️ " + ', '.join(f"{stage} {stats['total']:.2f}s" for stage, stats in slowest))
+        except Exception as e:
+            print(f"⚠️ Error writing run report: {e}")
+    
+    def poll(self):
+        """One scrape -> match -> enrich -> notify -> persist pass over an open store; returns the new events"""
         # Scrape current events
-        current_events = self.scrape_events()
+        with self.metrics.stage('scrape'):
+            current_events = self.scrape_events()
         
         if not current_events:
             print("❌ No events found with any method")
-            return
+            self.report_connection_stats()
+            return []
+        
+        # Match against history (also folds near-duplicates onto their stored ids)
+        with self.metrics.stage('match'):
+            new_events = self.find_new_events(current_events)
+        self.metrics.count('new_events', len(new_events))
         
-        # For testing, send all events (later you can switch to new events only)
-        print(f"📧 Sending email with {len(current_events)} events...")
-        self.send_email_alert(current_events)
+        if self.enrich:
+            with self.metrics.stage('enrich'):
+                self.enrich_events(new_events)
+        
+        # Only new events go out, each to the subscribers whose filters it passes
+        with self.metrics.stage('route'):
+            digests = self.subscribers.route(new_events)
+        self.metrics.count('digests', len(digests))
+        if digests:
+            print(f"📧 Sending {len(new_events)} new events to {len(digests)} of {len(self.subscribers)} subscribers...")
+            with self.metrics.stage('email'):
+                self.send_digests(digests)
+        else:
+            print("📭 No new events for any subscriber")
         
         # Save current events
-        self.save_events(current_events)
+        with self.metrics.stage('persist'):
+            self.save_events(current_events)
+        
+        self.report_connection_stats()
+        return new_events
+    
+    def run(self):
+        """Main execution function"""
+        print(f"🚀 Starting BookMyShow {self.monitor_label()} Events Monitor...")
+        print(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}")
+        
+        # Open the event history
+        self.open_store()
+        print(f"📚 Event store has {self.store.count()} previous events")
         
-        print("🏁 Scraper completed successfully!")
+        try:
+            self.poll()
+            print("🏁 Scraper completed successfully!")
+        finally:
+            self.save_source_stats()
+            self.save_fingerprints()
+            self.save_response_cache()
+            self.write_run_report()
+            self.close_extract_pool()
+            self.close_recorder()
+            self.store.close()
+    
+    def next_poll_delay(self):
+        """POLL_INTERVAL scaled by a random factor in 1 +/- POLL_JITTER, so pollers don't synchronise"""
+        return max(1.0, self.poll_interval * random.uniform(1 - self.poll_jitter, 1 + self.poll_jitter))
+    
+    def stop(self, signum=None, frame=None):
+        """Finish the current poll and leave the daemon loop (SIGTERM / SIGINT handler)"""
+        if not self.stop_event.is_set():
+            print("🛑 Shutdown requested, finishing the current poll...")
+        self.stop_event.set()
+    
+    def daemon(self, max_polls=None):
+        """Poll until stopped, keeping the session, caches, store and known ids warm between polls"""
+        print(f"🚀 Starting BookMyShow {self.monitor_label()} Events daemon "
+              f"(every {self.poll_interval:g}s ± {self.poll_jitter:.0%})...")
+        
+        previous_handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                previous_handlers[signum] = signal.signal(signum, self.stop)
+        
+        self.open_store()
+        print(f"📚 Event store has {self.store.count()} previous events")
+        polls = 0
+        
+        try:
+            while not self.stop_event.is_set():
+                polls += 1
+                # Each poll gets its own report
+                self.metrics = RunMetrics()
+                self.transport.metrics = self.metrics
+                print(f"\n⏰ Poll {polls} at {datetime.now().strftime('%Y-%m-%d %H:%M:%S IST')}")
+                
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"❌ Poll {polls} failed: {e}")
+                finally:
+                    self.save_source_stats()
+                    self.save_fingerprints()
+                    self.save_response_cache()
+                    self.write_run_report()
+                
+                if self.stop_event.is_set() or (max_polls and polls >= max_polls):
+                    break
+                delay = self.next_poll_delay()
+                print(f"💤 Next poll in {delay:.0f}s")
+                self.stop_event.wait(delay)
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+            self.close_extract_pool()
+            self.close_recorder()
+            self.transport.close()
+            self.store.close()
+            print(f"🏁 Daemon stopped after {polls} polls")
 
-if __name__ == "__main__":
+# The scraper each extraction pool worker process builds once (see BookMyShowScraper.get_extract_pool)
+worker_scraper = None
+
+def init_extract_worker(parser_name, embedded_json, category_keywords):
+    global worker_scraper
+    worker_scraper = BookMyShowScraper.for_extraction(parser_name, embedded_json, category_keywords)
+
+def extract_chunk(chunk):
+    """Pool worker: extract_events_from_html over [(index, body bytes, encoding, source, target)]"""
+    results = []
+    with redirect_stdout(io.StringIO()):  # the parent reports per page
+        for index, body, encoding, source, target in chunk:
+            html = body.decode(encoding or 'utf-8', errors='replace')
+            results.append((index, worker_scraper.extract_events_from_html(html, source, tuple(target))))
+    return results
+
+def print_events(events, as_json=False):
+    if as_json:
+        print(json.dumps([dict(event) for event in events], ensure_ascii=False, indent=2))
+        return
+    for event in events:
+        print(f"{event.get('first_seen', '')[:16]:16s}  {target_label(event_target(event)):18s}  "
+              f"{event['title']}  |  {event.get('date', '')}  |  {event.get('venue', '')}  |  {event.get('url', '')}")
+
+def events_since(hours):
+    """Events the store first saw in the last `hours` hours"""
+    since = (datetime.now() - timedelta(hours=hours)).isoformat(timespec='seconds')
+    store = EventStore(os.environ.get('EVENTS_DB', 'events.db'))
+    try:
+        return store.first_seen_since(since)
+    finally:
+        store.close()
+
+def cli_scrape(args):
+    if args.record:
+        os.environ['RECORD_ARCHIVE'] = args.record
+    scraper = BookMyShowScraper()
+    if args.daemon or os.environ.get('DAEMON') == '1':
+        scraper.daemon(max_polls=args.polls)
+    else:
+        scraper.run()
+
+def cli_diff(args):
+    """Events first seen in the last --since hours, straight from the store (no network)"""
+    events = events_since(args.since)
+    print_events(events, args.json)
+    if not args.json:
+        print(f"🆕 {len(events)} events first seen in the last {args.since:g}h")
+
+def cli_notify(args):
+    """Route the last --since hours of new events to subscribers and send the digests"""
+    events = events_since(args.since)
     scraper = BookMyShowScraper()
-    scraper.run()
+    digests = scraper.subscribers.route(events)
+    if not digests:
+        print("📭 No new events for any subscriber")
+        return
+    print(f"📧 Sending {len(events)} events to {len(digests)} of {len(scraper.subscribers)} subscribers...")
+    if not scraper.send_digests(digests):
+        sys.exit(1)
+
+def cli_bench(args):
+    """Run benchmarks/bench_<name>.py with the remaining arguments"""
+    import runpy
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks')
+    names = sorted(name[6:-3] for name in os.listdir(directory) if name.startswith('bench_') and name.endswith('.py'))
+    if args.name not in names:
+        print(f"Available benchmarks: {', '.join(names)}")
+        sys.exit(0 if args.name is None else 2)
+    
+    path = os.path.join(directory, f"bench_{args.name}.py")
+    sys.argv = [path] + args.args
+    sys.path.insert(0, directory)
+    runpy.run_path(path, run_name='__main__')
+
+def cli_replay(args):
+    """Run the extractors over a saved page (.html, .json, .txt, optionally .gz) and print its events"""
+    opener = gzip.open if args.file.endswith('.gz') else open
+    with opener(args.file, 'rt', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+    
+    target = parse_targets(args.target)[0]
+    source = args.source or os.path.basename(args.file)
+    kind = os.path.splitext(args.file[:-3] if args.file.endswith('.gz') else args.file)[1]
+    
+    # Keep --json output parseable
+    with redirect_stdout(io.StringIO()) if args.json else nullcontext():
+        scraper = BookMyShowScraper.for_extraction(
+            os.environ.get('HTML_PARSER', 'auto'),
+            os.environ.get('EMBEDDED_JSON', '1') != '0',
+            load_category_keywords(os.environ.get('KEYWORDS_FILE'))
+        )
+        if kind == '.json' or content.lstrip()[:1] in ('{', '['):
+            events = scraper.extract_events_from_json(json_loads(content), source, target)
+        elif kind == '.txt':
+            events = scraper.extract_events_from_text(content, source, target)
+        else:
+            events = scraper.extract_events_from_html(content, source, target)
+    print_events(events, args.json)
+
+def cli_export(args):
+    """Export the event history to Parquet (with pyarrow) or columnar NDJSON"""
+    fmt = args.format
+    if fmt == 'auto':
+        # Look for pyarrow without importing it; only the Parquet writer needs it loaded
+        if importlib.util.find_spec('pyarrow') is not None:
+            fmt = 'parquet' if not args.output or args.output.endswith('.parquet') else 'ndjson'
+        else:
+            fmt = 'ndjson'
+    output = args.output or ('events_history.parquet' if fmt == 'parquet' else 'events_history.ndjson.gz')
+    since = (datetime.now() - timedelta(days=args.since)).isoformat(timespec='seconds') if args.since else None
+    
+    store = EventStore(os.environ.get('EVENTS_DB', 'events.db'))
+    try:
+        writer = export_history_parquet if fmt == 'parquet' else export_history_ndjson
+        rows = writer(store.iter_history(since), output)
+    finally:
+        store.close()
+    print(f"📦 Exported {rows} events to {output} ({os.path.getsize(output) / 1024:.1f} KiB, {fmt})")
+
+def main(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="BookMyShow events monitor")
+    commands = parser.add_subparsers(dest='command')
+    
+    scrape = commands.add_parser('scrape', help='scrape, match, notify and save (the default)')
+    scrape.add_argument('--daemon', action='store_true', help='keep polling (POLL_INTERVAL, POLL_JITTER)')
+    scrape.add_argument('--polls', type=int, default=None, help='stop the daemon after N polls')
+    scrape.add_argument('--record', default=None, metavar='ARCHIVE',
+                        help='record every upstream response to ARCHIVE for standin_server.py --archive')
+    scrape.set_defaults(func=cli_scrape)
+    
+    diff = commands.add_parser('diff', help='list events first seen recently, from the store')
+    diff.add_argument('--since', type=float, default=24, help='hours (default 24)')
+    diff.add_argument('--json', action='store_true')
+    diff.set_defaults(func=cli_diff)
+    
+    notify = commands.add_parser('notify', help='email recently first-seen events to their subscribers')
+    notify.add_argument('--since', type=float, default=24, help='hours (default 24)')
+    notify.set_defaults(func=cli_notify)
+    
+    bench = commands.add_parser('bench', help='run benchmarks/bench_<name>.py')
+    bench.add_argument('name', nargs='?')
+    bench.add_argument('args', nargs=argparse.REMAINDER)
+    bench.set_defaults(func=cli_bench)
+    
+    replay = commands.add_parser('replay', help='extract events from a saved page')
+    replay.add_argument('file')
+    replay.add_argument('--target', default='', help='city:category the page lists (default mumbai:music-shows)')
+    replay.add_argument('--source', default=None)
+    replay.add_argument('--json', action='store_true')
+    replay.set_defaults(func=cli_replay)
+    
+    export = commands.add_parser('export', help='export the event history for bulk analysis')
+    export.add_argument('--format', choices=['auto', 'parquet', 'ndjson'], default='auto',
+                        help='auto: Parquet when pyarrow is installed, else columnar NDJSON')
+    export.add_argument('--output', default=None)
+    export.add_argument('--since', type=float, default=None, help='only events first seen in the last N days')
+    export.set_defaults(func=cli_export)
+    
+    args = parser.parse_args(argv)
+    if args.command is None:
+        # Plain `python scraper.py`, as the workflow runs it
+        args = parser.parse_args(['scrape'])
+    args.func(args)
+
+if __name__ == "__main__":
+    main()